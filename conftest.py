@@ -2,30 +2,38 @@
 Various common utilities for testing.
 """
 
+import functools
 import re
+import sys
+from pathlib import Path
 
 import pytest
 from pytest_pyodide import get_global_config
-from pytest_pyodide.utils import package_is_built as _package_is_built
+from pytest_pyodide.utils import built_packages as _built_packages
+
+sys.path.insert(0, str(Path(__file__).parent / "tools"))
+
+# --test-timings and --shard, see tools/cost_scheduling.py
+pytest_plugins = ["cost_scheduling"]
+
+BROWSERS = "|".join(["firefox", "chrome", "node", "safari"])
+PACKAGE_TEST_RE = re.compile(r".*/packages/(?P<name>[\w\-\.]+)/test_[\w\-]+\.py")
+BROWSER_TEST_RE = re.compile(rf"test_[\w\-\.]+\[({BROWSERS})[^\]]*\]")
+COMMON_IMPORT_TEST_RE = re.compile(rf"test_import\[({BROWSERS})-(?P<name>[\w\-\.]+)\]")
 
 
 def maybe_skip_test(item, delayed=False):
     """If necessary skip test at the fixture level, to avoid
     loading the selenium_standalone fixture which takes a long time.
     """
-    browsers = "|".join(["firefox", "chrome", "node", "safari"])
     is_common_test = str(item.fspath).endswith("test_packages_common.py")
 
     skip_msg = None
     # Testing a package. Skip the test if the package is not built.
-    match = re.match(
-        r".*/packages/(?P<name>[\w\-\.]+)/test_[\w\-]+\.py", str(item.parent.fspath)
-    )
+    match = PACKAGE_TEST_RE.match(str(item.parent.fspath))
     if match and not is_common_test:
         package_name = match.group("name")
-        if not package_is_built(package_name) and re.match(
-            rf"test_[\w\-\.]+\[({browsers})[^\]]*\]", item.name
-        ):
+        if not package_is_built(package_name) and BROWSER_TEST_RE.match(item.name):
             skip_msg = f"package '{package_name}' is not built."
 
     # Common package import test. Skip it if the package is not built.
@@ -34,9 +42,7 @@ def maybe_skip_test(item, delayed=False):
             skip_msg = "Not running browser tests"
 
         else:
-            match = re.match(
-                rf"test_import\[({browsers})-(?P<name>[\w\-\.]+)\]", item.name
-            )
+            match = COMMON_IMPORT_TEST_RE.match(item.name)
             if match:
                 package_name = match.group("name")
                 if not package_is_built(package_name):
@@ -57,6 +63,27 @@ def maybe_skip_test(item, delayed=False):
             pytest.skip(skip_msg)
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--pooled-runtimes",
+        action="store_true",
+        help="Run the test_import tests of a module in one browser (or Node process) "
+        "per runtime, reloading Pyodide between tests instead of starting a new one",
+    )
+    parser.addoption(
+        "--import-profile",
+        metavar="DIR",
+        help="Profile the imports of test_import instead of benchmarking them, "
+        "and write a JSON profile per package and runtime to DIR",
+    )
+    parser.addoption(
+        "--import-memory",
+        action="store_true",
+        help="Record the wasm memory growth and the Python heap (with tracemalloc, "
+        "which slows the imports down) caused by the imports of test_import",
+    )
+
+
 def pytest_configure(config):
     """Monkey patch the function cwd_relative_nodeid
 
@@ -78,8 +105,14 @@ def pytest_collection_modifyitems(config, items):
         maybe_skip_test(item, delayed=True)
 
 
+@functools.cache
+def built_packages(dist_dir: Path) -> frozenset[str]:
+    """Names of the packages in the lock file of ``dist_dir``, read once."""
+    return frozenset(name.lower() for name in _built_packages(Path(dist_dir)))
+
+
 def package_is_built(package_name):
-    return _package_is_built(package_name, pytest.pyodide_dist_dir)
+    return package_name.lower() in built_packages(pytest.pyodide_dist_dir)
 
 
 def set_configs():
@@ -122,7 +155,9 @@ def set_configs():
         });
         """,
     )
-    pytest_pyodide_config.add_node_extra_globals(["Request", "Response", "URL"])
+    pytest_pyodide_config.add_node_extra_globals(
+        ["Request", "Response", "URL", "ReadableStream"]
+    )
 
 
 set_configs()
@@ -1,9 +1,28 @@
-from asyncio import Event, Future, Queue, create_task, ensure_future, sleep
+from asyncio import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Event,
+    Future,
+    Lock,
+    Queue,
+    create_task,
+    ensure_future,
+    get_event_loop,
+    wait,
+    wait_for,
+)
 from contextlib import contextmanager
-from inspect import isawaitable
+from functools import cache, lru_cache
+from time import perf_counter
+from urllib.parse import urlsplit
 
 ASGI = {"spec_version": "2.0", "version": "3.0"}
 
+# Upper bounds of the request latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Seconds dispose() waits for the requests in flight before cancelling them
+DISPOSE_TIMEOUT = 30
+
 
 background_tasks = set()
 
@@ -27,25 +46,46 @@ def acquire_js_buffer(pybuffer):
         buf.release()
 
 
+@cache
+def _request_fields():
+    from pyodide.code import run_js
+
+    # Everything request_to_scope needs from the JS request in a single call,
+    # with the headers flattened into [name, value, name, value, ...]
+    return run_js("(req) => [req.method, req.url, Array.from(req.headers).flat()]")
+
+
+@lru_cache(maxsize=256)
+def _encode_header_name(name):
+    return name.encode()
+
+
+@lru_cache(maxsize=256)
+def _decode_header_name(name):
+    return name.decode()
+
+
 def request_to_scope(req):
-    from js import URL
+    method, url, header_items = _request_fields()(req).to_py()
 
     # @app.get("/example")
     # async def example(request: Request):
     #     request.headers.get("content-type")
     # - this will error if header is not "bytes" as in ASGI spec.
-    headers = [(k.lower().encode(), v.encode()) for k, v in req.headers]
-    url = URL.new(req.url)
-    assert url.protocol[-1] == ":"
-    scheme = url.protocol[:-1]
-    path = url.pathname
-    assert "?".startswith(url.search[0:1])
-    query_string = url.search[1:].encode()
+    # The names are lower case already, the Headers class normalizes them.
+    headers = [
+        (_encode_header_name(k), v.encode())
+        for k, v in zip(header_items[::2], header_items[1::2])
+    ]
+    # req.url is serialized by the Request class already, so splitting it in
+    # Python gives the same parts as a JS URL without going through the FFI
+    scheme, _, path, query, _ = urlsplit(url)
+    query_string = query.encode()
     return {
         "asgi": ASGI,
         "headers": headers,
         "http_version": "1.1",
-        "method": req.method,
+        "method": method,
         "scheme": scheme,
         "path": path,
         "query_string": query_string,
@@ -54,124 +94,370 @@ def request_to_scope(req):
 
 
 async def start_application(app):
-    shutdown_future = Future()
-
-    async def shutdown():
-        shutdown_future.set_result(None)
-        await sleep(0)
-
-    it = iter([{"type": "lifespan.startup"}, Future()])
+    """Run the lifespan startup of ``app`` and return a coroutine function to
+    shut it down again."""
+    startup_complete = Future()
+    shutdown_requested = Future()
+    shutdown_complete = Future()
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
 
     async def receive():
-        res = next(it)
-        if isawaitable(res):
-            await res
-        return res
-
-    ready = Future()
+        message = next(messages)
+        if message["type"] == "lifespan.shutdown":
+            await shutdown_requested
+        return message
 
     async def send(got):
         if got["type"] == "lifespan.startup.complete":
-            ready.set_result(None)
-            return
-        if got["type"] == "lifespan.shutdown.complete":
-            return
-        raise RuntimeError(f"Unexpected lifespan event {got['type']}")
-
-    run_in_background(
-        app(
-            {
-                "asgi": ASGI,
-                "state": {},
-                "type": "lifespan",
-            },
-            receive,
-            send,
-        )
+            startup_complete.set_result(None)
+        elif got["type"] == "lifespan.shutdown.complete":
+            shutdown_complete.set_result(None)
+        elif got["type"] == "lifespan.startup.failed":
+            startup_complete.set_exception(RuntimeError(got.get("message", "")))
+        elif got["type"] == "lifespan.shutdown.failed":
+            shutdown_complete.set_exception(RuntimeError(got.get("message", "")))
+        else:
+            raise RuntimeError(f"Unexpected lifespan event {got['type']}")
+
+    lifespan = ensure_future(
+        app({"asgi": ASGI, "state": {}, "type": "lifespan"}, receive, send)
     )
-    await ready
+    await wait([startup_complete, lifespan], return_when=FIRST_COMPLETED)
+    if not startup_complete.done():
+        # The app returned or raised without completing the startup, so it
+        # does not support the lifespan protocol.
+        lifespan.exception()
+        startup_complete.cancel()
+
+        async def shutdown():
+            pass
+
+        return shutdown
+
+    # Raises if the startup failed
+    startup_complete.result()
+
+    async def shutdown():
+        if not shutdown_requested.done():
+            shutdown_requested.set_result(None)
+        await wait([shutdown_complete, lifespan], return_when=FIRST_COMPLETED)
+        if shutdown_complete.done():
+            shutdown_complete.result()
+
     return shutdown
 
 
-async def process_request(app, req):
-    from js import Object, Response
+class ASGIServer:
+    """Serve requests with an ASGI application.
+
+    The lifespan startup of the application runs once, before the first
+    request, and its shutdown when the server is disposed. Requests can be
+    handled concurrently. A request counts as in flight, and its latency is
+    measured, until the application has sent the whole response body, which
+    for a streamed response is after the Response object was returned.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._shutdown = None
+        self._start_lock = Lock()
+        self._idle = Event()
+        self._idle.set()
+        self._tasks = set()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    async def start(self):
+        async with self._start_lock:
+            if self._shutdown is None:
+                self._shutdown = await start_application(self.app)
+
+    async def handle_request(self, req):
+        await self.start()
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self._idle.clear()
+        start = perf_counter()
+        completed = False
+
+        def complete(error):
+            nonlocal completed
+            if completed:
+                return
+            completed = True
+            if error is not None:
+                self.errors += 1
+            self.in_flight -= 1
+            self._record_latency((perf_counter() - start) * 1000)
+            if self.in_flight == 0:
+                self._idle.set()
 
-    from pyodide.ffi import create_proxy
+        try:
+            return await process_request(
+                self.app, req, on_complete=complete, tasks=self._tasks
+            )
+        except Exception as e:
+            complete(e)
+            raise
+
+    def _record_latency(self, ms):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.latency_histogram[i] += 1
+                return
+        self.latency_histogram[-1] += 1
+
+    def stats(self):
+        """Request counters and the latency histogram, by bucket upper bound.
+
+        ``errors`` counts the requests whose application raised, before or
+        after the response was sent (e.g. after Starlette responded with a
+        500), and the requests cancelled by dispose().
+        """
+        bounds = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS]
+        bounds.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "latency_ms": dict(zip(bounds, self.latency_histogram, strict=True)),
+        }
+
+    async def dispose(self, timeout=DISPOSE_TIMEOUT):
+        """Wait for the requests in flight, then run the lifespan shutdown.
+
+        Requests still running after ``timeout`` seconds, like a streamed
+        response that is never read, are cancelled.
+        """
+        try:
+            await wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            for task in list(self._tasks):
+                task.cancel()
+            await self._idle.wait()
+        async with self._start_lock:
+            if self._shutdown is not None:
+                shutdown, self._shutdown = self._shutdown, None
+                await shutdown()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.dispose()
+
+
+async def process_request(app, req, on_complete=None, tasks=None):
+    """Run ``app`` on the JS request ``req`` and return the JS Response.
+
+    ``on_complete`` is called once the application is done, which can be after
+    the Response was returned if the body is streamed, with the exception it
+    raised or None. The task running the application is kept in the set
+    ``tasks`` while it runs, if given.
+    """
+    from js import Error, Object, ReadableStream, Response
+
+    from pyodide.ffi import create_proxy, to_js
 
     status = None
     headers = None
     result = Future()
-    is_sse = False
     finished_response = Event()
-
-    receive_queue = Queue()
-    if req.body:
-        async for data in req.body:
-            await receive_queue.put(
-                {
-                    "body": data.to_bytes(),
-                    "more_body": True,
-                    "type": "http.request",
-                }
-            )
-    await receive_queue.put({"body": b"", "more_body": False, "type": "http.request"})
+    # Chunks of a streamed response body, then None once it is complete. It
+    # holds a single chunk, so send() waits for the reader of the stream to
+    # catch up and a large response is never buffered as a whole.
+    chunks = None
+    stream_proxies = []
+    stream_cancelled = False
+    stream_complete = False
+    app_error = None
+
+    # The request body is read from the JS stream when the app asks for it, so
+    # at most one chunk is in memory and an app that responds without reading
+    # the body does not wait for it.
+    reader = req.body.getReader() if req.body else None
+    body_done = False
 
     async def receive():
-        message = None
-        if not receive_queue.empty():
-            message = await receive_queue.get()
-        else:
+        nonlocal body_done
+        if body_done:
             await finished_response.wait()
-            message = {"type": "http.disconnect"}
-        return message
+            return {"type": "http.disconnect"}
+        chunk = await reader.read() if reader else None
+        if chunk is None or chunk.done:
+            body_done = True
+            return {"body": b"", "more_body": False, "type": "http.request"}
+        # The chunk is in JS memory, outside of the Wasm heap, so it has to be
+        # copied once; to_bytes() does it without an intermediate buffer.
+        return {
+            "body": chunk.value.to_bytes(),
+            "more_body": True,
+            "type": "http.request",
+        }
+
+    def make_response(body):
+        # Converted to nested arrays in one go, which also keeps repeated
+        # headers like set-cookie, which Object.fromEntries would drop
+        return Response.new(body, headers=to_js(headers), status=status)
+
+    def destroy_stream_proxies():
+        for px in stream_proxies:
+            px.destroy()
+
+    async def pull(controller):
+        chunk = await chunks.get()
+        if chunk is None:
+            controller.close()
+        elif isinstance(chunk, BaseException):
+            controller.error(Error.new(str(chunk)))
+        else:
+            controller.enqueue(chunk)
+            return
+        get_event_loop().call_soon(destroy_stream_proxies)
+
+    def cancel(reason):
+        # The client went away: let the app know and drop the rest of the body
+        nonlocal stream_cancelled
+        stream_cancelled = True
+        finished_response.set()
+        while not chunks.empty():
+            chunks.get_nowait()
+        get_event_loop().call_soon(destroy_stream_proxies)
+
+    def start_stream():
+        nonlocal chunks
+        chunks = Queue(maxsize=1)
+        stream_proxies.extend([create_proxy(pull), create_proxy(cancel)])
+        source = {"pull": stream_proxies[0], "cancel": stream_proxies[1]}
+        stream = ReadableStream.new(to_js(source, dict_converter=Object.fromEntries))
+        result.set_result(make_response(stream))
 
     async def send(got):
         nonlocal status
         nonlocal headers
+        nonlocal stream_complete
 
         if got["type"] == "http.response.start":
             status = got["status"]
             # Like above, we need to convert byte-pairs into string explicitly.
-            headers = [(k.decode(), v.decode()) for k, v in got["headers"]]
+            headers = [(_decode_header_name(k), v.decode()) for k, v in got["headers"]]
 
         elif got["type"] == "http.response.body":
-            body = got["body"]
-            # Convert body to JS buffer
-            px = create_proxy(body)
-            buf = px.getBuffer()
-            px.destroy()
+            body = got.get("body", b"")
+            more_body = got.get("more_body", False)
 
-            resp = Response.new(
-                buf.data, headers=Object.fromEntries(headers), status=status
-            )
-            result.set_result(resp)
-            finished_response.set()
+            if chunks is None and not more_body:
+                # The whole body is in a single message
+                # Convert body to JS buffer
+                px = create_proxy(body)
+                buf = px.getBuffer()
+                px.destroy()
+
+                result.set_result(make_response(buf.data))
+                finished_response.set()
+                return
+
+            if chunks is None:
+                # Respond as soon as the first chunk is there, and stream the rest
+                start_stream()
+            if stream_cancelled:
+                return
+            if body:
+                # The reader may get to the chunk after the app reused its
+                # buffer, so it needs a copy
+                await chunks.put(to_js(body))
+            if not more_body:
+                await chunks.put(None)
+                stream_complete = True
+                finished_response.set()
 
     async def run_app():
+        nonlocal app_error
         try:
             await app(request_to_scope(req), receive, send)
 
             # If we get here and no response has been set yet, the app didn't generate a response
             if not result.done():
                 raise RuntimeError("The application did not generate a response")  # noqa: TRY301
+            if chunks is not None and not stream_complete and not stream_cancelled:
+                # The app returned without sending the last chunk, end the body
+                await chunks.put(None)
+                finished_response.set()
         except Exception as e:
             # Handle any errors in the application
+            app_error = e
             if not result.done():
                 result.set_exception(e)
                 finished_response.set()
+            elif chunks is not None and not stream_cancelled and not stream_complete:
+                # The response is streaming already, fail its body
+                await chunks.put(e)
+                finished_response.set()
+        except CancelledError as e:
+            # Cancelled by ASGIServer.dispose(); the app may be waiting for the
+            # reader of the stream, so the pending chunk is dropped
+            app_error = e
+            error = RuntimeError("The request was cancelled")
+            if not result.done():
+                result.set_exception(error)
+            elif chunks is not None and not stream_cancelled and not stream_complete:
+                while not chunks.empty():
+                    chunks.get_nowait()
+                chunks.put_nowait(error)
+            finished_response.set()
+            raise
+        finally:
+            if reader and not body_done:
+                # Let the client know that the rest of the body is not needed
+                reader.cancel()
 
     # Create task to run the application in the background
     app_task = create_task(run_app())
+    if on_complete is not None:
+        app_task.add_done_callback(lambda _: on_complete(app_error))
+    if tasks is not None:
+        tasks.add(app_task)
+        app_task.add_done_callback(tasks.discard)
 
     # Wait for the result (the response)
     response = await result
 
-    await app_task
+    if chunks is None:
+        await app_task
+    else:
+        # The app keeps sending the body while the response is read
+        background_tasks.add(app_task)
+        app_task.add_done_callback(background_tasks.discard)
     return response
 
 
+# The servers of handle_request by application. They keep running, and keep
+# their application alive, until dispose_all().
+_servers = {}
+
+
+def get_server(app):
+    """The ASGIServer shared by all handle_request calls for ``app``."""
+    server = _servers.get(app)
+    if server is None:
+        server = _servers[app] = ASGIServer(app)
+    return server
+
+
+async def dispose_all():
+    """Dispose the servers of handle_request, running the lifespan shutdown of
+    their applications."""
+    servers = list(_servers.values())
+    _servers.clear()
+    for server in servers:
+        await server.dispose()
+
+
 async def handle_request(app, req):
-    shutdown = await start_application(app)
-    result = await process_request(app, req)
-    await shutdown()
-    return result
+    return await get_server(app).handle_request(req)
@@ -0,0 +1,83 @@
+"""Benchmarks of the ASGI bridge in asgi.py, run in Pyodide by test_fastapi.py.
+
+Besides the statistics of pytest-benchmark, each benchmark stores the requests
+per second and the median and 99th percentile latency of a single request in
+its ``extra_info``. With concurrent requests, the latency of a request is
+shorter than the time of a round.
+"""
+
+import asyncio
+import statistics
+from time import perf_counter
+
+import pytest
+from fastapi_test_app import handle_request
+
+from js import Request
+from pyodide.ffi import run_sync, to_js
+
+SIZES = {"1KB": 1024, "1MB": 1024 * 1024, "10MB": 10 * 1024 * 1024}
+
+# Latency of each request, in seconds, since the start of the benchmark
+latencies = []
+
+pytestmark = pytest.mark.benchmark(max_time=0.5, min_rounds=5)
+
+
+async def fetch(path, **kwargs):
+    start = perf_counter()
+    r = await handle_request(Request.new(f"https://localhost:8000{path}", **kwargs))
+    # Include reading the response body
+    await r.arrayBuffer()
+    latencies.append(perf_counter() - start)
+    assert r.status == 200
+
+
+def measure(benchmark, make_requests, requests_per_round=1):
+    latencies.clear()
+    benchmark(lambda: run_sync(make_requests()))
+
+    times = benchmark.stats.stats.data
+    p99 = (
+        statistics.quantiles(latencies, n=100)[98]
+        if len(latencies) > 1
+        else latencies[0]
+    )
+    benchmark.extra_info.update(
+        requests_per_sec=round(requests_per_round / statistics.mean(times), 1),
+        p50_ms=round(statistics.median(latencies) * 1000, 3),
+        p99_ms=round(p99 * 1000, 3),
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def started():
+    # Run the lifespan startup outside of the benchmarks
+    run_sync(fetch("/hello"))
+
+
+def test_small_json(benchmark):
+    measure(benchmark, lambda: fetch("/hello"))
+
+
+def test_path_params(benchmark):
+    measure(benchmark, lambda: fetch("/items/7"))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_request_body(benchmark, size):
+    body = to_js(b"x" * SIZES[size])
+    measure(benchmark, lambda: fetch("/echo", method="POST", body=body))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_response_body(benchmark, size):
+    measure(benchmark, lambda: fetch(f"/bytes/{SIZES[size]}"))
+
+
+@pytest.mark.parametrize("in_flight", [10, 100])
+def test_concurrent_requests(benchmark, in_flight):
+    async def make_requests():
+        await asyncio.gather(*(fetch(f"/items/{i}") for i in range(in_flight)))
+
+    measure(benchmark, make_requests, requests_per_round=in_flight)
@@ -5,9 +5,22 @@ async def handle_request(request):
 
 # Set up fastapi app
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+lifespan_events = []
+
+
+@asynccontextmanager
+async def lifespan(app):
+    lifespan_events.append("startup")
+    yield
+    lifespan_events.append("shutdown")
+
+
+app = FastAPI(lifespan=lifespan)
 
 def temp(app):
   @app.get("/hello")
@@ -18,4 +31,40 @@ def temp(app):
   async def read_item(item_id: int):
       return {"item_id": item_id}
 
+  @app.get("/stream/{count}")
+  async def stream(count: int):
+      async def numbers():
+          for i in range(count):
+              yield f"data: {i}\n\n"
+
+      return StreamingResponse(numbers(), media_type="text/event-stream")
+
+  @app.post("/echo")
+  async def echo(request: Request):
+      chunks = 0
+      size = 0
+      async for chunk in request.stream():
+          if chunk:
+              chunks += 1
+              size += len(chunk)
+      return {"chunks": chunks, "size": size}
+
+  @app.get("/headers")
+  async def headers(request: Request, response: Response):
+      response.set_cookie("a", "1")
+      response.set_cookie("b", "2")
+      return {
+          "user_agent": request.headers.get("user-agent"),
+          "query": request.url.query,
+          "path": request.url.path,
+      }
+
+  @app.get("/bytes/{size}")
+  async def read_bytes(size: int):
+      return Response(bytes(size), media_type="application/octet-stream")
+
+  @app.post("/reject")
+  async def reject():
+      raise HTTPException(status_code=413)
+
 temp(app)
@@ -1,4 +1,4 @@
-from fastapi_test_app import handle_request
+from fastapi_test_app import app, handle_request, lifespan_events
 from js import Request
 import pytest
 
@@ -13,3 +13,156 @@ async def test_a():
     assert r.status == 200
     json = await r.json()
     assert json.to_py() == {"item_id": 7}
+
+
+@pytest.mark.asyncio
+async def test_headers():
+    r = await handle_request(
+        Request.new(
+            "https://localhost:8000/headers?x=1&y=2",
+            headers={"User-Agent": "test"},
+        )
+    )
+    assert r.status == 200
+    json = await r.json()
+    assert json.to_py() == {
+        "user_agent": "test",
+        "query": "x=1&y=2",
+        "path": "/headers",
+    }
+    assert list(r.headers.getSetCookie()) == [
+        "a=1; Path=/; SameSite=lax",
+        "b=2; Path=/; SameSite=lax",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_streaming_response():
+    r = await handle_request(Request.new("https://localhost:8000/stream/3"))
+    assert r.status == 200
+    assert r.headers.get("content-type").startswith("text/event-stream")
+
+    reader = r.body.getReader()
+    received = []
+    while True:
+        chunk = await reader.read()
+        if chunk.done:
+            break
+        received.append(chunk.value.to_bytes().decode())
+    assert received == ["data: 0\n\n", "data: 1\n\n", "data: 2\n\n"]
+
+    r = await handle_request(Request.new("https://localhost:8000/stream/1000"))
+    assert (await r.text()).count("data: ") == 1000
+
+    # A raw ASGI app returning without the final `more_body=False` chunk
+    from asgi import process_request
+
+    async def unterminated(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send(
+            {"type": "http.response.body", "body": b"partial", "more_body": True}
+        )
+
+    r = await process_request(unterminated, Request.new("https://localhost:8000/"))
+    assert await r.text() == "partial"
+
+
+@pytest.mark.asyncio
+async def test_request_body():
+    from pyodide.ffi import to_js
+
+    body = to_js(b"x" * 1_000_000)
+    r = await handle_request(
+        Request.new("https://localhost:8000/echo", method="POST", body=body)
+    )
+    assert r.status == 200
+    json = (await r.json()).to_py()
+    assert json["size"] == 1_000_000
+    assert json["chunks"] >= 1
+
+    r = await handle_request(
+        Request.new("https://localhost:8000/echo", method="POST", body="")
+    )
+    assert (await r.json()).to_py() == {"chunks": 0, "size": 0}
+
+    # The app responds without reading the body
+    r = await handle_request(
+        Request.new("https://localhost:8000/reject", method="POST", body=body)
+    )
+    assert r.status == 413
+
+
+@pytest.mark.asyncio
+async def test_lifespan_runs_once():
+    import asyncio
+
+    from asgi import ASGIServer, dispose_all
+
+    await handle_request(Request.new("https://localhost:8000/hello"))
+    await handle_request(Request.new("https://localhost:8000/hello"))
+    assert lifespan_events == ["startup"]
+
+    async with ASGIServer(app) as server:
+        assert lifespan_events == ["startup", "startup"]
+        responses = await asyncio.gather(
+            *(
+                server.handle_request(Request.new(f"https://localhost:8000/items/{i}"))
+                for i in range(5)
+            )
+        )
+        assert [r.status for r in responses] == [200] * 5
+        stats = server.stats()
+        assert stats["requests"] == 5
+        assert stats["in_flight"] == 0
+        assert stats["max_in_flight"] == 5
+        assert sum(stats["latency_ms"].values()) == 5
+
+        # A streamed response is in flight until its body is sent, and the
+        # shutdown waits for it
+        r = await server.handle_request(Request.new("https://localhost:8000/stream/3"))
+        assert server.stats()["in_flight"] == 1
+        dispose = asyncio.ensure_future(server.dispose())
+        await asyncio.sleep(0.01)
+        assert not dispose.done()
+        assert (await r.text()).count("data: ") == 3
+        await dispose
+        assert server.stats()["in_flight"] == 0
+    assert lifespan_events == ["startup", "startup", "shutdown"]
+
+    # The servers of handle_request run until dispose_all()
+    await dispose_all()
+    assert lifespan_events == ["startup", "startup", "shutdown", "shutdown"]
+
+
+@pytest.mark.asyncio
+async def test_dispose_cancels_stalled_requests():
+    from asgi import ASGIServer
+
+    async def endless(scope, receive, send):
+        if scope["type"] == "lifespan":
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        while True:
+            await send({"type": "http.response.body", "body": b"x", "more_body": True})
+
+    # Nobody reads the stream, so the app waits for the reader forever
+    server = ASGIServer(endless)
+    r = await server.handle_request(Request.new("https://localhost:8000/"))
+    await server.dispose(timeout=0.05)
+    assert server.stats()["in_flight"] == 0
+    assert server.stats()["errors"] == 1
+    with pytest.raises(Exception, match="The request was cancelled"):
+        await r.text()
+
+    async def fails_after_response(scope, receive, send):
+        if scope["type"] == "lifespan":
+            return
+        # Like Starlette's ServerErrorMiddleware, respond and re-raise
+        await send({"type": "http.response.start", "status": 500, "headers": []})
+        await send({"type": "http.response.body", "body": b"Internal Server Error"})
+        raise ValueError("boom")
+
+    async with ASGIServer(fails_after_response) as server:
+        r = await server.handle_request(Request.new("https://localhost:8000/"))
+        assert r.status == 500
+    assert server.stats()["errors"] == 1
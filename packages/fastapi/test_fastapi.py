@@ -1,6 +1,15 @@
-from pytest_pyodide import run_in_pyodide
+import json
 from pathlib import Path
+
 import pytest
+from pytest_pyodide import run_in_pyodide
+
+FILES = ["asgi", "fastapi_test_helper", "fastapi_test_app"]
+
+
+def read_files(names):
+    dir = Path(__file__).parent
+    return [[name + ".py", (dir / (name + ".py")).read_text()] for name in names]
 
 
 @pytest.mark.xfail_browsers(firefox="Requires JSPI", safari="Requires JSPI")
@@ -16,10 +25,36 @@ def test_fastapi(selenium):
 
         assert pytest.main(["fastapi_test_helper.py"]) == 0
 
-    dir = Path(__file__).parent
-    file_contents = []
-    for name in ["asgi", "fastapi_test_helper", "fastapi_test_app"]:
-        file = name + ".py"
-        path = dir / file
-        file_contents.append([file, path.read_text()])
-    inner(selenium, file_contents)
+    inner(selenium, read_files(FILES))
+
+
+@pytest.mark.xfail_browsers(firefox="Requires JSPI", safari="Requires JSPI")
+@pytest.mark.driver_timeout(300)
+def test_fastapi_benchmark(selenium, benchmark):
+    """Benchmark the ASGI bridge in Pyodide, see fastapi_benchmark_helper.py.
+
+    The measurements taken in Pyodide end up in the ``extra_info`` of this
+    benchmark, e.g. in the output of ``--benchmark-json``.
+    """
+
+    @run_in_pyodide(packages=["fastapi", "pytest-benchmark"])
+    def inner(selenium, file_contents):
+        from pathlib import Path
+
+        for key, value in file_contents:
+            Path(key).write_text(value)
+        import pytest
+
+        args = ["fastapi_benchmark_helper.py", "--benchmark-json=benchmark.json"]
+        assert pytest.main(args) == 0
+        return Path("benchmark.json").read_text()
+
+    if benchmark.disabled:
+        pytest.skip("Benchmarks are disabled, e.g. with xdist or --benchmark-skip")
+
+    file_contents = read_files([*FILES, "fastapi_benchmark_helper"])
+    results = benchmark.pedantic(
+        inner, args=(selenium, file_contents), rounds=1, iterations=1
+    )
+    for result in json.loads(results)["benchmarks"]:
+        benchmark.extra_info[result["name"]] = result["extra_info"]
@@ -1,11 +1,12 @@
 import functools
+import json
 import os
+import sys
 import time
 from typing import Any
 from pathlib import Path
 
 from pytest_pyodide.runner import _BrowserBaseRunner
-from pytest_pyodide.utils import package_is_built as _package_is_built
 import pytest
 
 from conftest import package_is_built
@@ -13,6 +14,11 @@ from pyodide_build.recipe.spec import MetaConfig
 
 PKG_DIR = Path(__file__).parent
 
+sys.path.insert(0, str(PKG_DIR.parent / "tools"))
+
+import import_profile
+from recipe_index import RecipeIndex, load_recipe_index
+
 UNSUPPORTED_PACKAGES: dict[str, list[str]] = {
     "chrome": [],
     "firefox": [],
@@ -29,21 +35,76 @@ XFAIL_PACKAGES: dict[str, str] = {
 
 
 @functools.cache
-def registered_packages() -> list[str]:
-    """Returns a list of registered package names"""
-    packages = []
-    for name in os.listdir(PKG_DIR):
-        if (PKG_DIR / name).is_dir() and (PKG_DIR / name / "meta.yaml").exists():
-            packages.append(name)
-
-    return packages
+def recipe_index() -> RecipeIndex:
+    return load_recipe_index(PKG_DIR)
 
 
-def package_is_built(package_name):
-    return _package_is_built(package_name, pytest.pyodide_dist_dir)
+def registered_packages() -> list[str]:
+    """Returns a list of registered package names"""
+    return list(recipe_index())
+
+
+@pytest.fixture
+def selenium_import(request, runtime: str) -> _BrowserBaseRunner:
+    """The Pyodide runtime for test_import.
+
+    By default every test gets a new runtime from selenium_standalone. With
+    --pooled-runtimes, the tests share the browser (or Node process) of the
+    module, and Pyodide is reloaded after each test so that every package is
+    imported in a fresh interpreter.
+    """
+    if request.config.getoption("pooled_runtimes"):
+        return request.getfixturevalue("selenium_standalone_refresh")
+    return request.getfixturevalue("selenium_standalone")
+
+
+def reload_pyodide(selenium: _BrowserBaseRunner) -> None:
+    """Start over with a fresh Pyodide, like selenium_standalone_refresh does."""
+    selenium.refresh()
+    selenium.load_pyodide()
+    selenium.initialize_pyodide()
+    selenium.save_state()
+    selenium.restore_state()
+
+
+def run_import_profile(
+    selenium: _BrowserBaseRunner, name: str, import_names: list[str]
+) -> dict[str, Any]:
+    """Load a package and profile its imports in Pyodide, see tools/import_profile.py."""
+    load_package_ms = selenium.run_js(
+        f"""
+        const start = performance.now();
+        await pyodide.loadPackage({json.dumps(name)});
+        return performance.now() - start;
+        """
+    )
+    # Run the profiler in its own namespace, where __name__ is not "__main__"
+    source = Path(import_profile.__file__).read_text()
+    profile = json.loads(
+        selenium.run(
+            "\n".join(
+                [
+                    "import json",
+                    "namespace = {'__name__': 'import_profile'}",
+                    f"exec({source!r}, namespace)",
+                    f"json.dumps(namespace['profile_imports']({import_names!r}))",
+                ]
+            )
+        )
+    )
+    return {
+        "package": name,
+        "runtime": selenium.browser,
+        "load_package_ms": round(load_package_ms, 1),
+        **profile,
+    }
 
 
 def test_parse_recipe() -> None:
+    # recipes that fail to parse are left out of the index
+    on_disk = {path.parent.name for path in PKG_DIR.glob("*/meta.yaml")}
+    assert on_disk == set(registered_packages())
+
     for pkg in registered_packages():
         # check that we can parse the meta.yaml
         meta = MetaConfig.from_yaml(PKG_DIR / pkg / "meta.yaml")
@@ -58,30 +119,31 @@ def test_parse_recipe() -> None:
     timer=time.perf_counter,
 )
 def test_import(
-    name: str, selenium_standalone: _BrowserBaseRunner, benchmark: Any
+    name: str,
+    selenium_import: _BrowserBaseRunner,
+    benchmark: Any,
+    request: pytest.FixtureRequest,
 ) -> None:
     if not package_is_built(name):
         raise AssertionError(
             "Implementation error. Test for an unbuilt package "
-            "should have been skipped in selenium_standalone fixture"
+            "should have been skipped in selenium_import fixture"
         )
 
     if name in XFAIL_PACKAGES:
         pytest.xfail(XFAIL_PACKAGES[name])
 
-    meta = MetaConfig.from_yaml(PKG_DIR / name / "meta.yaml")
-
-    if name in UNSUPPORTED_PACKAGES[selenium_standalone.browser]:
+    if name in UNSUPPORTED_PACKAGES[selenium_import.browser]:
         pytest.xfail(
             "{} fails to load and is not supported on {}.".format(
-                name, selenium_standalone.browser
+                name, selenium_import.browser
             )
         )
 
-    selenium_standalone.run("import glob, os, site")
+    selenium_import.run("import glob, os, site")
 
     def _get_file_count(expr):
-        return selenium_standalone.run(
+        return selenium_import.run(
             f"""
             len(list(glob.glob(
                 site.getsitepackages()[0] + '{expr}',
@@ -90,19 +152,60 @@ def test_import(
             """
         )
 
-    import_names = meta.test.imports
-    if not import_names:
-        import_names = meta.package.top_level
+    import_names = recipe_index()[name].import_names
 
     if not import_names:
         # Nothing to test
         return
 
+    import_times = []
+
     def _import_pkg():
+        start = time.perf_counter()
         for import_name in import_names:
-            selenium_standalone.run_async("import %s" % import_name)
-
-    benchmark(_import_pkg)
+            selenium_import.run_async("import %s" % import_name)
+        import_times.append(time.perf_counter() - start)
+
+    profile_dir = request.config.getoption("import_profile")
+    if profile_dir:
+        # Profile the first import of the package instead of benchmarking it,
+        # later imports only look up sys.modules
+        profile = run_import_profile(selenium_import, name, import_names)
+        profile_path = Path(profile_dir) / f"{name}-{selenium_import.browser}.json"
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profile_path.write_text(json.dumps(profile, indent=1) + "\n")
+    else:
+        benchmark(_import_pkg)
+        # Only the first round imports the package, later rounds find it in
+        # sys.modules. Ends up in the JUnit XML report for tools/import_budget.py
+        import_time = round(import_times[0], 4)
+        request.node.user_properties.append(("import_time", import_time))
+
+        if request.config.getoption("import_memory"):
+            # See tools/import_memory.py. tracemalloc slows the import down,
+            # so import the package once more in a fresh Pyodide instead of
+            # measuring the timed import.
+            reload_pyodide(selenium_import)
+            selenium_import.run("import glob, os, site")
+            wasm_memory = selenium_import.run_js("return pyodide._module.HEAP8.length;")
+            selenium_import.run("import tracemalloc; tracemalloc.start()")
+            _import_pkg()
+            wasm_memory_growth = (
+                selenium_import.run_js("return pyodide._module.HEAP8.length;")
+                - wasm_memory
+            )
+            python_heap, python_heap_peak = selenium_import.run(
+                "python_heap = tracemalloc.get_traced_memory()\n"
+                "tracemalloc.stop()\n"
+                "list(python_heap)"
+            )
+            request.node.user_properties.extend(
+                [
+                    ("wasm_memory_growth", wasm_memory_growth),
+                    ("python_heap", python_heap),
+                    ("python_heap_peak", python_heap_peak),
+                ]
+            )
 
     # Make sure that after importing, either .py or .pyc are present but not
     # both
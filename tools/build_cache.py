@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""Content-addressed cache of built recipes.
+
+The cache key of a recipe is a sha256 over everything that goes into its
+build:
+
+- its ``meta.yaml``, ``patches/`` and ``extras/`` files, and the local source
+  tree of recipes that use ``source.path``,
+- the build constraints in ``tools/constraints.txt``,
+- the ``[tool.pyodide.build]`` settings in ``pyproject.toml`` (e.g. the rust
+  toolchain),
+- the toolchain id, taken from the ``EMSCRIPTEN_VERSION`` and
+  ``PYODIDE_BUILD_VERSION`` environment variables or ``--toolchain-id``,
+- the cache keys of its host dependencies.
+
+``save`` stores the ``packages/<name>/dist`` directory of each built recipe
+under its key. ``restore`` copies it back and marks the recipe as packaged,
+so that ``pyodide build-recipes`` skips it and only builds the recipes whose
+inputs changed.
+
+Only ``dist`` is cached, not what a build installs into the build
+environment (the headers and libraries of shared libraries, the cross-build
+files of packages like numpy). A recipe that is rebuilt needs those of its
+host dependencies, so a recipe is only restored if all of its host
+dependencies and host dependents are restored as well. Otherwise the whole
+group is rebuilt.
+
+Static libraries are not cached: pyodide-build installs them straight into
+the shared library directory of the build and leaves nothing in ``dist``.
+So the recipes built on a static library are always rebuilt with it.
+
+Usage::
+
+    python tools/build_cache.py restore "*" --cache-dir ~/.cache/pyodide-recipes
+    pyodide build-recipes "*" --install
+    python tools/build_cache.py save "*" --cache-dir ~/.cache/pyodide-recipes
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tomllib
+from datetime import UTC, datetime
+from pathlib import Path
+
+from parse_build_result import reverse_dependencies
+from recipe_index import BASE_DIR, RecipeIndex, load_recipe_index
+from schedule_build import resolve_targets
+
+RECIPE_DIR = BASE_DIR / "packages"
+CONSTRAINTS_PATH = BASE_DIR / "tools" / "constraints.txt"
+PYPROJECT_PATH = BASE_DIR / "pyproject.toml"
+DEFAULT_CACHE_DIR = BASE_DIR / ".cache" / "build-cache"
+
+# Bump this to invalidate all cache entries, e.g. when the layout changes.
+CACHE_VERSION = 1
+
+
+def _hash_file(h: "hashlib._Hash", path: Path, root: Path) -> None:
+    h.update(path.relative_to(root).as_posix().encode())
+    h.update(b"\0")
+    h.update(path.read_bytes())
+    h.update(b"\0")
+
+
+def recipe_files(recipe_dir: Path, source_path: str | None) -> list[Path]:
+    """The files of a recipe that affect its build."""
+    files = [recipe_dir / "meta.yaml"]
+    dirs = [recipe_dir / "patches", recipe_dir / "extras"]
+    if source_path:
+        # Sources outside of the recipe (e.g. another recipe's build
+        # directory) are covered by the host dependency keys.
+        path = (recipe_dir / source_path).resolve()
+        if path.is_relative_to(recipe_dir.resolve()):
+            dirs.append(path)
+    for directory in dirs:
+        if directory.is_dir():
+            files.extend(p for p in sorted(directory.rglob("*")) if p.is_file())
+    return files
+
+
+def toolchain_settings(
+    constraints_path: Path = CONSTRAINTS_PATH,
+    pyproject_path: Path = PYPROJECT_PATH,
+    toolchain_id: str | None = None,
+) -> bytes:
+    """Serialize the build settings shared by all recipes."""
+    if toolchain_id is None:
+        toolchain_id = "-".join(
+            os.environ.get(var, "")
+            for var in ("EMSCRIPTEN_VERSION", "PYODIDE_BUILD_VERSION")
+        )
+
+    build_settings = {}
+    if pyproject_path.is_file():
+        with pyproject_path.open("rb") as f:
+            pyproject = tomllib.load(f)
+        build_settings = pyproject.get("tool", {}).get("pyodide", {}).get("build", {})
+
+    constraints = constraints_path.read_text() if constraints_path.is_file() else ""
+    return json.dumps(
+        {
+            "cache_version": CACHE_VERSION,
+            "toolchain": toolchain_id,
+            "constraints": constraints,
+            "build": build_settings,
+        },
+        sort_keys=True,
+    ).encode()
+
+
+def compute_keys(
+    packages: set[str], index: RecipeIndex, settings: bytes
+) -> dict[str, str]:
+    """Compute the cache key of ``packages`` and their host dependencies."""
+    keys: dict[str, str] = {}
+
+    def key(name: str) -> str:
+        if name in keys:
+            return keys[name]
+        recipe = index[name]
+        recipe_dir = index.recipe_dir / name
+        h = hashlib.sha256(settings)
+        for path in recipe_files(recipe_dir, recipe.source_path):
+            _hash_file(h, path, recipe_dir)
+        for dep in sorted(set(recipe.host_requirements)):
+            if dep in index:
+                h.update(f"{dep}={key(dep)}\0".encode())
+        keys[name] = h.hexdigest()
+        return keys[name]
+
+    for package in sorted(packages):
+        key(package)
+    return keys
+
+
+class LocalCache:
+    """Cache entries stored as ``<cache_dir>/<key[:2]>/<key>/``."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+
+    def entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def __contains__(self, key: str) -> bool:
+        return (self.entry_path(key) / "entry.json").is_file()
+
+    def store(self, key: str, name: str, version: str, dist_dir: Path) -> bool:
+        """Store the files of ``dist_dir``. Returns False if there was nothing to store."""
+        files = sorted(p for p in dist_dir.iterdir() if p.is_file())
+        if not files:
+            return False
+
+        entry = self.entry_path(key)
+        # Copy to a temporary directory first, so that an interrupted save
+        # never leaves a partial entry behind.
+        tmp = entry.with_name(f"{key}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for path in files:
+            shutil.copy2(path, tmp / path.name)
+        (tmp / "entry.json").write_text(
+            json.dumps(
+                {
+                    "name": name,
+                    "version": version,
+                    "files": [p.name for p in files],
+                    "stored_at": datetime.now(UTC).isoformat(timespec="seconds"),
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        try:
+            tmp.rename(entry)
+        except OSError:
+            # Another process stored the same entry in the meantime.
+            shutil.rmtree(tmp, ignore_errors=True)
+        return True
+
+    def restore(self, key: str, dist_dir: Path) -> list[str]:
+        """Copy the files of an entry into ``dist_dir``."""
+        entry = self.entry_path(key)
+        files = json.loads((entry / "entry.json").read_text())["files"]
+        dist_dir.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            shutil.copy2(entry / name, dist_dir / name)
+        return files
+
+
+def restorable_packages(
+    keys: dict[str, str], index: RecipeIndex, cache: LocalCache
+) -> set[str]:
+    """The cached packages that can be restored without breaking the build.
+
+    A package that is not cached is rebuilt, and so are its host dependents,
+    which pyodide-build rebuilds anyway, and its host dependencies, whose
+    build outputs it needs. That propagates through the host dependency
+    graph.
+    """
+    dependencies = {
+        name: [dep for dep in index[name].host_requirements if dep in keys]
+        for name in keys
+    }
+    dependents = reverse_dependencies(dependencies)
+
+    restorable = {name for name, key in keys.items() if key in cache}
+    pending = [name for name in keys if name not in restorable]
+    while pending:
+        name = pending.pop()
+        for other in (*dependencies[name], *dependents[name]):
+            if other in restorable:
+                restorable.remove(other)
+                pending.append(other)
+    return restorable
+
+
+def restore_packages(
+    keys: dict[str, str], index: RecipeIndex, cache: LocalCache
+) -> tuple[list[str], list[str], list[str]]:
+    """Restore the cached packages that can be restored.
+
+    Returns the restored packages, the packages that are not cached, and the
+    cached packages that have to be rebuilt with them.
+    """
+    restorable = restorable_packages(keys, index, cache)
+    restored, missing, rebuilt = [], [], []
+    for name, key in sorted(keys.items()):
+        if key not in cache:
+            missing.append(name)
+            continue
+        if name not in restorable:
+            rebuilt.append(name)
+            continue
+        recipe_dir = index.recipe_dir / name
+        cache.restore(key, recipe_dir / "dist")
+        # The token pyodide-build checks to skip recipes that are up to date.
+        build_dir = recipe_dir / "build"
+        build_dir.mkdir(exist_ok=True)
+        (build_dir / ".packaged").write_text("\n")
+        restored.append(name)
+    return restored, missing, rebuilt
+
+
+def save_packages(
+    keys: dict[str, str], index: RecipeIndex, cache: LocalCache
+) -> list[str]:
+    """Store the built packages that are not cached yet. Returns the stored packages."""
+    stored = []
+    for name, key in sorted(keys.items()):
+        recipe = index[name]
+        dist_dir = index.recipe_dir / name / "dist"
+        if recipe.build_type == "static_library" or key in cache:
+            continue
+        if not dist_dir.is_dir():
+            continue
+        if cache.store(key, name, recipe.version, dist_dir):
+            stored.append(name)
+    return stored
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "command",
+        choices=["key", "restore", "save"],
+        help="Print the cache keys, restore cached packages or save built packages",
+    )
+    parser.add_argument(
+        "targets",
+        help="Recipes to consider, e.g. 'scipy,tag:core' or '*' (like pyodide build-recipes)",
+    )
+    parser.add_argument(
+        "-d",
+        "--recipe-dir",
+        type=Path,
+        default=RECIPE_DIR,
+        help="The directory containing the recipes",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"The cache directory (default: {DEFAULT_CACHE_DIR.relative_to(BASE_DIR)})",
+    )
+    parser.add_argument(
+        "--toolchain-id",
+        default=None,
+        help="Identifies the compiler toolchain "
+        "(default: $EMSCRIPTEN_VERSION-$PYODIDE_BUILD_VERSION)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    index = load_recipe_index(args.recipe_dir)
+    try:
+        packages = resolve_targets(args.targets, index)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    settings = toolchain_settings(toolchain_id=args.toolchain_id)
+    keys = compute_keys(packages, index, settings)
+    cache = LocalCache(args.cache_dir)
+
+    if args.command == "key":
+        for name, key in sorted(keys.items()):
+            print(f"{name} {key}")
+    elif args.command == "restore":
+        restored, missing, rebuilt = restore_packages(keys, index, cache)
+        print(f"Restored {len(restored)} package(s) from {args.cache_dir}")
+        if missing:
+            print(f"Not cached ({len(missing)}): {', '.join(missing)}")
+        if rebuilt:
+            print(
+                f"Cached, but rebuilt with their host dependencies or dependents "
+                f"({len(rebuilt)}): {', '.join(rebuilt)}"
+            )
+    else:
+        stored = save_packages(keys, index, cache)
+        print(f"Stored {len(stored)} package(s) in {args.cache_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""Historical store of per-package build times.
+
+Each build run is appended as a single JSON line to a history file::
+
+    {"commit": "<sha>", "recorded_at": "<iso date>",
+     "packages": {"<name>": {"version": "<recipe version>", "seconds": <int>}}}
+
+The file is append-only, so it can be cached between CI runs and merged by
+concatenation. The latest run can then be compared against a rolling
+baseline (the median of the previous runs) to find packages whose build time
+regressed, e.g. after a recipe bump.
+"""
+
+import dataclasses
+import json
+import statistics
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+DEFAULT_THRESHOLD = 1.5
+DEFAULT_BASELINE_RUNS = 5
+# Ignore regressions smaller than this; small packages are too noisy.
+DEFAULT_MIN_SECONDS = 60
+
+
+def load_runs(path: Path) -> list[dict[str, Any]]:
+    """Load all recorded runs, oldest first. Broken lines are skipped."""
+    if not path.exists():
+        return []
+
+    runs = []
+    with path.open() as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                # An interrupted append leaves a truncated last line behind.
+                continue
+    return runs
+
+
+def append_run(
+    path: Path,
+    commit: str,
+    results: list[tuple[str, int, str]],
+    versions: dict[str, str],
+) -> dict[str, Any]:
+    """Append the build times of one run to the history file."""
+    run = {
+        "commit": commit,
+        "recorded_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "packages": {
+            package: {"version": versions.get(package, ""), "seconds": seconds}
+            for package, seconds, _ in results
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps(run, separators=(",", ":")) + "\n")
+    return run
+
+
+def median_durations(
+    runs: list[dict[str, Any]], baseline_runs: int = DEFAULT_BASELINE_RUNS
+) -> dict[str, float]:
+    """Median build time of each package over its last ``baseline_runs`` builds."""
+    history: dict[str, list[int]] = {}
+    for run in runs:
+        for package, entry in run.get("packages", {}).items():
+            history.setdefault(package, []).append(entry["seconds"])
+    return {
+        package: statistics.median(seconds[-baseline_runs:])
+        for package, seconds in history.items()
+    }
+
+
+@dataclasses.dataclass
+class Regression:
+    package: str
+    seconds: int
+    baseline: float
+    version: str
+    baseline_version: str
+
+    @property
+    def ratio(self) -> float:
+        return self.seconds / self.baseline
+
+
+def find_regressions(
+    runs: list[dict[str, Any]],
+    results: list[tuple[str, int, str]],
+    versions: dict[str, str],
+    threshold: float = DEFAULT_THRESHOLD,
+    baseline_runs: int = DEFAULT_BASELINE_RUNS,
+    min_seconds: int = DEFAULT_MIN_SECONDS,
+) -> list[Regression]:
+    """Find packages that took ``threshold`` times longer than their baseline.
+
+    The baseline of a package is the median of its build time in the last
+    ``baseline_runs`` runs that built it. Packages without any history are
+    never reported.
+    """
+    history: dict[str, list[tuple[int, str]]] = {}
+    for run in runs:
+        for package, entry in run.get("packages", {}).items():
+            history.setdefault(package, []).append(
+                (entry["seconds"], entry.get("version", ""))
+            )
+
+    regressions = []
+    for package, seconds, _ in results:
+        previous = history.get(package, [])[-baseline_runs:]
+        if not previous:
+            continue
+
+        baseline = statistics.median(s for s, _ in previous)
+        if seconds - baseline < min_seconds:
+            continue
+        if seconds <= baseline * threshold:
+            continue
+
+        regressions.append(
+            Regression(
+                package=package,
+                seconds=seconds,
+                baseline=baseline,
+                version=versions.get(package, ""),
+                baseline_version=previous[-1][1],
+            )
+        )
+
+    return sorted(regressions, key=lambda r: r.seconds - r.baseline, reverse=True)
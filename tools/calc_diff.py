@@ -3,8 +3,11 @@
 import argparse
 import shutil
 import subprocess as sp
+from collections import deque
 from pathlib import Path
 
+from recipe_index import load_recipe_index
+
 BASE_DIR = Path(__file__).parent.parent
 RECIPE_DIR = Path(__file__).parent.parent / "packages"
 
@@ -40,6 +43,23 @@ def parse_args() -> argparse.Namespace:
         type=str,
         default=",",
     )
+    parser.add_argument(
+        "--include-dependents",
+        help="Also emit every recipe that transitively depends on a changed recipe",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-depth",
+        help="Maximum number of dependency edges to follow (default: unlimited)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--dependents-tag",
+        help="Only emit dependents carrying this tag (can be given multiple times)",
+        action="append",
+        default=[],
+    )
     return parser.parse_args()
 
 
@@ -49,6 +69,47 @@ def check_requirements():
         exit(1)
 
 
+def load_reverse_dependencies(
+    recipe_dir: Path,
+) -> tuple[dict[str, set[str]], dict[str, set[str]]]:
+    """Build the reverse dependency graph of all recipes in ``recipe_dir``.
+
+    Returns a mapping from each package to the packages that list it in
+    ``requirements.host`` or ``requirements.run``, and a mapping from each
+    package to its tags.
+    """
+    index = load_recipe_index(recipe_dir)
+    tags = {recipe.name: set(recipe.tags) for recipe in index.values()}
+    return index.dependents(), tags
+
+
+def find_dependents(
+    packages: set[str],
+    dependents: dict[str, set[str]],
+    max_depth: int | None = None,
+) -> set[str]:
+    """Return the transitive set of packages that depend on ``packages``.
+
+    The packages themselves are not included in the result unless they
+    depend on each other. ``max_depth`` limits how many edges are followed.
+    """
+    found: set[str] = set()
+    queue = deque((pkg, 0) for pkg in packages)
+    seen = set(packages)
+    while queue:
+        pkg, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+
+        for dependent in dependents.get(pkg, ()):
+            found.add(dependent)
+            if dependent not in seen:
+                seen.add(dependent)
+                queue.append((dependent, depth + 1))
+
+    return found
+
+
 def main():
     check_requirements()
 
@@ -95,7 +156,16 @@ def main():
 
         packages.add(f.name)
 
-    # 4. print the list of packages
+    # 4. optionally add every recipe that (transitively) depends on a changed one
+    if args.include_dependents and packages:
+        dependents, tags = load_reverse_dependencies(recipe_dir)
+        extra = find_dependents(packages, dependents, args.max_depth)
+        if args.dependents_tag:
+            wanted = set(args.dependents_tag)
+            extra = {pkg for pkg in extra if tags.get(pkg, set()) & wanted}
+        packages |= extra
+
+    # 5. print the list of packages
     if packages:
         print(args.separator.join(packages))
 
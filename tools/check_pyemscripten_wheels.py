@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.13"
 # dependencies = [
+#     "packaging",
 #     "ruamel.yaml",
 # ]
 # ///
@@ -18,10 +19,17 @@ This script does three things:
    whether the project publishes at least one wheel whose platform tag matches
    the PEP 783 ``pyemscripten`` series, i.e. the regular expression
    ``pyemscripten_[0-9]+_[0-9]+_wasm32`` (see https://peps.python.org/pep-0783/).
+   The responses are cached on disk with their ``ETag`` / ``Last-Modified``
+   headers, so later runs only download the projects whose index changed.
 
 3. Optionally (``--update-issue``) it creates or updates a GitHub issue that
    tracks which packages now have an upstream ``pyemscripten`` wheel on PyPI, so
    that those recipes can eventually be removed from this repository.
+   The issue is left alone when the rendered report did not change.
+
+With ``--state``, the report of the previous run is reused for the recipes
+whose version and PyPI index did not change, and the changes since that run
+are summarized (``--output-diff``).
 
 Run it directly with ``uv`` (no manual dependency installation needed)::
 
@@ -32,17 +40,24 @@ Dependencies are declared in the PEP 723 inline-script metadata block above.
 import argparse
 import concurrent.futures
 import dataclasses
+import hashlib
+import http.client
 import json
 import os
 import re
 import sys
+import threading
+import time
 import urllib.error
+import urllib.parse
 import urllib.request
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
-from ruamel.yaml import YAML
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+from packaging.version import InvalidVersion, Version
+from recipe_index import load_recipe_index
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 RECIPE_DIR = BASE_DIR / "packages"
@@ -53,9 +68,17 @@ PEP783_PLATFORM_RE = re.compile(r"pyemscripten_[0-9]+_[0-9]+_wasm32")
 # A wheel filename embeds platform tags in its last "-" separated component(s),
 # e.g. ``numpy-2.4.3-cp314-cp314-pyemscripten_2026_0_wasm32.whl``.
 PEP783_WHEEL_RE = re.compile(r"pyemscripten_[0-9]+_[0-9]+_wasm32(?=[.\-])")
+PEP783_PLATFORM_PARTS_RE = re.compile(r"pyemscripten_([0-9]+)_([0-9]+)_wasm32")
+
+# The interpreter and platform the recipes are currently built for. Only
+# upstream wheels for these make a recipe redundant.
+DEFAULT_TARGET_PYTHON = "cp314"
+DEFAULT_TARGET_PLATFORM = "pyemscripten_2026_0_wasm32"
 
-PYPI_SIMPLE_URL = "https://pypi.org/simple/{name}/"
+PYPI_SIMPLE_URL = "https://pypi.org/simple/"
 PYPI_SIMPLE_ACCEPT = "application/vnd.pypi.simple.v1+json"
+# ETag / Last-Modified cache of the Simple API responses, kept between runs.
+DEFAULT_HTTP_CACHE = BASE_DIR / ".cache" / "pypi-simple"
 
 GITHUB_API = "https://api.github.com"
 
@@ -63,18 +86,12 @@ DEFAULT_ISSUE_TITLE = "Tracking: packages with upstream pyemscripten wheels on P
 DEFAULT_ISSUE_LABEL = "pyemscripten-wheel-tracker"
 # Hidden marker so we can reliably find the issue we previously created.
 ISSUE_MARKER = "<!-- pyemscripten-wheel-tracker:do-not-remove -->"
+# Hash of the rendered report, used to skip updates that would not change the issue.
+CONTENT_HASH_MARKER = "<!-- pyemscripten-wheel-tracker:content-hash={} -->"
 
 USER_AGENT = "pyodide-recipes-pyemscripten-checker/1.0"
 
 
-def _load_yaml(path: Path) -> dict[str, Any]:
-    with path.open() as f:
-        data = YAML(typ="safe").load(f)
-    if not isinstance(data, dict):
-        raise ValueError(f"{path}: meta.yaml did not parse to a mapping")
-    return data
-
-
 @dataclasses.dataclass
 class Recipe:
     recipe_name: str
@@ -96,34 +113,17 @@ class Recipe:
         return self.build_type == "package"
 
 
-def load_recipe(meta_path: Path) -> Recipe | None:
-    """Load a single recipe; returns ``None`` if it cannot be parsed."""
-    try:
-        meta = _load_yaml(meta_path)
-    except Exception as exc:  # noqa: BLE001 - we want to skip broken recipes
-        print(f"WARNING: failed to parse {meta_path}: {exc}", file=sys.stderr)
-        return None
-
-    package = meta.get("package") or {}
-    source = meta.get("source") or {}
-    build = meta.get("build") or {}
-
-    return Recipe(
-        recipe_name=meta_path.parent.name,
-        package_name=package.get("name") or meta_path.parent.name,
-        version=str(package.get("version", "")),
-        source_url=source.get("url"),
-        build_type=str(build.get("type", "package")),
-    )
-
-
 def iter_recipes(packages_dir: Path) -> list[Recipe]:
-    recipes: list[Recipe] = []
-    for meta_path in sorted(packages_dir.glob("*/meta.yaml")):
-        recipe = load_recipe(meta_path)
-        if recipe is not None:
-            recipes.append(recipe)
-    return recipes
+    return [
+        Recipe(
+            recipe_name=info.name,
+            package_name=info.package_name,
+            version=info.version,
+            source_url=info.source_url,
+            build_type=info.build_type,
+        )
+        for info in load_recipe_index(packages_dir).values()
+    ]
 
 
 @dataclasses.dataclass
@@ -133,27 +133,277 @@ class PyPIResult:
     platform_tags: list[str]
     wheel_versions: list[str]
     error: str | None = None
+    compatible_wheels: list[str] = dataclasses.field(default_factory=list)
 
 
-def _http_get_json(
-    url: str, accept: str, timeout: float, retries: int = 3
-) -> tuple[int, Any]:
-    last_exc: Exception | None = None
-    for _attempt in range(retries):
-        request = urllib.request.Request(  # noqa: S310 - https URL, fixed scheme
-            url, headers={"Accept": accept, "User-Agent": USER_AGENT}
+@dataclasses.dataclass(frozen=True)
+class WheelInfo:
+    """One pyemscripten tag of a wheel filename."""
+
+    filename: str
+    version: str
+    python: str
+    abi: str
+    platform: str
+    abi_year: int
+    abi_patch: int
+
+
+def parse_pyemscripten_wheel(filename: str) -> list[WheelInfo]:
+    """Parse the pyemscripten tags of a wheel filename.
+
+    Compressed tag sets (e.g. ``cp312.cp313``) are expanded, so a wheel can
+    yield several entries. Invalid filenames and wheels for other platforms
+    yield none.
+    """
+    try:
+        _, version, _, tags = parse_wheel_filename(filename)
+    except InvalidWheelFilename:
+        return []
+
+    wheels = []
+    for tag in tags:
+        match = PEP783_PLATFORM_PARTS_RE.fullmatch(tag.platform)
+        if match is None:
+            continue
+        wheels.append(
+            WheelInfo(
+                filename=filename,
+                version=str(version),
+                python=tag.interpreter,
+                abi=tag.abi,
+                platform=tag.platform,
+                abi_year=int(match.group(1)),
+                abi_patch=int(match.group(2)),
+            )
         )
+    return sorted(wheels, key=lambda w: (w.python, w.abi, w.platform))
+
+
+def _python_minor(python_tag: str) -> int | None:
+    """Minor version of a ``cp3XY`` / ``py3XY`` tag."""
+    if python_tag[:3] in ("cp3", "py3") and python_tag[3:].isdigit():
+        return int(python_tag[3:])
+    return None
+
+
+@dataclasses.dataclass(frozen=True)
+class WheelTarget:
+    """The Python version and pyemscripten ABI the recipes are built for."""
+
+    python: str = DEFAULT_TARGET_PYTHON
+    platform: str = DEFAULT_TARGET_PLATFORM
+
+    def accepts(self, wheel: WheelInfo) -> bool:
+        """Whether the wheel can be installed on the target runtime."""
+        if wheel.platform != self.platform:
+            return False
+        if wheel.abi == self.python:
+            return wheel.python == self.python
+        target_minor = _python_minor(self.python)
+        wheel_minor = _python_minor(wheel.python)
+        if wheel.abi == "abi3":
+            # The stable ABI of older CPython versions works with newer ones
+            return (
+                wheel.python.startswith("cp3")
+                and wheel_minor is not None
+                and target_minor is not None
+                and wheel_minor <= target_minor
+            )
+        if wheel.abi == "none":
+            return wheel.python == "py3" or wheel.python == self.python
+        return False
+
+    def to_dict(self) -> dict[str, str]:
+        return dataclasses.asdict(self)
+
+
+DEFAULT_TARGET = WheelTarget()
+
+
+def same_version(a: str, b: str) -> bool:
+    """Compare versions as PEP 440 versions, e.g. ``1.0 == 1.0.0``."""
+    try:
+        return Version(a) == Version(b)
+    except InvalidVersion:
+        return a == b
+
+
+class HTTPClient:
+    """A small keep-alive HTTP client for the PyPI Simple API.
+
+    Each worker thread keeps one persistent connection per host, so the TLS
+    handshake is done once per thread instead of once per request. Failed
+    requests (connection errors, 429 and 5xx responses) are retried with
+    exponential backoff. When ``cache_dir`` is given, responses are stored
+    with their ``ETag`` / ``Last-Modified`` validators and later requests for
+    the same URL are conditional, so unchanged projects come back as a small
+    ``304 Not Modified``.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        cache_dir: Path | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache_dir = cache_dir
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[http.client.HTTPConnection] = []
+        self.stats = {"downloaded": 0, "not_modified": 0, "retried": 0}
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            cls = (
+                http.client.HTTPSConnection
+                if scheme == "https"
+                else http.client.HTTPConnection
+            )
+            conn = cls(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        conn = getattr(self._local, "connections", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        """Close the connections of all threads."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _cache_path(self, url: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _load_cached(self, url: str) -> dict[str, Any] | None:
+        path = self._cache_path(url)
+        if path is None or not path.is_file():
+            return None
         try:
-            with urllib.request.urlopen(request, timeout=timeout) as response:  # noqa: S310
-                payload = response.read().decode("utf-8")
-            return response.status, json.loads(payload)
-        except urllib.error.HTTPError as exc:
-            if exc.code == 404:
+            cached = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        return cached if cached.get("url") == url else None
+
+    def _store_cached(
+        self, url: str, headers: http.client.HTTPMessage, body: str
+    ) -> None:
+        path = self._cache_path(url)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if path is None or not (etag or last_modified):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "body": body,
+                }
+            )
+        )
+        os.replace(tmp_path, path)
+
+    def _request(
+        self, url: str, headers: dict[str, str]
+    ) -> tuple[int, http.client.HTTPMessage, bytes, str]:
+        """GET ``url``, following redirects. Returns the final URL as well."""
+        for _redirect in range(5):
+            parts = urllib.parse.urlsplit(url)
+            target = parts.path or "/"
+            if parts.query:
+                target += f"?{parts.query}"
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # Keep-alive connections may be closed by the server at any
+                # time; start over with a fresh one on the next attempt.
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise
+            if response.will_close:
+                self._drop_connection(parts.scheme, parts.netloc)
+            if response.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, response.headers["Location"])
+                continue
+            return response.status, response.headers, body, url
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def get_json(self, url: str, accept: str) -> tuple[int, Any]:
+        """GET and decode a JSON document.
+
+        Returns the status and the data. A 304 status means that the data
+        came from the cache because it did not change since it was cached.
+        """
+        cached = self._load_cached(url)
+        headers = {"Accept": accept, "User-Agent": USER_AGENT}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        last_error: str = ""
+        for attempt in range(self.retries):
+            if attempt:
+                self._count("retried")
+                time.sleep(min(self.backoff * 2 ** (attempt - 1), self.max_backoff))
+            try:
+                status, response_headers, body, _ = self._request(url, headers)
+            except (http.client.HTTPException, OSError) as exc:
+                last_error = str(exc) or type(exc).__name__
+                continue
+
+            if status == 304 and cached is not None:
+                self._count("not_modified")
+                return 304, json.loads(cached["body"])
+            if status == 404:
                 return 404, None
-            last_exc = exc
-        except (urllib.error.URLError, TimeoutError, json.JSONDecodeError) as exc:
-            last_exc = exc
-    raise RuntimeError(f"GET {url} failed after {retries} attempts: {last_exc}")
+            if status == 429 or status >= 500:
+                last_error = f"HTTP {status}"
+                continue
+            if status != 200:
+                raise RuntimeError(f"GET {url} failed: HTTP {status}")
+
+            try:
+                text = body.decode("utf-8")
+                data = json.loads(text)
+            except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+                last_error = str(exc)
+                continue
+            self._count("downloaded")
+            self._store_cached(url, response_headers, text)
+            return status, data
+        raise RuntimeError(
+            f"GET {url} failed after {self.retries} attempts: {last_error}"
+        )
 
 
 def _version_from_wheel(filename: str) -> str:
@@ -167,18 +417,18 @@ def _version_from_wheel(filename: str) -> str:
     return ""
 
 
-def check_pypi_for_pyemscripten(name: str, timeout: float) -> PyPIResult:
-    """Query the PyPI Simple JSON API for ``name`` and look for pyemscripten wheels."""
-    url = PYPI_SIMPLE_URL.format(name=name)
-    try:
-        status, data = _http_get_json(url, PYPI_SIMPLE_ACCEPT, timeout)
-    except RuntimeError as exc:
-        return PyPIResult(False, [], [], [], error=str(exc))
-
-    if status == 404 or data is None:
-        return PyPIResult(False, [], [], [], error="not found on PyPI")
+def scan_simple_index(
+    data: dict[str, Any],
+    version: str | None = None,
+    target: WheelTarget | None = None,
+) -> PyPIResult:
+    """Look for pyemscripten wheels in a PyPI Simple JSON API project page.
 
+    With ``version`` and ``target``, also collect the wheels for exactly that
+    version that can be installed on the target runtime.
+    """
     matching_wheels: list[str] = []
+    compatible_wheels: list[str] = []
     platform_tags: set[str] = set()
     wheel_versions: set[str] = set()
 
@@ -187,19 +437,57 @@ def check_pypi_for_pyemscripten(name: str, timeout: float) -> PyPIResult:
         if not filename.endswith(".whl"):
             continue
         tag_match = PEP783_WHEEL_RE.search(filename)
-        if tag_match:
-            matching_wheels.append(filename)
+        if not tag_match:
+            continue
+        matching_wheels.append(filename)
+        wheels = parse_pyemscripten_wheel(filename)
+        if not wheels:
+            # Not a valid wheel filename, fall back to the raw components
             platform_tags.add(tag_match.group(0))
             wheel_versions.add(_version_from_wheel(filename))
+            continue
+        platform_tags.update(w.platform for w in wheels)
+        wheel_versions.add(wheels[0].version)
+        if (
+            version is not None
+            and target is not None
+            and same_version(wheels[0].version, version)
+            and any(target.accepts(w) for w in wheels)
+        ):
+            compatible_wheels.append(filename)
 
     return PyPIResult(
         found=bool(matching_wheels),
         matching_wheels=sorted(matching_wheels),
         platform_tags=sorted(platform_tags),
         wheel_versions=sorted(wheel_versions),
+        compatible_wheels=sorted(compatible_wheels),
     )
 
 
+def _fetch_simple_index(
+    name: str, client: HTTPClient, index_url: str
+) -> tuple[int, Any, str | None]:
+    url = f"{index_url.rstrip('/')}/{name}/"
+    try:
+        status, data = client.get_json(url, PYPI_SIMPLE_ACCEPT)
+    except RuntimeError as exc:
+        return 0, None, str(exc)
+    if status == 404 or data is None:
+        return status, None, "not found on PyPI"
+    return status, data, None
+
+
+def check_pypi_for_pyemscripten(
+    name: str, client: HTTPClient, index_url: str = PYPI_SIMPLE_URL
+) -> PyPIResult:
+    """Query the PyPI Simple JSON API for ``name`` and look for pyemscripten wheels."""
+    _, data, error = _fetch_simple_index(name, client, index_url)
+    if error is not None:
+        return PyPIResult(False, [], [], [], error=error)
+    return scan_simple_index(data)
+
+
 @dataclasses.dataclass
 class PackageStatus:
     recipe: str
@@ -209,66 +497,192 @@ class PackageStatus:
     matching_wheels: list[str]
     platform_tags: list[str]
     wheel_versions: list[str]
+    # A wheel for exactly the recipe version and the target ABI
+    has_compatible_wheel: bool
+    compatible_wheels: list[str]
     error: str | None
 
     def to_dict(self) -> dict[str, Any]:
         return dataclasses.asdict(self)
 
 
+def check_recipe(
+    recipe: Recipe,
+    client: HTTPClient,
+    index_url: str = PYPI_SIMPLE_URL,
+    previous: dict[str, Any] | None = None,
+    target: WheelTarget = DEFAULT_TARGET,
+) -> tuple[PackageStatus, bool]:
+    """Compute the status of one recipe.
+
+    ``previous`` is the entry of the recipe in the previous report. It is
+    reused when neither the recipe nor its PyPI index changed since then.
+    Returns the status and whether it was reused.
+    """
+    status, data, error = _fetch_simple_index(recipe.package_name, client, index_url)
+    if (
+        status == 304
+        and previous is not None
+        and previous["pypi_name"] == recipe.package_name
+        and previous["recipe_version"] == recipe.version
+        and previous["error"] is None
+    ):
+        return PackageStatus(**previous), True
+
+    if error is not None:
+        result = PyPIResult(False, [], [], [], error=error)
+    else:
+        result = scan_simple_index(data, recipe.version, target)
+    return (
+        PackageStatus(
+            recipe=recipe.recipe_name,
+            pypi_name=recipe.package_name,
+            recipe_version=recipe.version,
+            has_pyemscripten_wheel=result.found,
+            matching_wheels=result.matching_wheels,
+            platform_tags=result.platform_tags,
+            wheel_versions=result.wheel_versions,
+            has_compatible_wheel=bool(result.compatible_wheels),
+            compatible_wheels=result.compatible_wheels,
+            error=result.error,
+        ),
+        False,
+    )
+
+
 def build_report(
-    recipes: list[Recipe], max_workers: int, timeout: float
+    recipes: list[Recipe],
+    max_workers: int,
+    client: HTTPClient,
+    index_url: str = PYPI_SIMPLE_URL,
+    previous: dict[str, Any] | None = None,
+    target: WheelTarget = DEFAULT_TARGET,
 ) -> dict[str, Any]:
+    """Check all source-built recipes.
+
+    With the ``previous`` report, only the recipes whose version or PyPI
+    index changed since then are recomputed.
+    """
     source_recipes = [r for r in recipes if r.is_source_built]
+    previous_packages = {}
+    if previous is not None and previous.get("target") == target.to_dict():
+        previous_packages = {p["recipe"]: p for p in previous.get("packages", [])}
 
     statuses: list[PackageStatus] = []
+    reused = 0
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_recipe = {
-            executor.submit(check_pypi_for_pyemscripten, r.package_name, timeout): r
-            for r in source_recipes
-        }
-        for future in concurrent.futures.as_completed(future_to_recipe):
-            recipe = future_to_recipe[future]
-            result = future.result()
-            statuses.append(
-                PackageStatus(
-                    recipe=recipe.recipe_name,
-                    pypi_name=recipe.package_name,
-                    recipe_version=recipe.version,
-                    has_pyemscripten_wheel=result.found,
-                    matching_wheels=result.matching_wheels,
-                    platform_tags=result.platform_tags,
-                    wheel_versions=result.wheel_versions,
-                    error=result.error,
-                )
+        futures = [
+            executor.submit(
+                check_recipe,
+                r,
+                client,
+                index_url,
+                previous_packages.get(r.recipe_name),
+                target,
             )
+            for r in source_recipes
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            status, was_reused = future.result()
+            statuses.append(status)
+            reused += was_reused
+
+    if previous is not None:
+        print(f"Reused the status of {reused} unchanged recipe(s).", file=sys.stderr)
 
     statuses.sort(key=lambda s: s.recipe.lower())
     available = [s for s in statuses if s.has_pyemscripten_wheel]
+    compatible = [s for s in statuses if s.has_compatible_wheel]
 
     return {
         "generated_at": datetime.now(UTC).isoformat(),
         "pep783_platform_regex": PEP783_PLATFORM_RE.pattern,
+        "target": target.to_dict(),
         "total_recipes": len(recipes),
         "total_source_recipes": len(source_recipes),
         "available_count": len(available),
+        "compatible_count": len(compatible),
         "packages": [s.to_dict() for s in statuses],
     }
 
 
+def diff_reports(previous: dict[str, Any], report: dict[str, Any]) -> dict[str, Any]:
+    """Compare two reports.
+
+    - ``newly_available``: recipes that gained a compatible upstream wheel,
+    - ``newly_missing``: recipes that lost it, or were removed,
+    - ``version_drift``: recipes whose version or upstream wheel versions changed.
+    """
+    old = {p["recipe"]: p for p in previous.get("packages", [])}
+    new = {p["recipe"]: p for p in report.get("packages", [])}
+
+    def available(packages: dict[str, Any], name: str) -> bool:
+        return name in packages and packages[name].get("has_compatible_wheel", False)
+
+    drift = []
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        if (
+            before["recipe_version"] != after["recipe_version"]
+            or before["wheel_versions"] != after["wheel_versions"]
+        ):
+            drift.append(
+                {
+                    "recipe": name,
+                    "recipe_version": [
+                        before["recipe_version"],
+                        after["recipe_version"],
+                    ],
+                    "wheel_versions": [
+                        before["wheel_versions"],
+                        after["wheel_versions"],
+                    ],
+                }
+            )
+
+    return {
+        "previous_generated_at": previous.get("generated_at"),
+        "generated_at": report.get("generated_at"),
+        "newly_available": sorted(
+            n for n in new if available(new, n) and not available(old, n)
+        ),
+        "newly_missing": sorted(
+            n for n in old if available(old, n) and not available(new, n)
+        ),
+        "version_drift": drift,
+    }
+
+
+def content_hash(report: dict[str, Any]) -> str:
+    """Hash of the rendered report, ignoring when it was generated."""
+    body = _render_body({**report, "generated_at": ""})
+    return hashlib.sha256("\n".join(body).encode()).hexdigest()
+
+
 def render_markdown(report: dict[str, Any]) -> str:
+    lines = [ISSUE_MARKER, CONTENT_HASH_MARKER.format(content_hash(report)), ""]
+    return "\n".join(lines + _render_body(report))
+
+
+def _render_body(report: dict[str, Any]) -> list[str]:
     generated = report["generated_at"]
     total_source = report["total_source_recipes"]
     available = report["available_count"]
+    compatible = report["compatible_count"]
+    target = report["target"]
     packages: list[dict[str, Any]] = report["packages"]
 
-    available_pkgs = [p for p in packages if p["has_pyemscripten_wheel"]]
+    compatible_pkgs = [p for p in packages if p["has_compatible_wheel"]]
+    mismatched_pkgs = [
+        p
+        for p in packages
+        if p["has_pyemscripten_wheel"] and not p["has_compatible_wheel"]
+    ]
     errored_pkgs = [
         p for p in packages if not p["has_pyemscripten_wheel"] and p["error"] and p["error"] != "not found on PyPI"
     ]
 
     lines: list[str] = []
-    lines.append(ISSUE_MARKER)
-    lines.append("")
     lines.append(
         "This issue is automatically maintained by "
         "[`tools/check_pyemscripten_wheels.py`](../blob/main/tools/check_pyemscripten_wheels.py)."
@@ -277,34 +691,58 @@ def render_markdown(report: dict[str, Any]) -> str:
     lines.append(
         "It tracks **source-built** recipes in this repository whose upstream "
         "project now publishes a [PEP 783](https://peps.python.org/pep-0783/) "
-        "`pyemscripten` wheel on PyPI. Once a package ships such a wheel upstream, "
-        "the recipe here can usually be removed."
+        "`pyemscripten` wheel on PyPI. Once a package ships such a wheel upstream "
+        "for the recipe version and the ABI we build for, the recipe here can "
+        "usually be removed."
     )
     lines.append("")
     lines.append(f"- **Last updated:** {generated}")
     lines.append(f"- **Source-built recipes scanned:** {total_source}")
     lines.append(f"- **Recipes with an upstream `pyemscripten` wheel:** {available}")
+    lines.append(
+        f"- **... for the recipe version and `{target['python']}` / "
+        f"`{target['platform']}`:** {compatible}"
+    )
     lines.append(f"- **Platform tag pattern:** `{report['pep783_platform_regex']}`")
     lines.append("")
 
-    lines.append("## Candidates for removal (pyemscripten wheel available on PyPI)")
+    lines.append("## Candidates for removal (compatible wheel available on PyPI)")
+    lines.append("")
+    if compatible_pkgs:
+        lines.append("| Recipe | PyPI | Recipe version | Compatible wheel(s) |")
+        lines.append("| --- | --- | --- | --- |")
+        for pkg in compatible_pkgs:
+            pypi_link = f"[{pkg['pypi_name']}](https://pypi.org/project/{pkg['pypi_name']}/)"
+            wheels = "<br>".join(f"`{w}`" for w in pkg["compatible_wheels"])
+            lines.append(
+                f"| `{pkg['recipe']}` | {pypi_link} | {pkg['recipe_version']} "
+                f"| {wheels} |"
+            )
+    else:
+        lines.append("_None yet._")
     lines.append("")
-    if available_pkgs:
+
+    if mismatched_pkgs:
+        lines.append(
+            "## Upstream pyemscripten wheels for another version or ABI "
+            f"({len(mismatched_pkgs)})"
+        )
+        lines.append("")
         lines.append(
             "| Recipe | PyPI | Recipe version | Wheel version(s) | Platform tag(s) |"
         )
         lines.append("| --- | --- | --- | --- | --- |")
-        for pkg in available_pkgs:
-            pypi_link = f"[{pkg['pypi_name']}](https://pypi.org/project/{pkg['pypi_name']}/)"
+        for pkg in mismatched_pkgs:
+            pypi_link = (
+                f"[{pkg['pypi_name']}](https://pypi.org/project/{pkg['pypi_name']}/)"
+            )
             wheel_versions = ", ".join(pkg["wheel_versions"]) or "—"
             platform_tags = "<br>".join(f"`{t}`" for t in pkg["platform_tags"]) or "—"
             lines.append(
                 f"| `{pkg['recipe']}` | {pypi_link} | {pkg['recipe_version']} "
                 f"| {wheel_versions} | {platform_tags} |"
             )
-    else:
-        lines.append("_None yet._")
-    lines.append("")
+        lines.append("")
 
     lines.append(
         f"<details><summary>Recipes still without an upstream pyemscripten wheel "
@@ -334,7 +772,7 @@ def render_markdown(report: dict[str, Any]) -> str:
         )
         lines.append("")
 
-    return "\n".join(lines)
+    return lines
 
 
 def _github_request(
@@ -382,7 +820,7 @@ def _ensure_label(repo: str, token: str, label: str) -> None:
         print(f"WARNING: could not ensure label {label!r} (HTTP {status})", file=sys.stderr)
 
 
-def _find_tracker_issue(repo: str, token: str, label: str) -> int | None:
+def _find_tracker_issue(repo: str, token: str, label: str) -> dict[str, Any] | None:
     # Listing by our own label is immediate and reliable (no search index delay).
     status, issues = _github_request(
         "GET", f"/repos/{repo}/issues?state=all&labels={label}&per_page=100", token
@@ -394,21 +832,29 @@ def _find_tracker_issue(repo: str, token: str, label: str) -> int | None:
         if "pull_request" in issue:
             continue
         if ISSUE_MARKER in (issue.get("body") or ""):
-            return int(issue["number"])
+            return issue
     # Fall back to the first non-PR issue carrying the label.
     for issue in issues:
         if "pull_request" not in issue:
-            return int(issue["number"])
+            return issue
+    return None
+
+
+def _content_hash_line(body: str) -> str | None:
+    prefix = CONTENT_HASH_MARKER.split("{}", maxsplit=1)[0]
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return line
     return None
 
 
 def update_github_issue(
     repo: str, token: str, title: str, label: str, body: str
 ) -> None:
-    _ensure_label(repo, token, label)
-    issue_number = _find_tracker_issue(repo, token, label)
+    issue = _find_tracker_issue(repo, token, label)
 
-    if issue_number is None:
+    if issue is None:
+        _ensure_label(repo, token, label)
         status, data = _github_request(
             "POST",
             f"/repos/{repo}/issues",
@@ -419,19 +865,30 @@ def update_github_issue(
             print(f"Created tracker issue #{data['number']}: {data['html_url']}")
         else:
             raise RuntimeError(f"Failed to create issue (HTTP {status}): {data}")
+        return
+
+    issue_number = int(issue["number"])
+    content_hash_line = _content_hash_line(body)
+    if (
+        issue.get("title") == title
+        and content_hash_line is not None
+        and content_hash_line == _content_hash_line(issue.get("body") or "")
+    ):
+        print(f"Tracker issue #{issue_number} is up to date, not updating it.")
+        return
+
+    status, data = _github_request(
+        "PATCH",
+        f"/repos/{repo}/issues/{issue_number}",
+        token,
+        {"title": title, "body": body},
+    )
+    if status == 200:
+        print(f"Updated tracker issue #{issue_number}: {data['html_url']}")
     else:
-        status, data = _github_request(
-            "PATCH",
-            f"/repos/{repo}/issues/{issue_number}",
-            token,
-            {"title": title, "body": body},
+        raise RuntimeError(
+            f"Failed to update issue #{issue_number} (HTTP {status}): {data}"
         )
-        if status == 200:
-            print(f"Updated tracker issue #{issue_number}: {data['html_url']}")
-        else:
-            raise RuntimeError(
-                f"Failed to update issue #{issue_number} (HTTP {status}): {data}"
-            )
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -449,6 +906,20 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Write the full machine-readable status report to this JSON file.",
     )
+    parser.add_argument(
+        "--state",
+        type=Path,
+        default=None,
+        help="Report of the previous run. Only recipes whose version or PyPI "
+        "index changed since then are recomputed, and the file is replaced by "
+        "the new report.",
+    )
+    parser.add_argument(
+        "--output-diff",
+        type=Path,
+        default=None,
+        help="Write the changes since the --state report to this JSON file.",
+    )
     parser.add_argument(
         "--output-markdown",
         type=Path,
@@ -467,6 +938,41 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=30.0,
         help="Per-request timeout in seconds (default: 30).",
     )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help="Attempts per request, with exponential backoff (default: 4).",
+    )
+    parser.add_argument(
+        "--target-python",
+        default=DEFAULT_TARGET_PYTHON,
+        help="Python tag the recipes are built for "
+        f"(default: {DEFAULT_TARGET_PYTHON}).",
+    )
+    parser.add_argument(
+        "--target-platform",
+        default=DEFAULT_TARGET_PLATFORM,
+        help="pyemscripten platform tag the recipes are built for "
+        f"(default: {DEFAULT_TARGET_PLATFORM}).",
+    )
+    parser.add_argument(
+        "--index-url",
+        default=PYPI_SIMPLE_URL,
+        help=f"Base URL of the Simple API (default: {PYPI_SIMPLE_URL}).",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=Path,
+        default=DEFAULT_HTTP_CACHE,
+        help="Directory for the ETag/Last-Modified cache of the Simple API "
+        "responses (default: ./.cache/pypi-simple).",
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Do not use or update the HTTP cache.",
+    )
     parser.add_argument(
         "--update-issue",
         action="store_true",
@@ -505,19 +1011,64 @@ def main(argv: list[str] | None = None) -> int:
         file=sys.stderr,
     )
 
-    report = build_report(recipes, max_workers=args.max_workers, timeout=args.timeout)
+    previous = None
+    if args.state is not None and args.state.is_file():
+        try:
+            previous = json.loads(args.state.read_text())
+        except (OSError, ValueError) as exc:
+            print(
+                f"WARNING: ignoring broken state {args.state}: {exc}", file=sys.stderr
+            )
+
+    client = HTTPClient(
+        timeout=args.timeout,
+        retries=args.retries,
+        cache_dir=None if args.no_http_cache else args.http_cache,
+    )
+    try:
+        report = build_report(
+            recipes,
+            args.max_workers,
+            client,
+            index_url=args.index_url,
+            previous=previous,
+            target=WheelTarget(args.target_python, args.target_platform),
+        )
+    finally:
+        client.close()
+    print(
+        f"PyPI: {client.stats['downloaded']} downloaded, "
+        f"{client.stats['not_modified']} not modified, "
+        f"{client.stats['retried']} retried request(s).",
+        file=sys.stderr,
+    )
     markdown = render_markdown(report)
 
     if args.output_json:
         args.output_json.write_text(json.dumps(report, indent=2) + "\n")
         print(f"Wrote JSON report to {args.output_json}", file=sys.stderr)
+    if args.state is not None:
+        args.state.parent.mkdir(parents=True, exist_ok=True)
+        args.state.write_text(json.dumps(report, indent=2) + "\n")
+    if previous is not None:
+        diff = diff_reports(previous, report)
+        print(
+            f"Since the previous run: {len(diff['newly_available'])} newly available, "
+            f"{len(diff['newly_missing'])} newly missing, "
+            f"{len(diff['version_drift'])} with version changes.",
+            file=sys.stderr,
+        )
+        if args.output_diff:
+            args.output_diff.write_text(json.dumps(diff, indent=2) + "\n")
+            print(f"Wrote diff to {args.output_diff}", file=sys.stderr)
     if args.output_markdown:
         args.output_markdown.write_text(markdown + "\n")
         print(f"Wrote Markdown report to {args.output_markdown}", file=sys.stderr)
 
     print(
         f"{report['available_count']} / {report['total_source_recipes']} "
-        "source-built recipes now have an upstream pyemscripten wheel on PyPI.",
+        "source-built recipes now have an upstream pyemscripten wheel on PyPI, "
+        f"{report['compatible_count']} for the recipe version and target ABI.",
         file=sys.stderr,
     )
 
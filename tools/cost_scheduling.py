@@ -0,0 +1,274 @@
+"""Record test durations and balance tests by predicted cost.
+
+Most of the time of the package tests goes into starting browsers (or Node)
+with Pyodide, and into a few slow tests such as ``test_import`` for ``scipy``
+or ``astropy``. Distributing tests over pytest-xdist workers or CI shards by
+count leaves some workers with most of the slow ones.
+
+This pytest plugin records the duration of every test (setup, call and
+teardown) and the kind of browser fixture it uses in a timing file, and uses
+the recorded durations of the previous runs to:
+
+- order the work given to xdist workers, longest first (``-n`` with the
+  default ``--dist load``),
+- split the tests into CI shards with roughly equal predicted time
+  (``--shard I/N``).
+
+Tests that share a module scoped browser (``selenium``, ``selenium_esm``)
+are kept together on the same worker and shard, so the browser is only
+started once. Tests without a recorded duration are predicted to take the
+median duration of the recorded tests.
+
+The plugin is loaded by the root ``conftest.py``::
+
+    pytest -n 4 --test-timings .cache/test-timings.json packages
+    pytest --test-timings .cache/test-timings.json --shard 2/3 packages
+"""
+
+import dataclasses
+import json
+import os
+import statistics
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import pytest
+from xdist.scheduler import LoadScopeScheduling
+
+TIMINGS_VERSION = 1
+# Predicted duration of a test when nothing has been recorded yet
+DEFAULT_DURATION = 1.0
+
+# Module scoped fixtures that start a browser shared by the tests of a module
+SHARED_BROWSER_FIXTURES = frozenset({"selenium_module_scope", "selenium_esm"})
+
+
+def browser_kind(fixturenames: Iterable[str]) -> str:
+    """``"shared"``, ``"standalone"`` or ``"none"``, depending on the browser a test starts."""
+    fixturenames = set(fixturenames)
+    if fixturenames & SHARED_BROWSER_FIXTURES:
+        return "shared"
+    if any(
+        name.startswith("selenium") or name == "console_html_fixture"
+        for name in fixturenames
+    ):
+        return "standalone"
+    return "none"
+
+
+@dataclasses.dataclass
+class RecordedTest:
+    duration: float
+    browser: str
+
+
+class Timings:
+    """Recorded test durations, by node id."""
+
+    def __init__(self, tests: dict[str, RecordedTest] | None = None) -> None:
+        self.tests = tests or {}
+        self._default: float | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "Timings":
+        """Load a timing file, a missing or outdated file has no timings."""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != TIMINGS_VERSION:
+            return cls()
+        return cls(
+            {
+                nodeid: RecordedTest(entry["duration"], entry["browser"])
+                for nodeid, entry in data["tests"].items()
+            }
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": TIMINGS_VERSION,
+            "tests": {
+                nodeid: dataclasses.asdict(self.tests[nodeid])
+                for nodeid in sorted(self.tests)
+            },
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=1) + "\n")
+        os.replace(tmp, path)
+
+    def update(self, nodeid: str, duration: float, browser: str) -> None:
+        self.tests[nodeid] = RecordedTest(round(duration, 3), browser)
+        self._default = None
+
+    def cost(self, nodeid: str) -> float:
+        """The predicted duration of a test."""
+        if nodeid in self.tests:
+            return self.tests[nodeid].duration
+        if self._default is None:
+            self._default = (
+                statistics.median(t.duration for t in self.tests.values())
+                if self.tests
+                else DEFAULT_DURATION
+            )
+        return self._default
+
+    def unit(self, nodeid: str, browser: str | None = None) -> str:
+        """The work unit of a test: its module if it shares a browser, else itself."""
+        if browser is None:
+            recorded = self.tests.get(nodeid)
+            browser = recorded.browser if recorded else "none"
+        if browser == "shared":
+            return nodeid.split("::", 1)[0]
+        return nodeid
+
+
+def split_into_shards(units: dict[str, float], shards: int) -> list[list[str]]:
+    """Split work units with predicted costs into ``shards`` balanced shards."""
+    plan: list[list[str]] = [[] for _ in range(shards)]
+    totals = [0.0] * shards
+    # Longest processing time first: the next longest unit goes to the shard
+    # with the least work so far.
+    for unit in sorted(units, key=lambda u: (-units[u], u)):
+        shard = totals.index(min(totals))
+        plan[shard].append(unit)
+        totals[shard] += units[unit]
+    return plan
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse ``I/N`` into a 0-based shard index and the number of shards."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard {value!r}, expected I/N") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"invalid shard {value!r}, I must be between 1 and N")
+    return index - 1, count
+
+
+class CostScheduling(LoadScopeScheduling):
+    """xdist scheduling of work units by predicted cost, longest first.
+
+    A work unit is a single test, or the tests of a module sharing a browser.
+    Workers ask for more work as they finish, so handing out the longest
+    units first keeps a slow unit from being started last.
+    """
+
+    workqueue: "OrderedDict[str, dict[str, bool]]"
+
+    def __init__(self, config: pytest.Config, log: Any, timings: Timings) -> None:
+        super().__init__(config, log)
+        self.timings = timings
+        self._ordered = False
+
+    def _split_scope(self, nodeid: str) -> str:
+        return self.timings.unit(nodeid)
+
+    def _assign_work_unit(self, node: Any) -> None:
+        if not self._ordered:
+            costs = {
+                scope: sum(self.timings.cost(nodeid) for nodeid in work_unit)
+                for scope, work_unit in self.workqueue.items()
+            }
+            self.workqueue = OrderedDict(
+                sorted(self.workqueue.items(), key=lambda item: -costs[item[0]])
+            )
+            self._ordered = True
+        super()._assign_work_unit(node)
+
+
+class TimingsPlugin:
+    def __init__(self, config: pytest.Config, path: Path) -> None:
+        self.path = path
+        self.timings = Timings.load(path)
+        self.shard = (
+            parse_shard(config.getoption("shard"))
+            if config.getoption("shard")
+            else None
+        )
+        # On xdist workers, the reports are recorded by the controller
+        self.is_worker = hasattr(config, "workerinput")
+        self.durations: dict[str, float] = defaultdict(float)
+        self.browsers: dict[str, str] = {}
+        self.skipped: set[str] = set()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(
+        self, config: pytest.Config, items: list[pytest.Item]
+    ) -> None:
+        unit_of: dict[pytest.Item, str] = {}
+        costs: dict[str, float] = defaultdict(float)
+        for item in items:
+            browser = browser_kind(getattr(item, "fixturenames", ()))
+            # Passed on to the controller with the reports of the test
+            item.user_properties.append(("browser", browser))
+            unit = unit_of[item] = self.timings.unit(item.nodeid, browser)
+            costs[unit] += self.timings.cost(item.nodeid)
+
+        if self.shard is None:
+            return
+        index, count = self.shard
+        selected = set(split_into_shards(costs, count)[index])
+        keep = [item for item in items if unit_of[item] in selected]
+        if len(keep) < len(items):
+            config.hook.pytest_deselected(
+                items=[item for item in items if unit_of[item] not in selected]
+            )
+            items[:] = keep
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        if self.is_worker:
+            return
+        self.durations[report.nodeid] += report.duration
+        if report.skipped:
+            # A skipped test says nothing about how long it takes to run
+            self.skipped.add(report.nodeid)
+        for name, value in report.user_properties:
+            if name == "browser":
+                self.browsers[report.nodeid] = str(value)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_make_scheduler(self, config: pytest.Config, log: Any) -> Any:
+        if config.getvalue("dist") != "load" or not self.timings.tests:
+            return None
+        return CostScheduling(config, log, self.timings)
+
+    def pytest_sessionfinish(self) -> None:
+        if self.is_worker:
+            return
+        for nodeid, duration in self.durations.items():
+            if nodeid not in self.skipped:
+                self.timings.update(nodeid, duration, self.browsers.get(nodeid, "none"))
+        if self.durations:
+            self.timings.save(self.path)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("cost scheduling")
+    group.addoption(
+        "--test-timings",
+        metavar="FILE",
+        help="File to record test durations in, used to balance xdist workers and shards",
+    )
+    group.addoption(
+        "--shard",
+        metavar="I/N",
+        help="Only run the I-th of N shards with equal predicted duration (needs --test-timings)",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    path = config.getoption("test_timings")
+    if path is None:
+        if config.getoption("shard"):
+            raise pytest.UsageError("--shard needs --test-timings")
+        return
+    try:
+        plugin = TimingsPlugin(config, Path(path))
+    except ValueError as e:
+        raise pytest.UsageError(f"--shard: {e}") from None
+    config.pluginmanager.register(plugin, "cost-scheduling")
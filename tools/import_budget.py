@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""Keep track of the import time of each package and flag regressions.
+
+``test_import`` in ``packages/test_packages_common.py`` records how long the
+first import of each package took as the ``import_time`` property of the
+test, which ends up in the JUnit XML report of pytest (``--junitxml``). This
+script keeps a baseline of the last import times of each package on each
+runtime and compares new reports against it:
+
+    # add the import times of a run to the baseline
+    python tools/import_budget.py update test-results-chrome.xml --baseline import-times.json
+
+    # compare a run with the baseline
+    python tools/import_budget.py check test-results-chrome.xml --baseline import-times.json
+
+The budget of a package is the median of its recorded import times, times
+``--factor``. Increases smaller than ``--min-increase`` seconds are ignored,
+as the import time of small packages is mostly noise. Packages that are not
+in the baseline yet have no budget.
+"""
+
+import argparse
+import dataclasses
+import json
+import re
+import statistics
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+BASELINE_VERSION = 1
+TEST_IMPORT_RE = re.compile(
+    r"test_import\[(?P<runtime>firefox|chrome|node|safari)-(?P<package>[\w\-\.]+)\]"
+)
+
+# runtime -> package -> import times in seconds, oldest first
+Samples = dict[str, dict[str, list[float]]]
+
+
+@dataclasses.dataclass
+class Regression:
+    runtime: str
+    package: str
+    median: float
+    budget: float
+    measured: float
+
+
+def read_properties(
+    paths: list[Path], names: set[str]
+) -> dict[tuple[str, str], dict[str, float]]:
+    """The ``names`` properties of the test_import tests in JUnit XML reports.
+
+    Returns the properties of each test by (runtime, package).
+    """
+    properties: dict[tuple[str, str], dict[str, float]] = {}
+    for path in paths:
+        for case in ET.parse(path).getroot().iter("testcase"):
+            match = TEST_IMPORT_RE.fullmatch(case.get("name", ""))
+            if match is None:
+                continue
+            values = {
+                prop.get("name", ""): float(prop.get("value", "nan"))
+                for prop in case.iter("property")
+                if prop.get("name") in names
+            }
+            if values:
+                properties[match.group("runtime"), match.group("package")] = values
+    return properties
+
+
+def read_import_times(paths: list[Path]) -> dict[tuple[str, str], float]:
+    """The import times recorded in JUnit XML reports, by (runtime, package)."""
+    return {
+        key: values["import_time"]
+        for key, values in read_properties(paths, {"import_time"}).items()
+    }
+
+
+def load_baseline(path: Path) -> Samples:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    if data.get("version") != BASELINE_VERSION:
+        return {}
+    return data["samples"]
+
+
+def save_baseline(path: Path, samples: Samples) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "version": BASELINE_VERSION,
+        "samples": {
+            runtime: dict(sorted(packages.items()))
+            for runtime, packages in sorted(samples.items())
+        },
+    }
+    path.write_text(json.dumps(data, indent=1) + "\n")
+
+
+def update_baseline(
+    samples: Samples, times: dict[tuple[str, str], float], keep: int
+) -> None:
+    """Add ``times`` to the baseline, keeping the last ``keep`` times of each package."""
+    for (runtime, package), seconds in times.items():
+        package_samples = samples.setdefault(runtime, {}).setdefault(package, [])
+        package_samples.append(round(seconds, 4))
+        del package_samples[:-keep]
+
+
+def check_budgets(
+    samples: Samples,
+    times: dict[tuple[str, str], float],
+    factor: float,
+    min_increase: float,
+) -> list[Regression]:
+    """The packages whose import time exceeds their budget, slowest first."""
+    regressions = []
+    for (runtime, package), seconds in times.items():
+        package_samples = samples.get(runtime, {}).get(package)
+        if not package_samples:
+            continue
+        median = statistics.median(package_samples)
+        budget = max(median * factor, median + min_increase)
+        if seconds > budget:
+            regressions.append(Regression(runtime, package, median, budget, seconds))
+    regressions.sort(key=lambda r: (-(r.measured - r.budget), r.runtime, r.package))
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Record import times of packages and check them against a baseline"
+    )
+    parser.add_argument(
+        "command",
+        choices=["update", "check"],
+        help="Add the import times to the baseline, or check them against it",
+    )
+    parser.add_argument(
+        "results", type=Path, nargs="+", help="JUnit XML reports of test_import"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, required=True, help="The baseline JSON file"
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=5,
+        help="Number of import times to keep per package and runtime (default: 5)",
+    )
+    parser.add_argument(
+        "--factor",
+        type=float,
+        default=1.5,
+        help="Budget as a multiple of the median import time (default: 1.5)",
+    )
+    parser.add_argument(
+        "--min-increase",
+        type=float,
+        default=0.2,
+        help="Ignore increases below this many seconds (default: 0.2)",
+    )
+    parser.add_argument(
+        "--fail",
+        action="store_true",
+        help="Exit with an error if a package exceeds its budget, instead of warning",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    times = read_import_times(args.results)
+    samples = load_baseline(args.baseline)
+
+    if args.command == "update":
+        update_baseline(samples, times, args.keep)
+        save_baseline(args.baseline, samples)
+        print(f"Recorded {len(times)} import time(s) in {args.baseline}")
+        return 0
+
+    regressions = check_budgets(samples, times, args.factor, args.min_increase)
+    level = "ERROR" if args.fail else "WARNING"
+    for r in regressions:
+        print(
+            f"{level}: importing {r.package} on {r.runtime} took {r.measured:.2f}s, "
+            f"budget {r.budget:.2f}s (median {r.median:.2f}s)",
+            file=sys.stderr,
+        )
+    unknown = sum(
+        1 for runtime, package in times if package not in samples.get(runtime, {})
+    )
+    print(
+        f"Checked {len(times) - unknown} import time(s) against {args.baseline}, "
+        f"{len(regressions)} over budget, {unknown} without baseline"
+    )
+    return 1 if regressions and args.fail else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""Report the memory used by importing each package, largest first.
+
+With ``--import-memory``, ``test_import`` in
+``packages/test_packages_common.py`` records, for the first import of each
+package:
+
+- ``wasm_memory_growth``: how much the WebAssembly linear memory grew, which
+  includes the side modules of the package and everything they allocate,
+- ``python_heap`` and ``python_heap_peak``: the memory allocated by Python
+  during the import and still in use afterwards, and its peak, as measured
+  by tracemalloc.
+
+The measurements end up in the JUnit XML report of pytest (``--junitxml``).
+This script sorts the packages by footprint, compares them with a budget
+and writes the report:
+
+    python tools/import_memory.py test-results-node.xml --output-markdown memory.md
+
+The budgets are ``--wasm-budget`` and ``--python-budget`` MiB, unless a
+``--budgets`` JSON file sets other ones for a package, e.g.
+``{"scipy": {"wasm_memory_growth": 300}}`` (in MiB).
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from import_budget import read_properties
+
+MIB = 1024 * 1024
+MEMORY_PROPERTIES = {"wasm_memory_growth", "python_heap", "python_heap_peak"}
+
+
+@dataclasses.dataclass
+class Footprint:
+    runtime: str
+    package: str
+    wasm_memory_growth: int
+    python_heap: int
+    python_heap_peak: int
+    # Names of the exceeded budgets
+    over_budget: list[str] = dataclasses.field(default_factory=list)
+
+
+def read_footprints(paths: list[Path]) -> list[Footprint]:
+    """The footprints recorded in JUnit XML reports, largest first."""
+    footprints = [
+        Footprint(
+            runtime,
+            package,
+            int(values.get("wasm_memory_growth", 0)),
+            int(values.get("python_heap", 0)),
+            int(values.get("python_heap_peak", 0)),
+        )
+        for (runtime, package), values in read_properties(
+            paths, MEMORY_PROPERTIES
+        ).items()
+    ]
+    footprints.sort(
+        key=lambda f: (-f.wasm_memory_growth, -f.python_heap, f.runtime, f.package)
+    )
+    return footprints
+
+
+def check_budgets(
+    footprints: list[Footprint],
+    wasm_budget: float,
+    python_budget: float,
+    overrides: dict[str, dict[str, float]],
+) -> list[Footprint]:
+    """Set ``over_budget`` of each footprint and return the ones over budget.
+
+    The budgets are in MiB.
+    """
+    for footprint in footprints:
+        budgets = {
+            "wasm_memory_growth": wasm_budget,
+            "python_heap": python_budget,
+            **overrides.get(footprint.package, {}),
+        }
+        footprint.over_budget = [
+            name
+            for name, budget in budgets.items()
+            if getattr(footprint, name) > budget * MIB
+        ]
+    return [f for f in footprints if f.over_budget]
+
+
+def _mib(n: int) -> str:
+    return f"{n / MIB:.1f}"
+
+
+def render_markdown(footprints: list[Footprint]) -> str:
+    lines = [
+        "# Memory used by importing each package",
+        "",
+        "| Package | Runtime | Wasm memory growth (MiB) | Python heap (MiB) "
+        "| Python heap peak (MiB) | Over budget |",
+        "|---|---|---:|---:|---:|---|",
+    ]
+    for f in footprints:
+        lines.append(
+            f"| {f.package} | {f.runtime} | {_mib(f.wasm_memory_growth)} "
+            f"| {_mib(f.python_heap)} | {_mib(f.python_heap_peak)} "
+            f"| {', '.join(f.over_budget)} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Report the memory used by importing each package"
+    )
+    parser.add_argument(
+        "results", type=Path, nargs="+", help="JUnit XML reports of test_import"
+    )
+    parser.add_argument(
+        "--wasm-budget",
+        type=float,
+        default=256,
+        help="Budget for the growth of the wasm memory, in MiB (default: 256)",
+    )
+    parser.add_argument(
+        "--python-budget",
+        type=float,
+        default=128,
+        help="Budget for the Python heap after the import, in MiB (default: 128)",
+    )
+    parser.add_argument(
+        "--budgets",
+        type=Path,
+        default=None,
+        help="JSON file with the budgets of single packages, in MiB",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Number of packages to print (default: 20)",
+    )
+    parser.add_argument(
+        "--output-json", type=Path, default=None, help="Write the report as JSON"
+    )
+    parser.add_argument(
+        "--output-markdown",
+        type=Path,
+        default=None,
+        help="Write the report as Markdown",
+    )
+    parser.add_argument(
+        "--fail",
+        action="store_true",
+        help="Exit with an error if a package exceeds its budget, instead of warning",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    overrides: dict[str, Any] = {}
+    if args.budgets is not None:
+        overrides = json.loads(args.budgets.read_text())
+
+    footprints = read_footprints(args.results)
+    over_budget = check_budgets(
+        footprints, args.wasm_budget, args.python_budget, overrides
+    )
+
+    for f in footprints[: args.top]:
+        print(
+            f"{f.package:<30} {f.runtime:<8} wasm +{_mib(f.wasm_memory_growth):>8} MiB "
+            f"python {_mib(f.python_heap):>8} MiB (peak {_mib(f.python_heap_peak)} MiB)"
+        )
+    level = "ERROR" if args.fail else "WARNING"
+    for f in over_budget:
+        print(
+            f"{level}: importing {f.package} on {f.runtime} exceeds the "
+            f"{', '.join(f.over_budget)} budget",
+            file=sys.stderr,
+        )
+
+    if args.output_json:
+        args.output_json.write_text(
+            json.dumps([dataclasses.asdict(f) for f in footprints], indent=2) + "\n"
+        )
+    if args.output_markdown:
+        args.output_markdown.write_text(render_markdown(footprints))
+
+    return 1 if over_budget and args.fail else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""Profile the imports of a package, like ``python -X importtime``.
+
+``-X importtime`` cannot be passed to Pyodide, so :func:`profile_imports`
+records the same information from Python: it wraps
+``importlib._bootstrap._find_and_load``, which the interpreter calls for
+every module that is not imported yet, and builds a tree with the
+cumulative and self time of each module. It also wraps the creation of
+extension modules, which is where Pyodide loads and links their ``.so``
+side modules, to record the time spent in dynamic linking and the size of
+the side modules.
+
+This file only uses the standard library: ``test_packages_common.py`` sends
+its source to Pyodide and runs :func:`profile_imports` there when pytest is
+run with ``--import-profile DIR``, and writes one JSON profile per package
+and runtime to ``DIR``.
+
+Two profiles, e.g. of two CI runs, can be compared with::
+
+    python tools/import_profile.py old/astropy-chrome.json new/astropy-chrome.json
+"""
+
+import argparse
+import importlib._bootstrap
+import importlib.machinery
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+PROFILE_VERSION = 1
+
+
+def _elapsed_us(start: float) -> int:
+    return round((time.perf_counter() - start) * 1e6)
+
+
+def profile_imports(import_names: list[str]) -> dict[str, Any]:
+    """Import ``import_names`` and return the tree of the imported modules.
+
+    Each node of the tree has the name of the module, its cumulative and self
+    import time in microseconds and the modules it imported. Extension modules
+    also have the size of their shared library and the time it took to load
+    and link it.
+    """
+    root: dict[str, Any] = {"children": []}
+    stack = [root]
+
+    find_and_load = importlib._bootstrap._find_and_load  # type: ignore[attr-defined]
+    create_module = importlib.machinery.ExtensionFileLoader.create_module
+
+    def profiled_find_and_load(name, import_):
+        if name in sys.modules:
+            # importlib.import_module() gets here for imported modules too
+            return find_and_load(name, import_)
+        node = {"module": name, "children": []}
+        stack[-1]["children"].append(node)
+        stack.append(node)
+        start = time.perf_counter()
+        try:
+            return find_and_load(name, import_)
+        finally:
+            node["cumulative_us"] = _elapsed_us(start)
+            node["self_us"] = node["cumulative_us"] - sum(
+                child["cumulative_us"] for child in node["children"]
+            )
+            stack.pop()
+
+    def profiled_create_module(self, spec):
+        start = time.perf_counter()
+        try:
+            return create_module(self, spec)
+        finally:
+            node = stack[-1]
+            node["link_us"] = _elapsed_us(start)
+            node["so_bytes"] = os.path.getsize(spec.origin)
+
+    importlib._bootstrap._find_and_load = profiled_find_and_load  # type: ignore[attr-defined]
+    importlib.machinery.ExtensionFileLoader.create_module = profiled_create_module  # type: ignore[method-assign]
+    modules_before = len(sys.modules)
+    try:
+        for import_name in import_names:
+            importlib.import_module(import_name)
+    finally:
+        importlib._bootstrap._find_and_load = find_and_load  # type: ignore[attr-defined]
+        importlib.machinery.ExtensionFileLoader.create_module = create_module  # type: ignore[method-assign]
+
+    modules = flatten(root["children"])
+    return {
+        "version": PROFILE_VERSION,
+        "import_names": import_names,
+        "total_us": sum(node["cumulative_us"] for node in root["children"]),
+        "modules": len(sys.modules) - modules_before,
+        "so_bytes": sum(m.get("so_bytes", 0) for m in modules.values()),
+        "link_us": sum(m.get("link_us", 0) for m in modules.values()),
+        "tree": root["children"],
+    }
+
+
+def flatten(tree: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """The nodes of an import tree by module name, without their children."""
+    modules: dict[str, dict[str, Any]] = {}
+    pending = list(tree)
+    while pending:
+        node = pending.pop()
+        modules[node["module"]] = {k: v for k, v in node.items() if k != "children"}
+        pending.extend(node["children"])
+    return modules
+
+
+def diff_profiles(
+    old: dict[str, Any], new: dict[str, Any]
+) -> list[tuple[str, int, int]]:
+    """``(module, old self time, new self time)``, largest increase first.
+
+    Modules only imported in one of the profiles have a time of 0 in the other.
+    """
+    old_modules = flatten(old["tree"])
+    new_modules = flatten(new["tree"])
+    rows = [
+        (
+            module,
+            old_modules.get(module, {}).get("self_us", 0),
+            new_modules.get(module, {}).get("self_us", 0),
+        )
+        for module in old_modules.keys() | new_modules.keys()
+    ]
+    rows.sort(key=lambda row: (row[1] - row[2], row[0]))
+    return rows
+
+
+def format_diff(old: dict[str, Any], new: dict[str, Any], top: int) -> str:
+    lines = []
+    for key in ("total_us", "link_us", "so_bytes", "modules"):
+        lines.append(f"{key:<10} {old.get(key, 0):>12} -> {new.get(key, 0):>12}")
+    lines.append("")
+    lines.append(f"{'module':<50} {'old self_us':>12} {'new self_us':>12}")
+    for module, old_us, new_us in diff_profiles(old, new)[:top]:
+        lines.append(f"{module:<50} {old_us:>12} {new_us:>12}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare two import profiles written by test_import --import-profile"
+    )
+    parser.add_argument("old", type=Path, help="Profile of the baseline run")
+    parser.add_argument("new", type=Path, help="Profile to compare with the baseline")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Number of modules to show, largest self time increase first",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    print(format_diff(old, new, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,25 +1,176 @@
 """Parse build result of the pyodide build-recipes command"""
 
+import argparse
+import dataclasses
 import re
+import subprocess as sp
 import sys
+import time
+from collections.abc import Iterable, Iterator
 from datetime import timedelta
+from graphlib import TopologicalSorter
 from pathlib import Path
+from typing import TextIO
+
+import build_history
+from recipe_index import load_recipe_index
+
+RECIPE_DIR = Path(__file__).parent.parent / "packages"
+
+
+# Precompiled patterns for the lines printed by `pyodide build-recipes`.
+BUILT_RE = re.compile(r"\[\d+/(\d+)\] \(thread (\d+)\) built (\S+) in (.+?)\s*$")
+BUILDING_RE = re.compile(r"\[\d+/(\d+)\] \(thread (\d+)\) building (\S+)")
+ELAPSED_RE = re.compile(r"(\d+:\d+:\d+)")
+
+TOTAL_BUILD_TIME_UNKNOWN = "Failed to parse total build time"
+# Printed by `pyodide build-recipes` when a package fails to build
+BUILD_FAILED_MARKER = "cancelling buildall"
+# Longer than any package takes to build without printing a line
+DEFAULT_IDLE_TIMEOUT = 3600.0
+
+
+@dataclasses.dataclass
+class BuildLog:
+    """Everything extracted from a build log in a single pass."""
+
+    results: list[tuple[str, int, str]] = dataclasses.field(default_factory=list)
+    # package -> build thread
+    threads: dict[str, int] = dataclasses.field(default_factory=dict)
+    # build thread -> package it is currently building
+    running: dict[int, str] = dataclasses.field(default_factory=dict)
+    total_packages: int | None = None
+    # The first "Time elapsed" value, as reported before the analysis existed
+    total_build_time: str = TOTAL_BUILD_TIME_UNKNOWN
+    # The last "Time elapsed" value, the progress line is printed repeatedly
+    wall_time: str | None = None
+    # Whether the build was cancelled because a package failed to build
+    failed: bool = False
+
+    def feed(self, line: str) -> tuple[str, int, str] | None:
+        """Parse one log line. Returns the build result if the line has one."""
+        # Cheap substring checks first, most lines of a verbose log are
+        # compiler output.
+        if "(thread " in line:
+            if " built " in line:
+                match = BUILT_RE.search(line.strip())
+                if match:
+                    total, thread, package_name, time_str = match.groups()
+                    result = (package_name, parse_time(time_str), time_str)
+                    self.results.append(result)
+                    self.threads[package_name] = int(thread)
+                    self.total_packages = int(total)
+                    if self.running.get(int(thread)) == package_name:
+                        del self.running[int(thread)]
+                    return result
+            elif " building " in line:
+                match = BUILDING_RE.search(line)
+                if match:
+                    total, thread, package_name = match.groups()
+                    self.running[int(thread)] = package_name
+                    self.total_packages = int(total)
+        if "Time elapsed:" in line:
+            # find hh:mm:ss format string in the line
+            match = ELAPSED_RE.search(line)
+            if match:
+                self.wall_time = match.group(1)
+                if self.total_build_time == TOTAL_BUILD_TIME_UNKNOWN:
+                    self.total_build_time = match.group(1)
+        elif BUILD_FAILED_MARKER in line:
+            self.failed = True
+        return None
+
+
+def parse_build_log(lines: Iterable[str]) -> BuildLog:
+    """Parse a build log from an iterable of lines, e.g. an open file."""
+    log = BuildLog()
+    for line in lines:
+        log.feed(line)
+    return log
+
+
+def tail_lines(f: TextIO, poll_interval: float = 1.0) -> Iterator[str | None]:
+    """Follow a growing file like ``tail -f``.
+
+    Yields complete lines as they are appended, and ``None`` whenever there
+    was no new data during ``poll_interval`` seconds.
+    """
+    pending = ""
+    while True:
+        chunk = f.readline()
+        if not chunk:
+            yield None
+            time.sleep(poll_interval)
+            continue
+        pending += chunk
+        if pending.endswith("\n"):
+            yield pending
+            pending = ""
+
+
+def format_progress(log: BuildLog, rate: float | None) -> str:
+    """One-line progress report of a running build.
+
+    ``rate`` is the throughput in packages per minute, if known.
+    """
+    built = len(log.results)
+    total = log.total_packages or "?"
+    parts = [f"[{built}/{total} built]"]
+    if rate:
+        parts.append(f"{rate:.1f} packages/min")
+        if log.total_packages:
+            remaining = max(log.total_packages - built, 0)
+            parts.append(f"ETA {format_time(round(remaining / rate * 60))}")
+    running = ", ".join(
+        f"thread {thread}: {package}" for thread, package in sorted(log.running.items())
+    )
+    parts.append(f"running: {running or '-'}")
+    return " | ".join(parts)
+
+
+def follow_build_log(
+    f: TextIO,
+    log: BuildLog,
+    poll_interval: float = 1.0,
+    report_interval: float = 10.0,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+) -> None:
+    """Parse a build log while it is being written, printing live progress.
+
+    Returns once every package is built or the build failed, after
+    ``idle_timeout`` seconds without new lines, or on Ctrl-C.
+    """
+    # Throughput is measured from the moment we caught up with the file.
+    caught_up_at: float | None = None
+    built_at_catch_up = 0
+    last_line_at = last_report_at = time.monotonic()
+    try:
+        for line in tail_lines(f, poll_interval):
+            now = time.monotonic()
+            if line is not None:
+                log.feed(line)
+                last_line_at = now
+            elif caught_up_at is None:
+                caught_up_at, built_at_catch_up = now, len(log.results)
+
+            if log.total_packages and len(log.results) >= log.total_packages:
+                break
+            if log.failed or now - last_line_at > idle_timeout:
+                break
+
+            if caught_up_at is not None and now - last_report_at >= report_interval:
+                minutes = (now - caught_up_at) / 60
+                built = len(log.results) - built_at_catch_up
+                rate = built / minutes if built and minutes else None
+                print(format_progress(log, rate), file=sys.stderr, flush=True)
+                last_report_at = now
+    except KeyboardInterrupt:
+        pass
 
 
 def parse_total_build_time(content: str) -> str:
     """Parse the total build time from the content string."""
-    pattern = "Time elapsed:"
-
-    # Find the line that starts with the pattern prefix
-    for line in content.splitlines():
-        if pattern in line:
-            # find hh:mm:ss format string in the line
-            match = re.search(r"(\d+:\d+:\d+)", line)
-            if match:
-                time_str = match.group(1)
-                return time_str
-
-    return "Failed to parse total build time"
+    return parse_build_log(content.splitlines()).total_build_time
 
 
 def parse_time(time_str: str) -> int:
@@ -52,19 +203,172 @@ def format_time(seconds: int) -> str:
 
 def parse_build_results(content: str) -> list[tuple[str, int, str]]:
     """Parse build results from the content string."""
-    # Regular expression to match build result lines
-    pattern = r"\[\d+/\d+\] \(thread \d+\) built (\S+) in (.+?)\s*$"
+    return parse_build_log(content.splitlines()).results
+
+
+def parse_build_threads(content: str) -> dict[str, int]:
+    """Parse which build thread built each package."""
+    return parse_build_log(content.splitlines()).threads
+
+
+def parse_elapsed_seconds(time_str: str) -> int | None:
+    """Convert a hh:mm:ss string to seconds, or None if it is not in that format."""
+    match = re.fullmatch(r"(\d+):(\d+):(\d+)", time_str)
+    if not match:
+        return None
+    hours, minutes, seconds = (int(g) for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@dataclasses.dataclass
+class BuildAnalysis:
+    cpu_time: int
+    wall_time: int | None
+    critical_path: list[str]
+    critical_path_time: int
+    # thread id -> (number of packages, busy seconds)
+    threads: dict[int, tuple[int, int]]
+    # package -> seconds the package could have been delayed without
+    # delaying the end of the critical path
+    slack: dict[str, int]
+
+
+def reverse_dependencies(dependencies: dict[str, list[str]]) -> dict[str, list[str]]:
+    """The packages that depend on each package of a dependency graph."""
+    dependents: dict[str, list[str]] = {package: [] for package in dependencies}
+    for package, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(package)
+    return dependents
+
+
+def analyze_build(
+    results: list[tuple[str, int, str]],
+    threads: dict[str, int],
+    dependencies: dict[str, list[str]],
+    wall_time: int | None = None,
+) -> BuildAnalysis:
+    """Join the build results with the recipe dependency graph.
+
+    ``dependencies`` maps a package to its host requirements, which are the
+    packages that must be built before it. Dependencies that were not built
+    in this run are ignored.
+    """
+    durations = {package: seconds for package, seconds, _ in results}
+
+    graph = {
+        package: [dep for dep in dependencies.get(package, []) if dep in durations]
+        for package in durations
+    }
+    order = list(TopologicalSorter(graph).static_order())
+
+    # Forward pass: earliest finish time of each package with unlimited threads
+    earliest_finish: dict[str, int] = {}
+    predecessor: dict[str, str | None] = {}
+    for package in order:
+        start, prev = 0, None
+        for dep in graph[package]:
+            if earliest_finish[dep] > start:
+                start, prev = earliest_finish[dep], dep
+        earliest_finish[package] = start + durations[package]
+        predecessor[package] = prev
+
+    critical_path_time = max(earliest_finish.values(), default=0)
+
+    # Backward pass: latest finish time that does not delay the whole build
+    dependents = reverse_dependencies(graph)
+
+    latest_finish: dict[str, int] = {}
+    for package in reversed(order):
+        latest_finish[package] = min(
+            (latest_finish[d] - durations[d] for d in dependents[package]),
+            default=critical_path_time,
+        )
+
+    critical_path: list[str] = []
+    if earliest_finish:
+        node: str | None = max(earliest_finish, key=earliest_finish.__getitem__)
+        while node is not None:
+            critical_path.append(node)
+            node = predecessor[node]
+        critical_path.reverse()
+
+    thread_stats: dict[int, tuple[int, int]] = {}
+    for package, seconds in durations.items():
+        if package not in threads:
+            continue
+        count, busy = thread_stats.get(threads[package], (0, 0))
+        thread_stats[threads[package]] = (count + 1, busy + seconds)
+
+    return BuildAnalysis(
+        cpu_time=sum(durations.values()),
+        wall_time=wall_time,
+        critical_path=critical_path,
+        critical_path_time=critical_path_time,
+        threads=dict(sorted(thread_stats.items())),
+        slack={
+            package: latest_finish[package] - earliest_finish[package]
+            for package in durations
+        },
+    )
+
+
+def generate_analysis_markdown(
+    analysis: BuildAnalysis, results: list[tuple[str, int, str]]
+) -> str:
+    """Generate a markdown report of the critical path and parallelism analysis."""
+    output = []
+    output.append("## Build Parallelism\n")
+    output.append(f"Total CPU time: {format_time(analysis.cpu_time)}")
+    output.append(
+        f"Critical path length: {format_time(analysis.critical_path_time)} "
+        "(shortest possible build with unlimited threads)"
+    )
+
+    if analysis.wall_time:
+        output.append(f"Wall time: {format_time(analysis.wall_time)}")
+        output.append(
+            f"Average parallelism: {analysis.cpu_time / analysis.wall_time:.1f}x"
+        )
+        output.append(
+            "Time that more build threads could save at most: "
+            f"{format_time(max(analysis.wall_time - analysis.critical_path_time, 0))}"
+        )
+
+    durations = {package: seconds for package, seconds, _ in results}
+    chain = " → ".join(
+        f"{package} ({format_time(durations[package])})"
+        for package in analysis.critical_path
+    )
+    output.append(f"\nCritical path: {chain}\n")
+
+    if analysis.threads:
+        output.append("<details>")
+        output.append("<summary>Thread Utilization (click to expand)</summary>\n")
+        output.append("| Thread | Packages | Busy Time | Utilization |")
+        output.append("|--------|----------|-----------|-------------|")
+        for thread, (count, busy) in analysis.threads.items():
+            utilization = (
+                f"{busy / analysis.wall_time:.0%}" if analysis.wall_time else "-"
+            )
+            output.append(
+                f"| {thread} | {count} | {format_time(busy)} | {utilization} |"
+            )
+        output.append("\n</details>")
 
-    results = []
-    for line in content.splitlines():
-        match = re.search(pattern, line.strip())
-        if match:
-            package_name = match.group(1)
-            time_str = match.group(2)
-            seconds = parse_time(time_str)
-            results.append((package_name, seconds, time_str))
+    output.append("<details>")
+    output.append("<summary>Package Slack (click to expand)</summary>\n")
+    output.append("| Package | Build Time | Slack |")
+    output.append("|---------|------------|-------|")
+    for package, _, time_str in sorted(
+        results, key=lambda x: (analysis.slack[x[0]], -x[1])
+    ):
+        output.append(
+            f"| {package} | {time_str} | {format_time(analysis.slack[package])} |"
+        )
+    output.append("\n</details>")
 
-    return results
+    return "\n".join(output)
 
 
 def generate_markdown_table(
@@ -84,13 +388,26 @@ def generate_markdown_table(
     return table
 
 
-def process_build_results(content: str) -> str:
-    """Process build results and return formatted markdown output."""
-    results = parse_build_results(content)
+def process_build_results(
+    content: str, dependencies: dict[str, list[str]] | None = None
+) -> str:
+    """Process build results and return formatted markdown output.
+
+    If ``dependencies`` (package -> host requirements) is given, a critical path
+    and parallelism analysis is appended to the output.
+    """
+    return process_build_log(parse_build_log(content.splitlines()), dependencies)
+
+
+def process_build_log(
+    log: BuildLog, dependencies: dict[str, list[str]] | None = None
+) -> str:
+    """Format an already parsed build log as markdown, see process_build_results."""
+    results = log.results
 
     # Calculate some statistics
     total_packages = len(results)
-    total_build_time = parse_total_build_time(content)
+    total_build_time = log.total_build_time
 
     # Generate markdown output
     output = []
@@ -112,20 +429,187 @@ def process_build_results(content: str) -> str:
         long_builds = [p for p, s, _ in results if s > 600]  # More than 10 minutes
         output.append(f"Packages built in more than 10 minutes: {len(long_builds)}")
 
+    if results and dependencies is not None:
+        analysis = analyze_build(
+            results,
+            log.threads,
+            dependencies,
+            parse_elapsed_seconds(log.wall_time) if log.wall_time else None,
+        )
+        output.append("")
+        output.append(generate_analysis_markdown(analysis, results))
+
+    return "\n".join(output)
+
+
+def generate_regression_markdown(
+    regressions: list[build_history.Regression], threshold: float
+) -> str:
+    """Generate a markdown report of the packages whose build time regressed."""
+    output = []
+    output.append("## Build Time Regressions\n")
+    if not regressions:
+        output.append(
+            f"No package took more than {threshold:g}x its baseline build time."
+        )
+        return "\n".join(output)
+
+    output.append(
+        f"{len(regressions)} package(s) took more than {threshold:g}x "
+        "their baseline build time:\n"
+    )
+    output.append("| Package | Build Time | Baseline | Change | Version |")
+    output.append("|---------|------------|----------|--------|---------|")
+    for r in regressions:
+        version = r.version
+        if r.baseline_version and r.baseline_version != r.version:
+            version = f"{r.baseline_version} → {r.version}"
+        output.append(
+            f"| {r.package} | {format_time(r.seconds)} "
+            f"| {format_time(round(r.baseline))} | {r.ratio:.1f}x | {version} |"
+        )
+
     return "\n".join(output)
 
 
+def current_commit() -> str:
+    """Return the commit of the working tree, or "unknown" outside of git."""
+    result = sp.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+    return result.stdout.strip() or "unknown"
+
+
+def load_dependencies(recipe_dir: Path) -> dict[str, list[str]]:
+    """Load the host requirements of every recipe in ``recipe_dir``."""
+    return {
+        recipe.name: recipe.host_requirements
+        for recipe in load_recipe_index(recipe_dir).values()
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "log",
+        nargs="?",
+        type=Path,
+        help="Build log to parse (default: read from stdin)",
+    )
+    parser.add_argument(
+        "-f",
+        "--follow",
+        action="store_true",
+        help="Follow a running build, printing live progress to stderr, "
+        "and print the summary once it is done",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="With --follow, stop after this many seconds without new log lines "
+        f"(default: {DEFAULT_IDLE_TIMEOUT:.0f})",
+    )
+    parser.add_argument(
+        "-d",
+        "--recipe-dir",
+        type=Path,
+        default=RECIPE_DIR,
+        help="The directory containing the recipes, used for the critical path analysis",
+    )
+    parser.add_argument(
+        "--no-analysis",
+        action="store_true",
+        help="Do not add the critical path and parallelism analysis",
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=None,
+        help="Append the build times to this JSONL history file and report regressions",
+    )
+    parser.add_argument(
+        "--commit",
+        default=None,
+        help="Commit to record the build times for (default: git rev-parse HEAD)",
+    )
+    parser.add_argument(
+        "--regression-threshold",
+        type=float,
+        default=build_history.DEFAULT_THRESHOLD,
+        help="Report packages slower than this factor times their baseline "
+        f"(default: {build_history.DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--baseline-runs",
+        type=int,
+        default=build_history.DEFAULT_BASELINE_RUNS,
+        help="Number of previous runs the baseline is computed from "
+        f"(default: {build_history.DEFAULT_BASELINE_RUNS})",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with a non-zero status if a regression is found",
+    )
+    return parser.parse_args()
+
+
 def main():
-    # Read input from file or stdin
-    if len(sys.argv) > 1:
-        content = Path(sys.argv[1]).read_text()
+    args = parse_args()
+    if args.follow and args.log is None:
+        print("ERROR: --follow requires a log file", file=sys.stderr)
+        return 1
+
+    # Stream the log from file or stdin; logs of full builds can be huge
+    if args.follow:
+        log = BuildLog()
+        with args.log.open(errors="replace") as f:
+            follow_build_log(f, log, idle_timeout=args.idle_timeout)
+    elif args.log is not None:
+        with args.log.open(errors="replace") as f:
+            log = parse_build_log(f)
     else:
-        content = sys.stdin.read()
+        log = parse_build_log(sys.stdin)
+
+    dependencies = None
+    if not args.no_analysis and args.recipe_dir.is_dir():
+        dependencies = load_dependencies(args.recipe_dir)
 
     # Process the content and print the results
-    result = process_build_results(content)
+    result = process_build_log(log, dependencies)
     print(result)
 
+    if args.history is None:
+        return 0
+
+    results = log.results
+    versions = {}
+    if args.recipe_dir.is_dir():
+        versions = {
+            recipe.name: recipe.version
+            for recipe in load_recipe_index(args.recipe_dir).values()
+        }
+
+    regressions = build_history.find_regressions(
+        build_history.load_runs(args.history),
+        results,
+        versions,
+        threshold=args.regression_threshold,
+        baseline_runs=args.baseline_runs,
+    )
+    print()
+    print(generate_regression_markdown(regressions, args.regression_threshold))
+
+    if results:
+        build_history.append_run(
+            args.history, args.commit or current_commit(), results, versions
+        )
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
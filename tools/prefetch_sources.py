@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+"""Prefetch the sources of recipes into a local content store and build from it.
+
+This script downloads the sources of the selected recipes concurrently into
+a content store where each file is stored once under its sha256::
+
+    <store>/sha256/<hash>
+    <store>/files/<hash>/<filename>    # created by mirror
+    <store>/sources.json    # url -> {"sha256": ..., "filename": ...}
+
+A file is verified against the ``source.sha256`` of the recipe while it is
+downloaded and only moved into the store when it matches, so files in the
+store never need to be verified again. Recipes sharing a source are only
+downloaded once. ``$(VAR)`` in the URL and checksum are replaced with
+environment variables, like pyodide-build does.
+
+Running it before a build finds moved or changed sources in seconds instead
+of when their recipe is built. ``mirror`` then writes a copy of the recipe
+directory where the ``source.url`` of every stored source is a ``file://``
+URL into the store, with the file name of the download so that pyodide-build
+extracts it to the same directory. The other files of the recipes are
+symlinked. Building from the mirror needs no network access for the stored
+sources, e.g. on an air-gapped runner with a copy of the store.
+
+Usage::
+
+    python tools/prefetch_sources.py fetch "*" --store ~/.cache/pyodide-sources
+    python tools/prefetch_sources.py mirror "*" --store ~/.cache/pyodide-sources \
+        --output build/offline-recipes
+    pyodide build-recipes "*" --recipe-dir build/offline-recipes
+"""
+
+import argparse
+import concurrent.futures
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Mapping
+from pathlib import Path
+
+from recipe_index import BASE_DIR, RecipeIndex, load_recipe_index
+from schedule_build import positive_int, resolve_targets
+
+RECIPE_DIR = BASE_DIR / "packages"
+DEFAULT_STORE = BASE_DIR / ".cache" / "sources"
+DEFAULT_JOBS = 8
+CHUNK_SIZE = 1 << 20
+MAX_BACKOFF = 30.0
+# Written by pyodide-build into the recipe directory, not part of the recipe
+BUILD_OUTPUTS = {"build", "dist", "build.log"}
+
+USER_AGENT = "pyodide-recipes-prefetch/1.0"
+ENV_VAR_RE = re.compile(r"\$\((\w+)\)")
+
+
+@dataclasses.dataclass
+class Source:
+    url: str
+    sha256: str
+    recipes: list[str]
+
+
+def substitute_env(value: str, env: Mapping[str, str]) -> str:
+    """Replace ``$(VAR)`` with the value of VAR, like pyodide-build.
+
+    Raises ValueError if a variable is not set.
+    """
+
+    def replace(match: re.Match[str]) -> str:
+        name = match.group(1)
+        if name not in env:
+            raise ValueError(f"{value}: $({name}) is not set")
+        return env[name]
+
+    return ENV_VAR_RE.sub(replace, value)
+
+
+def collect_sources(
+    packages: set[str], index: RecipeIndex, env: Mapping[str, str] = os.environ
+) -> list[Source]:
+    """The distinct downloadable sources of ``packages``."""
+    sources: dict[str, Source] = {}
+    for name in sorted(packages):
+        recipe = index[name]
+        if not recipe.source_url or not recipe.source_sha256:
+            continue
+        url = substitute_env(recipe.source_url, env)
+        sha256 = substitute_env(recipe.source_sha256, env)
+        source = sources.setdefault(url, Source(url, sha256, []))
+        source.recipes.append(name)
+    return list(sources.values())
+
+
+class SourceStore:
+    """Files stored by their sha256, plus a manifest of the URLs they came from."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.manifest_path = path / "sources.json"
+        self.manifest: dict[str, dict[str, str]] = {}
+        if self.manifest_path.is_file():
+            self.manifest = json.loads(self.manifest_path.read_text())
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.path / "sha256" / sha256
+
+    def file_path(self, sha256: str, filename: str) -> Path:
+        return self.path / "files" / sha256 / filename
+
+    def has(self, source: Source) -> bool:
+        entry = self.manifest.get(source.url)
+        return (
+            entry is not None
+            and entry["sha256"] == source.sha256
+            and self.blob_path(source.sha256).is_file()
+        )
+
+    def save_manifest(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(f"sources.json.{os.getpid()}")
+        tmp_path.write_text(json.dumps(self.manifest, indent=1, sort_keys=True) + "\n")
+        os.replace(tmp_path, self.manifest_path)
+
+    def fetch(
+        self, source: Source, timeout: float, retries: int = 3, backoff: float = 1.0
+    ) -> str:
+        """Download ``source`` into the store. Returns the file name of the download.
+
+        Failed requests are retried with exponential backoff, except for
+        client errors other than 429 which would fail again.
+        """
+        blob = self.blob_path(source.sha256)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob.with_name(f"{source.sha256}.{os.getpid()}.{id(source)}.part")
+
+        last_exc: Exception | None = None
+        for attempt in range(retries):
+            if attempt:
+                time.sleep(min(backoff * 2 ** (attempt - 1), MAX_BACKOFF))
+            request = urllib.request.Request(
+                source.url, headers={"User-Agent": USER_AGENT}
+            )
+            try:
+                h = hashlib.sha256()
+                with (
+                    urllib.request.urlopen(request, timeout=timeout) as response,
+                    tmp_path.open("wb") as f,
+                ):
+                    # Same file name pyodide-build derives from the response
+                    filename = (
+                        response.headers.get_filename() or Path(response.geturl()).name
+                    )
+                    while chunk := response.read(CHUNK_SIZE):
+                        h.update(chunk)
+                        f.write(chunk)
+                break
+            except urllib.error.HTTPError as exc:
+                if 400 <= exc.code < 500 and exc.code != 429:
+                    tmp_path.unlink(missing_ok=True)
+                    raise RuntimeError(f"GET {source.url} failed: {exc}") from exc
+                last_exc = exc
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+                last_exc = exc
+        else:
+            tmp_path.unlink(missing_ok=True)
+            raise RuntimeError(
+                f"GET {source.url} failed after {retries} attempts: {last_exc}"
+            )
+
+        if h.hexdigest() != source.sha256:
+            tmp_path.unlink()
+            raise RuntimeError(
+                f"{source.url}: checksum mismatch, "
+                f"expected {source.sha256}, got {h.hexdigest()}"
+            )
+        os.replace(tmp_path, blob)
+        return filename
+
+    def link_file(self, url: str) -> Path:
+        """The stored file of ``url`` under the file name of its download."""
+        entry = self.manifest[url]
+        path = self.file_path(entry["sha256"], entry["filename"])
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self.blob_path(entry["sha256"]), path)
+            except OSError:
+                shutil.copyfile(self.blob_path(entry["sha256"]), path)
+        return path
+
+
+def fetch_sources(
+    sources: list[Source], store: SourceStore, jobs: int, timeout: float
+) -> tuple[list[Source], dict[str, str]]:
+    """Download the sources missing from the store, ``jobs`` at a time.
+
+    Returns the downloaded sources and the errors by URL.
+    """
+    missing = [s for s in sources if not store.has(s)]
+    fetched: list[Source] = []
+    errors: dict[str, str] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        future_to_source = {
+            executor.submit(store.fetch, s, timeout): s for s in missing
+        }
+        for future in concurrent.futures.as_completed(future_to_source):
+            source = future_to_source[future]
+            try:
+                filename = future.result()
+            except RuntimeError as exc:
+                errors[source.url] = str(exc)
+                continue
+            store.manifest[source.url] = {
+                "sha256": source.sha256,
+                "filename": filename,
+            }
+            fetched.append(source)
+
+    if fetched:
+        store.save_manifest()
+    return fetched, errors
+
+
+def write_mirror(
+    index: RecipeIndex, sources: list[Source], store: SourceStore, output: Path
+) -> tuple[list[str], list[str]]:
+    """Write a copy of the recipe directory that takes ``sources`` from the store.
+
+    Returns the recipes whose source was redirected into the store and those
+    whose source is missing from the store, which still download it.
+    """
+    from ruamel.yaml import YAML
+
+    if output.resolve() == index.recipe_dir.resolve():
+        raise ValueError(f"{output}: the mirror cannot replace the recipe directory")
+
+    recipe_urls = {}
+    missing = []
+    for source in sources:
+        if not store.has(source):
+            missing += source.recipes
+            continue
+        url = store.link_file(source.url).resolve().as_uri()
+        recipe_urls.update(dict.fromkeys(source.recipes, url))
+
+    if output.exists():
+        shutil.rmtree(output)
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    yaml.width = 4096
+    for name in index:
+        recipe_dir = index.recipe_dir / name
+        mirror_dir = output / name
+        mirror_dir.mkdir(parents=True)
+        for entry in recipe_dir.iterdir():
+            if entry.name in BUILD_OUTPUTS:
+                continue
+            if entry.name == "meta.yaml" and name in recipe_urls:
+                meta = yaml.load(entry)
+                meta["source"]["url"] = recipe_urls[name]
+                with (mirror_dir / "meta.yaml").open("w") as f:
+                    yaml.dump(meta, f)
+            else:
+                (mirror_dir / entry.name).symlink_to(entry.resolve())
+    return sorted(recipe_urls), sorted(missing)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "command",
+        choices=["fetch", "mirror"],
+        help=(
+            "fetch: download the missing sources into the store, "
+            "mirror: write a recipe directory using the stored sources"
+        ),
+    )
+    parser.add_argument(
+        "targets",
+        help="Recipes to consider, e.g. 'scipy,tag:core' or '*' (like pyodide build-recipes)",
+    )
+    parser.add_argument(
+        "-d",
+        "--recipe-dir",
+        type=Path,
+        default=RECIPE_DIR,
+        help="The directory containing the recipes",
+    )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=DEFAULT_STORE,
+        help=f"The content store directory (default: {DEFAULT_STORE.relative_to(BASE_DIR)})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=DEFAULT_JOBS,
+        help=f"Number of concurrent downloads (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Timeout in seconds of each HTTP request (default: 60)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="The recipe directory written by mirror, replaced if it exists",
+    )
+    args = parser.parse_args(argv)
+    if args.command == "mirror" and args.output is None:
+        parser.error("mirror requires --output")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    index = load_recipe_index(args.recipe_dir)
+    try:
+        packages = resolve_targets(args.targets, index)
+        sources = collect_sources(packages, index)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    store = SourceStore(args.store)
+    if args.command == "mirror":
+        try:
+            mirrored, missing = write_mirror(index, sources, store, args.output)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            return 1
+        print(
+            f"Wrote {args.output} with {len(mirrored)} recipe(s) using the store",
+            file=sys.stderr,
+        )
+        if missing:
+            print(
+                f"WARNING: sources not in the store: {', '.join(missing)}",
+                file=sys.stderr,
+            )
+        return 0
+
+    fetched, errors = fetch_sources(sources, store, args.jobs, args.timeout)
+    print(
+        f"Fetched {len(fetched)} of {len(sources)} source(s) into {args.store}",
+        file=sys.stderr,
+    )
+    for error in errors.values():
+        print(f"ERROR: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+"""Shared, on-disk cached index of the package recipes.
+
+Several tools need the same handful of fields from every ``packages/*/meta.yaml``
+(name, version, dependencies, imports, ...). Parsing ~330 YAML files takes a
+noticeable amount of time, so this module parses each recipe once and caches
+the normalized result in a JSON file. On the next run only the recipes whose
+``meta.yaml`` changed are parsed again: a recipe is reused as-is when its
+mtime and size are unchanged, and otherwise when its sha256 still matches.
+
+Usage::
+
+    from recipe_index import load_recipe_index
+
+    index = load_recipe_index()
+    index["scipy"].host_requirements
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RECIPE_DIR = BASE_DIR / "packages"
+DEFAULT_CACHE_PATH = BASE_DIR / ".cache" / "recipe-index.json"
+
+# Bump this when the fields of RecipeInfo change to invalidate old caches.
+INDEX_VERSION = 3
+
+
+@dataclasses.dataclass
+class RecipeInfo:
+    name: str
+    package_name: str
+    version: str
+    build_type: str
+    source_url: str | None
+    source_path: str | None
+    source_sha256: str | None
+    tags: list[str]
+    host_requirements: list[str]
+    run_requirements: list[str]
+    top_level: list[str]
+    test_imports: list[str]
+    # Cache validation data for the meta.yaml file.
+    mtime_ns: int
+    size: int
+    sha256: str
+
+    @property
+    def requirements(self) -> list[str]:
+        """Host and run requirements, without duplicates."""
+        return list(dict.fromkeys(self.host_requirements + self.run_requirements))
+
+    @property
+    def import_names(self) -> list[str]:
+        """Names to import when testing the package."""
+        return self.test_imports or self.top_level
+
+
+def _as_list(value: Any) -> list[str]:
+    if not value:
+        return []
+    return [str(v) for v in value]
+
+
+def parse_recipe(meta_path: Path, data: bytes, stat: os.stat_result) -> RecipeInfo:
+    """Parse the raw contents of a ``meta.yaml`` file into a :class:`RecipeInfo`."""
+    from ruamel.yaml import YAML
+
+    meta = YAML(typ="safe").load(data)
+    if not isinstance(meta, dict):
+        raise ValueError(f"{meta_path}: meta.yaml did not parse to a mapping")
+
+    package = meta.get("package") or {}
+    source = meta.get("source") or {}
+    build = meta.get("build") or {}
+    requirements = meta.get("requirements") or {}
+    test = meta.get("test") or {}
+
+    return RecipeInfo(
+        name=meta_path.parent.name,
+        package_name=package.get("name") or meta_path.parent.name,
+        version=str(package.get("version", "")),
+        build_type=str(build.get("type", "package")),
+        source_url=source.get("url"),
+        source_path=source.get("path"),
+        source_sha256=source.get("sha256"),
+        tags=_as_list(package.get("tag")),
+        host_requirements=_as_list(requirements.get("host")),
+        run_requirements=_as_list(requirements.get("run")),
+        top_level=_as_list(package.get("top-level")),
+        test_imports=_as_list(test.get("imports")),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        sha256=hashlib.sha256(data).hexdigest(),
+    )
+
+
+class RecipeIndex:
+    """A mapping from recipe directory name to :class:`RecipeInfo`."""
+
+    def __init__(self, recipe_dir: Path, cache_path: Path | None = None) -> None:
+        self.recipe_dir = recipe_dir
+        self.cache_path = cache_path
+        self.recipes: dict[str, RecipeInfo] = {}
+
+    def __getitem__(self, name: str) -> RecipeInfo:
+        return self.recipes[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.recipes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.recipes)
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def values(self) -> list[RecipeInfo]:
+        return list(self.recipes.values())
+
+    def dependents(self) -> dict[str, set[str]]:
+        """Reverse graph: package -> packages listing it as a host or run requirement."""
+        graph: dict[str, set[str]] = {}
+        for recipe in self.recipes.values():
+            for dep in recipe.requirements:
+                graph.setdefault(dep, set()).add(recipe.name)
+        return graph
+
+    def load_cache(self) -> None:
+        if self.cache_path is None or not self.cache_path.is_file():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text())
+            if data.get("version") != INDEX_VERSION:
+                return
+            if data.get("recipe_dir") != str(self.recipe_dir.resolve()):
+                return
+            self.recipes = {
+                name: RecipeInfo(**entry) for name, entry in data["recipes"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            print(
+                f"WARNING: ignoring broken recipe index {self.cache_path}: {exc}",
+                file=sys.stderr,
+            )
+            self.recipes = {}
+
+    def save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        payload = {
+            "version": INDEX_VERSION,
+            "recipe_dir": str(self.recipe_dir.resolve()),
+            "recipes": {
+                name: dataclasses.asdict(recipe)
+                for name, recipe in sorted(self.recipes.items())
+            },
+        }
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write atomically, several processes (e.g. pytest-xdist workers) may
+        # refresh the index at the same time.
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}")
+        tmp_path.write_text(json.dumps(payload, indent=1) + "\n")
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self) -> list[str]:
+        """Re-parse the recipes that changed since the index was last saved.
+
+        Returns the names of the recipes whose index entry was updated or removed.
+        """
+        changed: list[str] = []
+        recipes: dict[str, RecipeInfo] = {}
+        for meta_path in sorted(self.recipe_dir.glob("*/meta.yaml")):
+            name = meta_path.parent.name
+            stat = meta_path.stat()
+            cached = self.recipes.get(name)
+            if (
+                cached is not None
+                and cached.mtime_ns == stat.st_mtime_ns
+                and cached.size == stat.st_size
+            ):
+                recipes[name] = cached
+                continue
+
+            data = meta_path.read_bytes()
+            if cached is not None and cached.sha256 == hashlib.sha256(data).hexdigest():
+                # Touched but not modified, e.g. by a fresh git checkout.
+                recipes[name] = dataclasses.replace(
+                    cached, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+                )
+                changed.append(name)
+                continue
+
+            try:
+                recipes[name] = parse_recipe(meta_path, data, stat)
+            except Exception as exc:  # noqa: BLE001 - we want to skip broken recipes
+                print(f"WARNING: failed to parse {meta_path}: {exc}", file=sys.stderr)
+                continue
+            changed.append(name)
+
+        changed.extend(name for name in self.recipes if name not in recipes)
+        self.recipes = recipes
+        return changed
+
+
+def load_recipe_index(
+    recipe_dir: Path = RECIPE_DIR, cache_path: Path | None = None
+) -> RecipeIndex:
+    """Load the recipe index for ``recipe_dir``, refreshing the on-disk cache.
+
+    The recipes of this repository are cached in ``DEFAULT_CACHE_PATH``. Other
+    recipe directories are only cached when ``cache_path`` is given.
+    """
+    recipe_dir = Path(recipe_dir)
+    if cache_path is None and recipe_dir.resolve() == RECIPE_DIR:
+        cache_path = DEFAULT_CACHE_PATH
+
+    index = RecipeIndex(recipe_dir, cache_path)
+    index.load_cache()
+    if index.refresh():
+        try:
+            index.save_cache()
+        except OSError as exc:
+            print(f"WARNING: could not write recipe index: {exc}", file=sys.stderr)
+    return index
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""Compute a duration-aware build order for a set of recipes.
+
+``pyodide build-recipes`` starts whichever recipe becomes ready first. When a
+long recipe such as ``scipy`` or ``libgdal`` is started late, the whole build
+waits for it at the end. This script uses the build times recorded by
+``parse_build_result.py --history`` (or a previous build log) to order the
+recipes critical-path first: among the recipes whose host dependencies are
+built, the one with the longest remaining path to the end of the build goes
+first. It prints that order and the predicted wall time.
+
+Usage::
+
+    python tools/schedule_build.py "tag:core,scipy" --history build-history.jsonl
+"""
+
+import argparse
+import heapq
+import json
+import sys
+from graphlib import CycleError, TopologicalSorter
+from pathlib import Path
+
+import build_history
+from parse_build_result import parse_build_results, reverse_dependencies
+from recipe_index import RecipeIndex, load_recipe_index
+
+RECIPE_DIR = Path(__file__).parent.parent / "packages"
+
+# Used for recipes without any recorded build time.
+DEFAULT_DURATION = 60
+
+
+def resolve_targets(targets: str, index: RecipeIndex) -> set[str]:
+    """Resolve a ``build-recipes`` style target list and its dependencies.
+
+    ``targets`` is a comma separated list of recipe names, ``tag:<tag>``
+    selectors and ``*`` for all recipes. Like ``pyodide build-recipes``, the
+    host and run dependencies of the selected recipes are included.
+    """
+    selected: set[str] = set()
+    for target in (t.strip() for t in targets.split(",")):
+        if not target:
+            continue
+        if target == "*":
+            selected.update(index)
+        elif target.startswith("tag:"):
+            tag = target.removeprefix("tag:")
+            selected.update(r.name for r in index.values() if tag in r.tags)
+        elif target in index:
+            selected.add(target)
+        else:
+            raise ValueError(f"Unknown recipe: {target}")
+
+    stack = list(selected)
+    while stack:
+        for dep in index[stack.pop()].requirements:
+            if dep in index and dep not in selected:
+                selected.add(dep)
+                stack.append(dep)
+
+    return selected
+
+
+def build_dependencies(packages: set[str], index: RecipeIndex) -> dict[str, list[str]]:
+    """Host dependencies that have to be built before each package."""
+    return {
+        package: [dep for dep in index[package].host_requirements if dep in packages]
+        for package in packages
+    }
+
+
+def bottom_levels(
+    dependencies: dict[str, list[str]], durations: dict[str, float]
+) -> dict[str, float]:
+    """Length of the longest path from the start of each package to the end of the build."""
+    dependents = reverse_dependencies(dependencies)
+
+    levels: dict[str, float] = {}
+    for package in reversed(list(TopologicalSorter(dependencies).static_order())):
+        levels[package] = durations[package] + max(
+            (levels[d] for d in dependents[package]), default=0
+        )
+    return levels
+
+
+def schedule(
+    dependencies: dict[str, list[str]],
+    durations: dict[str, float],
+    threads: int,
+) -> tuple[list[str], float]:
+    """Simulate a critical-path-first list schedule on ``threads`` build threads.
+
+    Returns the order in which the packages are started and the predicted
+    wall time of the build. Raises ``graphlib.CycleError`` if the packages
+    depend on each other.
+    """
+    levels = bottom_levels(dependencies, durations)
+    remaining = {package: len(deps) for package, deps in dependencies.items()}
+    dependents = reverse_dependencies(dependencies)
+
+    # Highest bottom level first, then longest duration, then by name
+    def priority(package: str) -> tuple[float, float, str]:
+        return (-levels[package], -durations[package], package)
+
+    ready = [priority(p) for p, count in remaining.items() if count == 0]
+    heapq.heapify(ready)
+    running: list[tuple[float, str]] = []
+    order: list[str] = []
+    now = 0.0
+
+    while ready or running:
+        while ready and len(running) < threads:
+            package = heapq.heappop(ready)[2]
+            order.append(package)
+            heapq.heappush(running, (now + durations[package], package))
+
+        now, finished = heapq.heappop(running)
+        for dependent in dependents[finished]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                heapq.heappush(ready, priority(dependent))
+
+    return order, now
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "targets",
+        help="Recipes to build, e.g. 'scipy,tag:core' or '*' (like pyodide build-recipes)",
+    )
+    parser.add_argument(
+        "-d",
+        "--recipe-dir",
+        type=Path,
+        default=RECIPE_DIR,
+        help="The directory containing the recipes",
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=None,
+        help="Build time history written by parse_build_result.py --history",
+    )
+    parser.add_argument(
+        "--log",
+        type=Path,
+        default=None,
+        help="Build log of a previous build to take the build times from",
+    )
+    parser.add_argument(
+        "-n",
+        "--threads",
+        type=positive_int,
+        default=1,
+        help="Number of build threads to plan for (default: 1)",
+    )
+    parser.add_argument(
+        "--default-duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help=f"Build time in seconds of recipes without recorded times (default: {DEFAULT_DURATION})",
+    )
+    parser.add_argument(
+        "-s",
+        "--separator",
+        default=",",
+        help="The separator to use",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the order, priorities and predicted wall time as JSON",
+    )
+    return parser.parse_args(argv)
+
+
+def load_durations(args: argparse.Namespace) -> dict[str, float]:
+    durations: dict[str, float] = {}
+    if args.history is not None:
+        durations.update(
+            build_history.median_durations(build_history.load_runs(args.history))
+        )
+    if args.log is not None:
+        durations.update(
+            {
+                package: seconds
+                for package, seconds, _ in parse_build_results(args.log.read_text())
+            }
+        )
+    return durations
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    index = load_recipe_index(args.recipe_dir)
+    try:
+        packages = resolve_targets(args.targets, index)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    recorded = load_durations(args)
+    durations = {p: recorded.get(p, args.default_duration) for p in packages}
+    dependencies = build_dependencies(packages, index)
+    try:
+        order, wall_time = schedule(dependencies, durations, args.threads)
+    except CycleError as exc:
+        print(
+            f"ERROR: Dependency cycle between recipes: {' -> '.join(exc.args[1])}",
+            file=sys.stderr,
+        )
+        return 1
+
+    if args.json:
+        levels = bottom_levels(dependencies, durations)
+        print(
+            json.dumps(
+                {
+                    "threads": args.threads,
+                    "predicted_wall_time": wall_time,
+                    "critical_path_time": max(levels.values(), default=0),
+                    "order": [
+                        {
+                            "package": package,
+                            "duration": durations[package],
+                            "recorded": package in recorded,
+                            "priority": levels[package],
+                        }
+                        for package in order
+                    ],
+                },
+                indent=2,
+            )
+        )
+    else:
+        print(args.separator.join(order))
+
+    print(
+        f"Predicted wall time with {args.threads} thread(s): {wall_time / 60:.1f} min "
+        f"({len(packages) - len(recorded.keys() & packages)} recipe(s) without recorded times)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
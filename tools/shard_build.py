@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""Split a recipe build into shards that can run on separate machines.
+
+The recipes are first assigned to stages using the host dependency graph:
+every recipe is placed in the latest stage that still comes before all the
+recipes that need it at build time. Recipes nobody depends on, which are
+most of them, end up in the last stage, while shared libraries such as
+``libopenblas``, ``libgeos`` or ``libhdf5`` end up in the earlier stages. They
+are built there once and exported as artifacts to the later stages.
+
+Within each stage the recipes are distributed over N shards with roughly
+equal predicted build time, using the build times recorded by
+``parse_build_result.py --history`` (or a previous build log).
+
+Usage::
+
+    # print the whole plan as JSON
+    python tools/shard_build.py "*" --shards 4 --history build-history.jsonl
+
+    # print the recipes of one shard, to pass to `pyodide build-recipes --no-deps`
+    python tools/shard_build.py "*" --shards 4 --history build-history.jsonl \\
+        --stage 1 --shard 2
+"""
+
+import argparse
+import json
+import sys
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Any
+
+from parse_build_result import reverse_dependencies
+from recipe_index import load_recipe_index
+from schedule_build import (
+    DEFAULT_DURATION,
+    build_dependencies,
+    load_durations,
+    positive_int,
+    resolve_targets,
+)
+
+RECIPE_DIR = Path(__file__).parent.parent / "packages"
+
+
+def assign_stages(dependencies: dict[str, list[str]]) -> dict[str, int]:
+    """Assign each package to the latest stage before all of its dependents."""
+    dependents = reverse_dependencies(dependencies)
+
+    # Number of stages that have to follow each package
+    height: dict[str, int] = {}
+    for package in reversed(list(TopologicalSorter(dependencies).static_order())):
+        height[package] = max((height[d] + 1 for d in dependents[package]), default=0)
+
+    last_stage = max(height.values(), default=0)
+    return {package: last_stage - h for package, h in height.items()}
+
+
+def host_closure(package: str, dependencies: dict[str, list[str]]) -> set[str]:
+    """All packages that have to be installed to build ``package``."""
+    closure: set[str] = set()
+    stack = list(dependencies[package])
+    while stack:
+        dep = stack.pop()
+        if dep not in closure:
+            closure.add(dep)
+            stack.extend(dependencies[dep])
+    return closure
+
+
+def plan_shards(
+    dependencies: dict[str, list[str]],
+    durations: dict[str, float],
+    shards: int,
+) -> list[list[dict[str, Any]]]:
+    """Plan the stages and, within each stage, ``shards`` balanced shards.
+
+    Returns one list of shards per stage. Each shard lists the packages to
+    build, their predicted total build time and the packages from earlier
+    stages it needs as artifacts.
+    """
+    stages = assign_stages(dependencies)
+    plan: list[list[dict[str, Any]]] = []
+    for stage in range(max(stages.values(), default=-1) + 1):
+        members = [p for p, s in stages.items() if s == stage]
+        stage_shards: list[dict[str, Any]] = [
+            {"packages": [], "predicted_time": 0.0, "needs": set()}
+            for _ in range(min(shards, len(members)))
+        ]
+        # Longest processing time first: the next longest package goes to
+        # the shard with the least work so far.
+        for package in sorted(members, key=lambda p: (-durations[p], p)):
+            shard = min(stage_shards, key=lambda s: s["predicted_time"])
+            shard["packages"].append(package)
+            shard["predicted_time"] += durations[package]
+            shard["needs"] |= host_closure(package, dependencies)
+
+        for shard in stage_shards:
+            shard["packages"].sort()
+            shard["needs"] = sorted(shard["needs"])
+        plan.append(stage_shards)
+
+    return plan
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, got {value}")
+    return number
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "targets",
+        help="Recipes to build, e.g. 'scipy,tag:core' or '*' (like pyodide build-recipes)",
+    )
+    parser.add_argument(
+        "-n",
+        "--shards",
+        type=positive_int,
+        required=True,
+        help="Number of shards (machines) per stage",
+    )
+    parser.add_argument(
+        "-d",
+        "--recipe-dir",
+        type=Path,
+        default=RECIPE_DIR,
+        help="The directory containing the recipes",
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=None,
+        help="Build time history written by parse_build_result.py --history",
+    )
+    parser.add_argument(
+        "--log",
+        type=Path,
+        default=None,
+        help="Build log of a previous build to take the build times from",
+    )
+    parser.add_argument(
+        "--default-duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help=f"Build time in seconds of recipes without recorded times (default: {DEFAULT_DURATION})",
+    )
+    parser.add_argument(
+        "--stage",
+        type=non_negative_int,
+        default=None,
+        help="Only print the recipes of this stage (requires --shard)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=non_negative_int,
+        default=None,
+        help="Only print the recipes of this shard (requires --stage)",
+    )
+    parser.add_argument(
+        "-s",
+        "--separator",
+        default=",",
+        help="The separator to use with --stage/--shard",
+    )
+    args = parser.parse_args(argv)
+    if args.shard is not None and args.shard >= args.shards:
+        parser.error(f"--shard must be less than --shards ({args.shards})")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if (args.stage is None) != (args.shard is None):
+        print("ERROR: --stage and --shard must be used together", file=sys.stderr)
+        return 1
+
+    index = load_recipe_index(args.recipe_dir)
+    try:
+        packages = resolve_targets(args.targets, index)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    recorded = load_durations(args)
+    durations = {p: recorded.get(p, args.default_duration) for p in packages}
+    plan = plan_shards(build_dependencies(packages, index), durations, args.shards)
+
+    if args.stage is not None:
+        if args.stage >= len(plan):
+            print(
+                f"ERROR: --stage must be less than the number of stages ({len(plan)})",
+                file=sys.stderr,
+            )
+            return 1
+        try:
+            shard = plan[args.stage][args.shard]
+        except IndexError:
+            # Small stages have fewer shards than requested; nothing to build.
+            return 0
+        print(args.separator.join(shard["packages"]))
+        return 0
+
+    print(
+        json.dumps(
+            {
+                "shards": args.shards,
+                "predicted_wall_time": sum(
+                    max(s["predicted_time"] for s in stage) for stage in plan
+                ),
+                "stages": [
+                    [{"shard": i, **shard} for i, shard in enumerate(stage)]
+                    for stage in plan
+                ],
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from build_cache import (
+    LocalCache,
+    compute_keys,
+    restore_packages,
+    save_packages,
+    toolchain_settings,
+)
+from recipe_index import load_recipe_index
+
+RECIPES: dict[str, dict[str, Any]] = {
+    "libzlib": {"type": "static_library"},
+    "numpy": {},
+    "scipy": {"host": ["numpy", "libzlib"]},
+    "six": {},
+}
+
+
+def write_recipe(
+    recipe_dir: Path, name: str, version: str = "1.0.0", **meta: Any
+) -> None:
+    lines = ["package:", f"  name: {name}", f"  version: {version}"]
+    if "type" in meta:
+        lines += ["build:", f"  type: {meta['type']}"]
+    lines += ["requirements:", "  host:"] + [f"    - {d}" for d in meta.get("host", [])]
+    (recipe_dir / name).mkdir(exist_ok=True)
+    (recipe_dir / name / "meta.yaml").write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def recipe_dir(tmp_path):
+    recipe_dir = tmp_path / "packages"
+    recipe_dir.mkdir()
+    for name, meta in RECIPES.items():
+        write_recipe(recipe_dir, name, **meta)
+    return recipe_dir
+
+
+def keys_for(recipe_dir, settings=b"settings"):
+    index = load_recipe_index(recipe_dir)
+    return compute_keys(set(index), index, settings)
+
+
+def test_keys_change_with_inputs(recipe_dir):
+    before = keys_for(recipe_dir)
+    assert keys_for(recipe_dir) == before
+
+    # A patch changes the key of the recipe and of everything built on it
+    (recipe_dir / "numpy" / "patches").mkdir()
+    (recipe_dir / "numpy" / "patches" / "0001-fix.patch").write_text("fix\n")
+    after = keys_for(recipe_dir)
+    assert after["numpy"] != before["numpy"]
+    assert after["scipy"] != before["scipy"]
+    assert after["six"] == before["six"]
+    assert after["libzlib"] == before["libzlib"]
+
+    # So do the shared build settings
+    assert keys_for(recipe_dir, b"other")["six"] != after["six"]
+
+
+def test_toolchain_settings(tmp_path):
+    constraints = tmp_path / "constraints.txt"
+    constraints.write_text("cmake < 4\n")
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text('[tool.pyodide.build]\nrust_toolchain = "1.0"\n')
+
+    settings = toolchain_settings(constraints, pyproject, "emsdk-1")
+    assert settings == toolchain_settings(constraints, pyproject, "emsdk-1")
+    assert settings != toolchain_settings(constraints, pyproject, "emsdk-2")
+
+    pyproject.write_text('[tool.pyodide.build]\nrust_toolchain = "2.0"\n')
+    assert settings != toolchain_settings(constraints, pyproject, "emsdk-1")
+
+
+def test_save_and_restore(recipe_dir, tmp_path):
+    index = load_recipe_index(recipe_dir)
+    keys = compute_keys(set(index), index, b"settings")
+    cache = LocalCache(tmp_path / "cache")
+
+    for name in ("numpy", "scipy"):
+        dist = recipe_dir / name / "dist"
+        dist.mkdir()
+        (dist / f"{name}-1.0.0-cp313-cp313-pyodide_2025_0_wasm32.whl").write_text(name)
+
+    assert save_packages(keys, index, cache) == ["numpy", "scipy"]
+    # Already cached entries are not stored again
+    assert save_packages(keys, index, cache) == []
+
+    for name in ("numpy", "scipy"):
+        (recipe_dir / name / "dist").rename(recipe_dir / name / "dist.old")
+
+    # scipy is built on libzlib, a static library that is always rebuilt
+    restored, missing, rebuilt = restore_packages(keys, index, cache)
+    assert restored == []
+    assert missing == ["libzlib", "six"]
+    assert rebuilt == ["numpy", "scipy"]
+
+    numpy_keys = compute_keys({"numpy"}, index, b"settings")
+    restored, missing, rebuilt = restore_packages(numpy_keys, index, cache)
+    assert restored == ["numpy"]
+    assert (recipe_dir / "numpy" / "build" / ".packaged").is_file()
+    assert not (recipe_dir / "scipy" / "build" / ".packaged").exists()
+    wheel = (
+        recipe_dir
+        / "numpy"
+        / "dist"
+        / "numpy-1.0.0-cp313-cp313-pyodide_2025_0_wasm32.whl"
+    )
+    assert wheel.read_text() == "numpy"
+
+    # A version bump is a cache miss
+    write_recipe(recipe_dir, "numpy", version="2.0.0")
+    index = load_recipe_index(recipe_dir)
+    keys = compute_keys({"numpy"}, index, b"settings")
+    restored, missing, rebuilt = restore_packages(
+        keys, index, LocalCache(tmp_path / "cache")
+    )
+    assert restored == []
+
+
+def test_restore_with_rebuilt_dependent(tmp_path):
+    recipe_dir = tmp_path / "packages"
+    recipe_dir.mkdir()
+    write_recipe(recipe_dir, "libopenblas", type="shared_library")
+    write_recipe(recipe_dir, "numpy")
+    write_recipe(recipe_dir, "scipy", host=["numpy", "libopenblas"])
+    write_recipe(recipe_dir, "scikit-learn", host=["numpy", "scipy"])
+    write_recipe(recipe_dir, "six")
+    index = load_recipe_index(recipe_dir)
+    keys = compute_keys(set(index), index, b"settings")
+    cache = LocalCache(tmp_path / "cache")
+    for name in index:
+        dist = recipe_dir / name / "dist"
+        dist.mkdir()
+        (dist / f"{name}.zip").write_text(name)
+    save_packages(keys, index, cache)
+
+    restored, missing, rebuilt = restore_packages(keys, index, cache)
+    assert restored == ["libopenblas", "numpy", "scikit-learn", "scipy", "six"]
+
+    # scipy changes and is rebuilt. It needs the headers and libraries that
+    # building libopenblas and numpy installs, so they are rebuilt too, and
+    # so is scikit-learn, which is built on scipy.
+    (recipe_dir / "scipy" / "patches").mkdir()
+    (recipe_dir / "scipy" / "patches" / "0001-fix.patch").write_text("fix\n")
+    for name in index:
+        (recipe_dir / name / "build" / ".packaged").unlink()
+    keys = compute_keys(set(index), index, b"settings")
+
+    restored, missing, rebuilt = restore_packages(keys, index, cache)
+    assert restored == ["six"]
+    assert missing == ["scikit-learn", "scipy"]
+    assert rebuilt == ["libopenblas", "numpy"]
+    assert not (recipe_dir / "libopenblas" / "build" / ".packaged").exists()
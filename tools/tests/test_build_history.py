@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from build_history import append_run, find_regressions, load_runs
+
+
+def test_append_and_load_runs(tmp_path):
+    path = tmp_path / "history.jsonl"
+    assert load_runs(path) == []
+
+    append_run(path, "abc", [("numpy", 225, "3m 45s")], {"numpy": "2.4.6"})
+    append_run(path, "def", [("numpy", 230, "3m 50s")], {})
+    # A truncated line from an interrupted run is ignored
+    with path.open("a") as f:
+        f.write('{"commit": "ghi", "packa')
+
+    runs = load_runs(path)
+    assert [run["commit"] for run in runs] == ["abc", "def"]
+    assert runs[0]["packages"] == {"numpy": {"version": "2.4.6", "seconds": 225}}
+    assert runs[1]["packages"]["numpy"]["version"] == ""
+
+
+def test_find_regressions():
+    runs = [
+        {"packages": {"scipy": {"version": "1.17.0", "seconds": s}}}
+        for s in (1700, 1800, 1900, 9000)
+    ] + [{"packages": {"numpy": {"version": "2.4.6", "seconds": 20}}}]
+    results = [
+        ("scipy", 3000, "50m"),
+        ("numpy", 50, "50s"),  # slower, but below the noise floor
+        ("pandas", 600, "10m"),  # no history
+    ]
+
+    regressions = find_regressions(runs, results, {"scipy": "1.18.0"})
+    assert len(regressions) == 1
+    regression = regressions[0]
+    assert regression.package == "scipy"
+    assert regression.baseline == 1850
+    assert regression.version == "1.18.0"
+    assert regression.baseline_version == "1.17.0"
+
+    # Only the last two runs form the baseline, which includes the 9000s outlier
+    assert find_regressions(runs, results, {}, baseline_runs=2) == []
+    assert find_regressions(runs, results, {}, threshold=2.0) == []
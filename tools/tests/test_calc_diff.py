@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calc_diff import find_dependents, load_reverse_dependencies
+
+
+def write_recipe(recipe_dir, name, host=(), run=(), tags=()):
+    lines = ["package:", f"  name: {name}", "  version: 1.0.0"]
+    if tags:
+        lines.append("  tag:")
+        lines.extend(f"    - {tag}" for tag in tags)
+    lines.append("requirements:")
+    lines.append("  host:")
+    lines.extend(f"    - {dep}" for dep in host)
+    lines.append("  run:")
+    lines.extend(f"    - {dep}" for dep in run)
+    (recipe_dir / name).mkdir()
+    (recipe_dir / name / "meta.yaml").write_text("\n".join(lines) + "\n")
+
+
+def test_load_reverse_dependencies(tmp_path):
+    write_recipe(tmp_path, "libopenblas", tags=["library"])
+    write_recipe(tmp_path, "numpy")
+    write_recipe(tmp_path, "scipy", host=["numpy", "libopenblas"], run=["numpy"])
+    write_recipe(tmp_path, "pandas", run=["numpy"], tags=["min-scipy-stack"])
+
+    dependents, tags = load_reverse_dependencies(tmp_path)
+
+    assert dependents["numpy"] == {"scipy", "pandas"}
+    assert dependents["libopenblas"] == {"scipy"}
+    assert "scipy" not in dependents
+    assert tags["pandas"] == {"min-scipy-stack"}
+    assert tags["numpy"] == set()
+
+
+def test_find_dependents():
+    dependents = {
+        "libopenblas": {"scipy"},
+        "numpy": {"scipy", "pandas"},
+        "scipy": {"scikit-learn", "statsmodels"},
+        "pandas": {"statsmodels"},
+        "scikit-learn": {"imbalanced-learn"},
+    }
+
+    assert find_dependents({"libopenblas"}, dependents) == {
+        "scipy",
+        "scikit-learn",
+        "statsmodels",
+        "imbalanced-learn",
+    }
+    assert find_dependents({"libopenblas"}, dependents, max_depth=1) == {"scipy"}
+    assert find_dependents({"numpy"}, dependents, max_depth=2) == {
+        "scipy",
+        "pandas",
+        "scikit-learn",
+        "statsmodels",
+    }
+    assert find_dependents({"imbalanced-learn"}, dependents) == set()
+    assert find_dependents({"numpy", "scipy"}, dependents, max_depth=1) == {
+        "scipy",
+        "pandas",
+        "scikit-learn",
+        "statsmodels",
+    }
@@ -0,0 +1,216 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import check_pyemscripten_wheels
+from check_pyemscripten_wheels import (
+    PYPI_SIMPLE_ACCEPT,
+    HTTPClient,
+    Recipe,
+    WheelTarget,
+    build_report,
+    check_pypi_for_pyemscripten,
+    content_hash,
+    diff_reports,
+    parse_pyemscripten_wheel,
+    render_markdown,
+    scan_simple_index,
+    update_github_issue,
+)
+
+NUMPY_FILES = {
+    "files": [
+        {"filename": "numpy-2.4.3.tar.gz"},
+        {"filename": "numpy-2.4.3-cp314-cp314-pyemscripten_2026_0_wasm32.whl"},
+        {"filename": "numpy-2.4.3-cp314-cp314-manylinux_2_28_x86_64.whl"},
+    ]
+}
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = HTTPClient(timeout=5, backoff=0, cache_dir=tmp_path / "http-cache")
+    yield client
+    client.close()
+
+
+def test_check_pypi(httpserver, client):
+    httpserver.expect_request("/simple/numpy/").respond_with_json(NUMPY_FILES)
+    httpserver.expect_request("/simple/does-not-exist/").respond_with_data(status=404)
+    result = check_pypi_for_pyemscripten(
+        "numpy", client, index_url=httpserver.url_for("/simple/")
+    )
+    assert result.found
+    assert result.platform_tags == ["pyemscripten_2026_0_wasm32"]
+    assert result.wheel_versions == ["2.4.3"]
+
+    result = check_pypi_for_pyemscripten(
+        "does-not-exist", client, index_url=httpserver.url_for("/simple/")
+    )
+    assert not result.found
+    assert result.error == "not found on PyPI"
+
+
+@pytest.mark.parametrize(
+    "filename, version, compatible",
+    [
+        ("numpy-2.4.3-cp314-cp314-pyemscripten_2026_0_wasm32.whl", "2.4.3", True),
+        # An older release of the project
+        ("numpy-2.4.2-cp314-cp314-pyemscripten_2026_0_wasm32.whl", "2.4.3", False),
+        # Built for another Python version or pyemscripten ABI
+        ("numpy-2.4.3-cp313-cp313-pyemscripten_2025_0_wasm32.whl", "2.4.3", False),
+        ("numpy-2.4.3-cp314-cp314-pyemscripten_2027_0_wasm32.whl", "2.4.3", False),
+        # Stable ABI of an older CPython and pure Python wheels
+        ("pkg-1.0-cp312-abi3-pyemscripten_2026_0_wasm32.whl", "1.0.0", True),
+        ("pkg-1.0-cp315-abi3-pyemscripten_2026_0_wasm32.whl", "1.0", False),
+        ("pkg-1.0-py3-none-pyemscripten_2026_0_wasm32.whl", "1.0", True),
+        # Compressed tag sets
+        ("pkg-1.0-cp313.cp314-cp313.cp314-pyemscripten_2026_0_wasm32.whl", "1.0", True),
+    ],
+)
+def test_compatible_wheels(filename, version, compatible):
+    result = scan_simple_index(
+        {"files": [{"filename": filename}]}, version, WheelTarget()
+    )
+    assert result.found
+    assert result.compatible_wheels == ([filename] if compatible else [])
+
+
+def test_parse_pyemscripten_wheel():
+    (wheel,) = parse_pyemscripten_wheel(
+        "numpy-2.4.3-cp314-cp314-pyemscripten_2026_0_wasm32.whl"
+    )
+    assert (wheel.version, wheel.python, wheel.abi) == ("2.4.3", "cp314", "cp314")
+    assert (wheel.abi_year, wheel.abi_patch) == (2026, 0)
+    assert parse_pyemscripten_wheel("numpy-2.4.3-cp314-cp314-win_amd64.whl") == []
+    assert parse_pyemscripten_wheel("not-a-wheel.whl") == []
+
+
+def test_conditional_requests(httpserver, tmp_path):
+    url = httpserver.url_for("/simple/numpy/")
+    httpserver.expect_ordered_request("/simple/numpy/").respond_with_data(
+        json.dumps(NUMPY_FILES), headers={"ETag": '"v1"'}
+    )
+    httpserver.expect_ordered_request(
+        "/simple/numpy/", headers={"If-None-Match": '"v1"'}
+    ).respond_with_data(status=304)
+
+    first = HTTPClient(timeout=5, cache_dir=tmp_path)
+    assert first.get_json(url, PYPI_SIMPLE_ACCEPT) == (200, NUMPY_FILES)
+    assert first.stats["downloaded"] == 1
+
+    # A later run sends the validator and reuses the cached body
+    second = HTTPClient(timeout=5, cache_dir=tmp_path)
+    assert second.get_json(url, PYPI_SIMPLE_ACCEPT) == (304, NUMPY_FILES)
+    assert second.stats == {"downloaded": 0, "not_modified": 1, "retried": 0}
+    httpserver.check_assertions()
+
+
+def test_retry_and_redirect(httpserver, client):
+    httpserver.expect_ordered_request("/simple/Pillow/").respond_with_data(status=503)
+    httpserver.expect_ordered_request("/simple/Pillow/").respond_with_data(
+        status=301, headers={"Location": "/simple/pillow/"}
+    )
+    httpserver.expect_ordered_request("/simple/pillow/").respond_with_json(
+        {"files": []}
+    )
+
+    status, data = client.get_json(
+        httpserver.url_for("/simple/Pillow/"), PYPI_SIMPLE_ACCEPT
+    )
+    assert (status, data) == (200, {"files": []})
+    assert client.stats["retried"] == 1
+    httpserver.check_assertions()
+
+
+def test_retries_exhausted(httpserver, client):
+    httpserver.expect_request("/simple/numpy/").respond_with_data(status=500)
+    with pytest.raises(RuntimeError, match="failed after 3 attempts: HTTP 500"):
+        client.get_json(httpserver.url_for("/simple/numpy/"), PYPI_SIMPLE_ACCEPT)
+
+
+def make_recipe(name, version):
+    return Recipe(name, name, version, f"https://example.com/{name}.tar.gz", "package")
+
+
+def test_build_report_reuses_unchanged_recipes(httpserver, client):
+    index_url = httpserver.url_for("/simple/")
+    for name in ("numpy", "scipy"):
+        httpserver.expect_request(
+            f"/simple/{name}/", headers={"If-None-Match": '"v1"'}
+        ).respond_with_data(status=304)
+        httpserver.expect_request(f"/simple/{name}/").respond_with_data(
+            json.dumps(NUMPY_FILES if name == "numpy" else {"files": []}),
+            headers={"ETag": '"v1"'},
+        )
+
+    recipes = [make_recipe("numpy", "2.4.3"), make_recipe("scipy", "1.17.0")]
+    previous = build_report(recipes, 2, client, index_url=index_url)
+    assert previous["available_count"] == 1
+    assert previous["compatible_count"] == 1
+
+    # Tamper with the previous status to see which entries are reused
+    previous["packages"][0]["matching_wheels"] = ["reused"]
+    previous["packages"][1]["matching_wheels"] = ["reused"]
+    recipes[1] = make_recipe("scipy", "1.18.0")
+    report = build_report(recipes, 2, client, index_url=index_url, previous=previous)
+    assert report["packages"][0]["matching_wheels"] == ["reused"]
+    assert report["packages"][1]["matching_wheels"] == []
+    assert client.stats["not_modified"] == 2
+
+    diff = diff_reports(previous, report)
+    assert diff["newly_available"] == []
+    assert diff["newly_missing"] == []
+    assert [d["recipe"] for d in diff["version_drift"]] == ["scipy"]
+
+    report["packages"][0]["has_compatible_wheel"] = False
+    report["packages"][1]["has_compatible_wheel"] = True
+    diff = diff_reports(previous, report)
+    assert diff["newly_available"] == ["scipy"]
+    assert diff["newly_missing"] == ["numpy"]
+
+
+def test_update_issue_skips_unchanged_body(httpserver, monkeypatch):
+    monkeypatch.setattr(check_pyemscripten_wheels, "GITHUB_API", httpserver.url_for(""))
+    report = {
+        "generated_at": "2026-01-01T00:00:00",
+        "pep783_platform_regex": "",
+        "target": {"python": "cp314", "platform": "pyemscripten_2026_0_wasm32"},
+        "total_recipes": 0,
+        "total_source_recipes": 0,
+        "available_count": 0,
+        "compatible_count": 0,
+        "packages": [],
+    }
+    body = render_markdown(report)
+    # Only the timestamp changed since the issue was last updated
+    assert content_hash(report) == content_hash({**report, "generated_at": "later"})
+    httpserver.expect_request("/repos/o/r/issues").respond_with_json(
+        [{"number": 1, "title": "Tracker", "body": body}]
+    )
+
+    update_github_issue(
+        "o/r",
+        "token",
+        "Tracker",
+        "label",
+        render_markdown({**report, "generated_at": "later"}),
+    )
+    assert [r.method for r, _ in httpserver.log] == ["GET"]
+
+    httpserver.expect_request("/repos/o/r/issues/1", method="PATCH").respond_with_json(
+        {"html_url": "https://github.com/o/r/issues/1"}
+    )
+    update_github_issue(
+        "o/r",
+        "token",
+        "Tracker",
+        "label",
+        render_markdown({**report, "available_count": 1}),
+    )
+    assert [r.method for r, _ in httpserver.log] == ["GET", "GET", "PATCH"]
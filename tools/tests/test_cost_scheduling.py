@@ -0,0 +1,192 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cost_scheduling import (
+    RecordedTest,
+    Timings,
+    browser_kind,
+    parse_shard,
+    split_into_shards,
+)
+
+CONFTEST = """
+import os
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).parent
+
+@pytest.fixture(autouse=True)
+def record_worker(request):
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    with (HERE / "workers.txt").open("a") as f:
+        f.write(f"{request.node.nodeid} {worker}\\n")
+
+def pytest_sessionfinish(session):
+    dsession = session.config.pluginmanager.getplugin("dsession")
+    if dsession is not None:
+        (HERE / "scheduler.txt").write_text(type(dsession.sched).__name__)
+
+@pytest.fixture(scope="module")
+def selenium_module_scope():
+    return "browser"
+
+@pytest.fixture
+def selenium(selenium_module_scope):
+    return selenium_module_scope
+
+@pytest.fixture
+def selenium_standalone():
+    return "browser"
+"""
+
+TESTS = """
+import time
+
+def test_shared_1(selenium):
+    time.sleep(0.05)
+
+def test_shared_2(selenium):
+    pass
+
+def test_standalone(selenium_standalone):
+    time.sleep(0.1)
+
+def test_plain():
+    pass
+"""
+
+
+def test_browser_kind():
+    assert browser_kind(["request", "selenium", "selenium_module_scope"]) == "shared"
+    assert browser_kind(["selenium_standalone", "benchmark"]) == "standalone"
+    assert browser_kind(["tmp_path"]) == "none"
+
+
+def test_timings(tmp_path):
+    timings = Timings()
+    assert timings.cost("a.py::test_a") == 1.0
+
+    timings.update("a.py::test_a", 4.0, "shared")
+    timings.update("a.py::test_b", 1.0, "shared")
+    timings.update("b.py::test_c", 2.0, "standalone")
+    timings.save(tmp_path / "timings.json")
+
+    timings = Timings.load(tmp_path / "timings.json")
+    assert timings.tests["b.py::test_c"] == RecordedTest(2.0, "standalone")
+    # Unknown tests cost the median of the recorded ones
+    assert timings.cost("c.py::test_d") == 2.0
+    assert timings.unit("a.py::test_a") == "a.py"
+    assert timings.unit("b.py::test_c") == "b.py::test_c"
+    assert timings.unit("c.py::test_d", "shared") == "c.py"
+
+    (tmp_path / "timings.json").write_text(json.dumps({"version": 0}))
+    assert Timings.load(tmp_path / "timings.json").tests == {}
+    assert Timings.load(tmp_path / "missing.json").tests == {}
+
+
+def test_split_into_shards():
+    units = {"a": 10.0, "b": 6.0, "c": 5.0, "d": 1.0}
+    assert split_into_shards(units, 2) == [["a", "d"], ["b", "c"]]
+    assert split_into_shards(units, 5) == [["a"], ["b"], ["c"], ["d"], []]
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == (1, 3)
+    for value in ("3", "0/3", "4/3", "a/b"):
+        with pytest.raises(ValueError, match="invalid shard"):
+            parse_shard(value)
+
+
+def run_pytest(path, *args):
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(Path(__file__).parent.parent),
+        # Keep pytest-pyodide from treating the fake browser fixtures as browsers
+        "PYTEST_DISABLE_PLUGIN_AUTOLOAD": "1",
+    }
+    return subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pytest",
+            "-p",
+            "xdist",
+            "-p",
+            "cost_scheduling",
+            "-p",
+            "no:cacheprovider",
+            *args,
+        ],
+        cwd=path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+@pytest.mark.parametrize("xdist", [[], ["-n", "2"]])
+def test_record_and_shard(tmp_path, xdist):
+    (tmp_path / "conftest.py").write_text(CONFTEST)
+    (tmp_path / "test_a.py").write_text(TESTS)
+    timings_file = tmp_path / "timings.json"
+
+    result = run_pytest(tmp_path, "--test-timings", str(timings_file), *xdist)
+    assert result.returncode == 0, result.stdout
+    tests = Timings.load(timings_file).tests
+    assert {nodeid: t.browser for nodeid, t in tests.items()} == {
+        "test_a.py::test_shared_1": "shared",
+        "test_a.py::test_shared_2": "shared",
+        "test_a.py::test_standalone": "standalone",
+        "test_a.py::test_plain": "none",
+    }
+    assert tests["test_a.py::test_standalone"].duration >= 0.1
+
+    if xdist:
+        # Nothing was recorded yet, xdist schedules the tests by itself
+        assert (tmp_path / "scheduler.txt").read_text() == "LoadScheduling"
+        (tmp_path / "workers.txt").unlink()
+
+        result = run_pytest(tmp_path, "--test-timings", str(timings_file), *xdist)
+        assert result.returncode == 0, result.stdout
+        assert (tmp_path / "scheduler.txt").read_text() == "CostScheduling"
+        workers = dict(
+            line.split() for line in (tmp_path / "workers.txt").read_text().splitlines()
+        )
+        assert len(workers) == 4
+        assert len(set(workers.values())) == 2
+        assert (
+            workers["test_a.py::test_shared_1"] == workers["test_a.py::test_shared_2"]
+        )
+
+    shards = []
+    for shard in ("1/2", "2/2"):
+        result = run_pytest(
+            tmp_path,
+            "--test-timings",
+            str(timings_file),
+            "--shard",
+            shard,
+            "-q",
+            "--co",
+        )
+        assert result.returncode == 0, result.stdout
+        shards.append({line for line in result.stdout.splitlines() if "::" in line})
+    # The slowest test gets a shard of its own, the tests sharing a browser
+    # stay together
+    assert shards[0] == {"test_a.py::test_standalone"}
+    assert shards[1] == {
+        "test_a.py::test_shared_1",
+        "test_a.py::test_shared_2",
+        "test_a.py::test_plain",
+    }
@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from import_budget import (
+    Regression,
+    check_budgets,
+    load_baseline,
+    main,
+    read_import_times,
+    update_baseline,
+)
+
+
+def write_report(path, times):
+    cases = "".join(
+        f'<testcase classname="packages.test_packages_common" name="{name}" time="1">'
+        f'<properties><property name="import_time" value="{seconds}" /></properties>'
+        "</testcase>"
+        for name, seconds in times.items()
+    )
+    path.write_text(
+        f'<testsuites><testsuite name="pytest">{cases}</testsuite></testsuites>'
+    )
+    return path
+
+
+def test_read_import_times(tmp_path):
+    report = write_report(
+        tmp_path / "results.xml",
+        {
+            "test_import[chrome-numpy]": 0.5,
+            "test_import[node-py-cpuinfo]": 0.01,
+            "test_parse_recipe": 3.0,
+        },
+    )
+    assert read_import_times([report]) == {
+        ("chrome", "numpy"): 0.5,
+        ("node", "py-cpuinfo"): 0.01,
+    }
+
+
+def test_update_and_check():
+    samples = {}
+    for seconds in (1.0, 1.2, 0.8, 5.0):
+        update_baseline(samples, {("chrome", "scipy"): seconds}, keep=3)
+    assert samples == {"chrome": {"scipy": [1.2, 0.8, 5.0]}}
+
+    times = {
+        ("chrome", "scipy"): 1.9,
+        ("node", "scipy"): 10.0,  # no baseline
+    }
+    # Median 1.2, budget 1.8
+    assert check_budgets(samples, times, factor=1.5, min_increase=0.1) == [
+        Regression("chrome", "scipy", 1.2, 1.2 * 1.5, 1.9)
+    ]
+    assert check_budgets(samples, times, factor=1.5, min_increase=1.0) == []
+
+
+def test_main(tmp_path, capsys):
+    baseline = tmp_path / "import-times.json"
+    first = write_report(tmp_path / "first.xml", {"test_import[chrome-numpy]": 0.5})
+    second = write_report(tmp_path / "second.xml", {"test_import[chrome-numpy]": 1.0})
+
+    assert main(["update", str(first), "--baseline", str(baseline)]) == 0
+    assert load_baseline(baseline) == {"chrome": {"numpy": [0.5]}}
+
+    assert main(["check", str(second), "--baseline", str(baseline)]) == 0
+    assert "WARNING: importing numpy on chrome took 1.00s" in capsys.readouterr().err
+    assert main(["check", str(second), "--baseline", str(baseline), "--fail"]) == 1
+    assert main(["check", str(first), "--baseline", str(baseline), "--fail"]) == 0
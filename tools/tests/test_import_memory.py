@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from import_memory import MIB, check_budgets, main, read_footprints
+
+
+def write_report(path, tests):
+    cases = []
+    for name, properties in tests.items():
+        props = "".join(
+            f'<property name="{key}" value="{value}" />'
+            for key, value in properties.items()
+        )
+        cases.append(
+            f'<testcase name="{name}" time="1"><properties>{props}</properties></testcase>'
+        )
+    path.write_text(
+        f"<testsuites><testsuite name='pytest'>{''.join(cases)}</testsuite></testsuites>"
+    )
+    return path
+
+
+def make_report(tmp_path):
+    return write_report(
+        tmp_path / "results.xml",
+        {
+            "test_import[node-numpy]": {
+                "import_time": 0.5,
+                "wasm_memory_growth": 40 * MIB,
+                "python_heap": 5 * MIB,
+                "python_heap_peak": 8 * MIB,
+            },
+            "test_import[node-scipy]": {
+                "wasm_memory_growth": 300 * MIB,
+                "python_heap": 20 * MIB,
+                "python_heap_peak": 30 * MIB,
+            },
+            # Run without --import-memory
+            "test_import[node-six]": {"import_time": 0.01},
+        },
+    )
+
+
+def test_read_footprints(tmp_path):
+    footprints = read_footprints([make_report(tmp_path)])
+    assert [f.package for f in footprints] == ["scipy", "numpy"]
+    assert footprints[1].python_heap_peak == 8 * MIB
+
+
+def test_check_budgets(tmp_path):
+    footprints = read_footprints([make_report(tmp_path)])
+    over = check_budgets(footprints, 256, 10, {})
+    assert [(f.package, f.over_budget) for f in over] == [
+        ("scipy", ["wasm_memory_growth", "python_heap"])
+    ]
+
+    over = check_budgets(footprints, 256, 10, {"scipy": {"wasm_memory_growth": 400}})
+    assert [(f.package, f.over_budget) for f in over] == [("scipy", ["python_heap"])]
+
+
+def test_main(tmp_path, capsys):
+    report = make_report(tmp_path)
+    budgets = tmp_path / "budgets.json"
+    budgets.write_text(json.dumps({"scipy": {"wasm_memory_growth": 400}}))
+    output = tmp_path / "memory.json"
+
+    args = [str(report), "--output-json", str(output)]
+    assert main([*args, "--fail"]) == 1
+    assert "ERROR: importing scipy on node exceeds" in capsys.readouterr().err
+    assert main([*args, "--budgets", str(budgets), "--fail"]) == 0
+    assert [f["package"] for f in json.loads(output.read_text())] == ["scipy", "numpy"]
+
+    markdown = tmp_path / "memory.md"
+    assert main([str(report), "--output-markdown", str(markdown)]) == 0
+    assert "| scipy | node | 300.0 | 20.0 | 30.0 | wasm_memory_growth |" in (
+        markdown.read_text()
+    )
@@ -0,0 +1,73 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from import_profile import diff_profiles, flatten, main, profile_imports
+
+
+@pytest.fixture
+def fake_package(tmp_path, monkeypatch):
+    package = tmp_path / "profiled_pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text(
+        "import time\nfrom . import sub\ntime.sleep(0.02)\n"
+    )
+    (package / "sub.py").write_text("import time\ntime.sleep(0.01)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "profiled_pkg"
+    for name in ("profiled_pkg", "profiled_pkg.sub"):
+        sys.modules.pop(name, None)
+
+
+def test_profile_imports(fake_package):
+    profile = profile_imports([fake_package])
+    assert profile["modules"] == 2
+
+    (pkg,) = profile["tree"]
+    assert pkg["module"] == "profiled_pkg"
+    (sub,) = pkg["children"]
+    assert sub["module"] == "profiled_pkg.sub"
+    assert sub["cumulative_us"] >= 10_000
+    assert pkg["self_us"] == pkg["cumulative_us"] - sub["cumulative_us"]
+    assert pkg["self_us"] >= 20_000
+    assert profile["total_us"] == pkg["cumulative_us"]
+
+    # Already imported modules are not recorded again
+    assert profile_imports([fake_package])["tree"] == []
+
+
+def make_profile(self_times):
+    return {
+        "total_us": sum(self_times.values()),
+        "tree": [
+            {"module": module, "self_us": us, "cumulative_us": us, "children": []}
+            for module, us in self_times.items()
+        ],
+    }
+
+
+def test_diff_profiles(tmp_path, capsys):
+    old = make_profile({"a": 100, "b": 50, "gone": 10})
+    new = make_profile({"a": 90, "b": 500, "new": 30})
+    assert set(flatten(new["tree"])) == {"a", "b", "new"}
+    assert diff_profiles(old, new) == [
+        ("b", 50, 500),
+        ("new", 0, 30),
+        ("a", 100, 90),
+        ("gone", 10, 0),
+    ]
+
+    (tmp_path / "old.json").write_text(json.dumps(old))
+    (tmp_path / "new.json").write_text(json.dumps(new))
+    assert (
+        main([str(tmp_path / "old.json"), str(tmp_path / "new.json"), "--top", "1"])
+        == 0
+    )
+    out = capsys.readouterr().out
+    assert "total_us" in out
+    assert out.splitlines()[-1].split() == ["b", "50", "500"]
@@ -1,13 +1,20 @@
 import sys
+import time
 from pathlib import Path
 
 # Add the parent directory to sys.path to import the module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from parse_build_result import (
+    BuildLog,
+    analyze_build,
+    follow_build_log,
+    format_progress,
     format_time,
     generate_markdown_table,
+    parse_build_log,
     parse_build_results,
+    parse_build_threads,
     parse_time,
     process_build_results,
 )
@@ -118,3 +125,117 @@ def test_process_build_results_empty():
     assert "Total packages built: 0" in output
     assert "Total build time: Failed to parse total build time" in output
     assert "Longest build" not in output  # No statistics for empty results
+
+
+def test_analyze_build():
+    """Test the critical path and parallelism analysis."""
+    content = """
+    [1/5] (thread 1) built libopenblas in 5m
+    [2/5] (thread 2) built numpy in 3m 45s
+    [3/5] (thread 2) built pandas in 10m 10s
+    [4/5] (thread 1) built scipy in 30m
+    [5/5] (thread 3) built scikit-learn in 8m 20s
+    """
+    dependencies = {
+        "numpy": [],
+        "pandas": ["numpy"],
+        "scipy": ["numpy", "libopenblas", "libboost"],
+        "scikit-learn": ["numpy", "scipy"],
+    }
+
+    analysis = analyze_build(
+        parse_build_results(content),
+        parse_build_threads(content),
+        dependencies,
+        wall_time=3000,
+    )
+
+    assert analysis.cpu_time == 300 + 225 + 610 + 1800 + 500
+    assert analysis.critical_path == ["libopenblas", "scipy", "scikit-learn"]
+    assert analysis.critical_path_time == 300 + 1800 + 500
+    assert analysis.threads == {1: (2, 2100), 2: (2, 835), 3: (1, 500)}
+    assert analysis.slack["scipy"] == 0
+    assert analysis.slack["numpy"] == 75  # could have finished 75s later
+    assert analysis.slack["pandas"] == 2600 - 225 - 610
+
+
+def test_process_build_results_with_dependencies():
+    """Test that the analysis is only added when the dependencies are given."""
+    content = """
+    [1/2] (thread 1) built numpy in 3m 45s
+    Building packages... ━━━━━━━━━━━━━━━━━━━━━━━━ 1/2 50% Time elapsed: 0:04:00
+    [2/2] (thread 2) built pandas in 10m 10s
+    Building packages... ━━━━━━━━━━━━━━━━━━━━━━━━ 2/2 100% Time elapsed: 0:14:00
+    """
+
+    assert "## Build Parallelism" not in process_build_results(content)
+
+    output = process_build_results(content, {"pandas": ["numpy"]})
+    assert "## Build Parallelism" in output
+    assert "Critical path: numpy (3m 45s) → pandas (10m 10s)" in output
+    assert "Wall time: 14m" in output
+    assert "| 2 | 1 | 10m 10s | 73% |" in output
+
+
+def test_parse_build_log_stream(tmp_path):
+    """Test parsing a log file in a single streaming pass."""
+    path = tmp_path / "build.log"
+    path.write_text(
+        "[1/3] (thread 1) building numpy\n"
+        "[2/3] (thread 2) building pandas\n"
+        "some very long compiler output line (thread safety) built in\n"
+        "[1/3] (thread 1) built numpy in 3m 45s\n"
+        "Building packages... 1/3 33% Time elapsed: 0:04:00\n"
+        "Building packages... 3/3 100% Time elapsed: 0:14:00\n"
+    )
+
+    with path.open() as f:
+        log = parse_build_log(f)
+
+    assert log.results == [("numpy", 225, "3m 45s")]
+    assert log.threads == {"numpy": 1}
+    assert log.running == {2: "pandas"}
+    assert log.total_packages == 3
+    assert log.total_build_time == "0:04:00"
+    assert log.wall_time == "0:14:00"
+
+    assert format_progress(log, None) == "[1/3 built] | running: thread 2: pandas"
+    assert (
+        format_progress(log, 2.0)
+        == "[1/3 built] | 2.0 packages/min | ETA 1m | running: thread 2: pandas"
+    )
+
+
+def test_follow_build_log(tmp_path):
+    """Test that following a finished build log returns once all packages are built."""
+    path = tmp_path / "build.log"
+    path.write_text(
+        "[1/2] (thread 1) built numpy in 3m 45s\n"
+        "[2/2] (thread 2) built pandas in 10m 10s\n"
+    )
+
+    log = BuildLog()
+    with path.open() as f:
+        follow_build_log(f, log, poll_interval=0.01)
+    assert [r[0] for r in log.results] == ["numpy", "pandas"]
+
+    # An unfinished build stops after the idle timeout
+    path.write_text("[1/2] (thread 1) built numpy in 3m 45s\n[2/2] (thread 2) buil")
+    log = BuildLog()
+    with path.open() as f:
+        follow_build_log(f, log, poll_interval=0.01, idle_timeout=0.05)
+    assert [r[0] for r in log.results] == ["numpy"]
+
+    # A failed build stops right away, without waiting for the idle timeout
+    path.write_text(
+        "[1/3] (thread 1) built numpy in 3m 45s\n"
+        "[2/3] (thread 2) failed pandas in 1m 2s\n"
+        "ERROR: cancelling buildall\n"
+    )
+    log = BuildLog()
+    start = time.monotonic()
+    with path.open() as f:
+        follow_build_log(f, log, poll_interval=0.01)
+    assert time.monotonic() - start < 5
+    assert log.failed
+    assert [r[0] for r in log.results] == ["numpy"]
@@ -0,0 +1,166 @@
+import hashlib
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from prefetch_sources import (
+    Source,
+    SourceStore,
+    collect_sources,
+    fetch_sources,
+    main,
+    parse_args,
+    substitute_env,
+)
+from recipe_index import load_recipe_index
+
+TARBALL = b"not really a tarball"
+SHA256 = hashlib.sha256(TARBALL).hexdigest()
+
+
+@pytest.fixture
+def recipe_dir(tmp_path, httpserver):
+    recipe_dir = tmp_path / "packages"
+    url = httpserver.url_for("/files/pkg-1.0.tar.gz")
+    for name in ("pkg", "pkg-tests"):
+        (recipe_dir / name).mkdir(parents=True)
+        (recipe_dir / name / "meta.yaml").write_text(
+            f"package:\n  name: {name}\n  version: 1.0\n"
+            f"source:\n  url: {url}\n  sha256: {SHA256}\n"
+        )
+    (recipe_dir / "local").mkdir()
+    (recipe_dir / "local" / "meta.yaml").write_text(
+        "package:\n  name: local\n  version: 1.0\nsource:\n  path: src\n"
+    )
+    return recipe_dir
+
+
+def test_fetch(recipe_dir, tmp_path, httpserver):
+    httpserver.expect_ordered_request("/files/pkg-1.0.tar.gz").respond_with_data(
+        TARBALL
+    )
+    index = load_recipe_index(recipe_dir)
+    sources = collect_sources(set(index), index)
+    # Both recipes share one source, the local recipe has none
+    assert len(sources) == 1
+    assert sources[0].recipes == ["pkg", "pkg-tests"]
+
+    store = SourceStore(tmp_path / "store")
+    fetched, errors = fetch_sources(sources, store, jobs=4, timeout=5)
+    assert errors == {}
+    assert len(fetched) == 1
+    assert store.blob_path(SHA256).read_bytes() == TARBALL
+
+    # Already stored sources are not downloaded again, even by a new process
+    store = SourceStore(tmp_path / "store")
+    assert fetch_sources(sources, store, jobs=4, timeout=5) == ([], {})
+    httpserver.check_assertions()
+    assert store.manifest[sources[0].url]["filename"] == "pkg-1.0.tar.gz"
+
+
+def test_fetch_checksum_mismatch(tmp_path, httpserver):
+    httpserver.expect_request("/bad.tar.gz").respond_with_data(b"tampered")
+    source = Source(httpserver.url_for("/bad.tar.gz"), SHA256, ["bad"])
+    store = SourceStore(tmp_path / "store")
+
+    fetched, errors = fetch_sources([source], store, jobs=1, timeout=5)
+    assert fetched == []
+    assert "checksum mismatch" in errors[source.url]
+    assert not store.blob_path(SHA256).exists()
+    assert list((tmp_path / "store" / "sha256").iterdir()) == []
+
+
+def test_substitute_env(tmp_path):
+    env = {"PYODIDE_ABI_VERSION": "2025_0"}
+    assert (
+        substitute_env("https://example.com/pkg-$(PYODIDE_ABI_VERSION).zip", env)
+        == "https://example.com/pkg-2025_0.zip"
+    )
+    with pytest.raises(ValueError, match=r"\$\(MISSING\) is not set"):
+        substitute_env("https://example.com/$(MISSING).zip", env)
+
+    recipe_dir = tmp_path / "packages"
+    (recipe_dir / "pkg").mkdir(parents=True)
+    (recipe_dir / "pkg" / "meta.yaml").write_text(
+        "package:\n  name: pkg\n  version: 1.0\n"
+        "source:\n  url: https://example.com/pkg-$(PYODIDE_ABI_VERSION).zip\n"
+        f"  sha256: {SHA256}\n"
+    )
+    index = load_recipe_index(recipe_dir)
+    [source] = collect_sources(set(index), index, env)
+    assert source.url == "https://example.com/pkg-2025_0.zip"
+
+
+def test_fetch_retries(tmp_path, httpserver, monkeypatch):
+    delays: list[float] = []
+    monkeypatch.setattr(time, "sleep", delays.append)
+    for status in (503, 429):
+        httpserver.expect_ordered_request("/flaky.tar.gz").respond_with_data(
+            b"", status=status
+        )
+    httpserver.expect_ordered_request("/flaky.tar.gz").respond_with_data(TARBALL)
+    store = SourceStore(tmp_path / "store")
+
+    source = Source(httpserver.url_for("/flaky.tar.gz"), SHA256, ["flaky"])
+    assert store.fetch(source, timeout=5, backoff=0.5) == "flaky.tar.gz"
+    assert delays == [0.5, 1.0]
+    httpserver.check_assertions()
+
+    # Client errors are not retried
+    httpserver.expect_request("/gone.tar.gz").respond_with_data(b"", status=404)
+    source = Source(httpserver.url_for("/gone.tar.gz"), SHA256, ["gone"])
+    with pytest.raises(RuntimeError, match="404"):
+        store.fetch(source, timeout=5, backoff=0.5)
+    assert delays == [0.5, 1.0]
+    assert [r.path for r, _ in httpserver.log].count("/gone.tar.gz") == 1
+
+
+def test_mirror(recipe_dir, tmp_path, httpserver):
+    httpserver.expect_request("/files/pkg-1.0.tar.gz").respond_with_data(TARBALL)
+    (recipe_dir / "pkg" / "patches").mkdir()
+    (recipe_dir / "pkg" / "patches" / "fix.patch").write_text("--- a\n+++ b\n")
+    (recipe_dir / "pkg" / "build").mkdir()
+    store_dir = tmp_path / "store"
+    output = tmp_path / "offline"
+    args = ["-d", str(recipe_dir), "--store", str(store_dir)]
+
+    assert main(["fetch", "*", *args]) == 0
+    httpserver.clear()
+    assert main(["mirror", "*", *args, "--output", str(output)]) == 0
+
+    # The mirror resolves the sources without any request to the server
+    index = load_recipe_index(output)
+    assert sorted(index) == ["local", "pkg", "pkg-tests"]
+    for name in ("pkg", "pkg-tests"):
+        url = index[name].source_url
+        assert url is not None
+        assert url.startswith("file://")
+        assert index[name].source_sha256 == SHA256
+        # Like pyodide-build downloads the source
+        with urllib.request.urlopen(url) as response:
+            assert response.read() == TARBALL
+            assert Path(response.geturl()).name == "pkg-1.0.tar.gz"
+    assert httpserver.log == []
+
+    assert (output / "pkg" / "patches" / "fix.patch").read_text() == "--- a\n+++ b\n"
+    assert not (output / "pkg" / "build").exists()
+    assert index["local"].source_path == "src"
+    assert (recipe_dir / "pkg" / "meta.yaml").read_text().count("http://") == 1
+
+    # The mirror is written again from scratch
+    assert main(["mirror", "pkg", *args, "--output", str(output)]) == 0
+    assert main(["mirror", "pkg", *args, "--output", str(recipe_dir)]) == 1
+
+
+def test_parse_args():
+    with pytest.raises(SystemExit):
+        parse_args(["fetch", "*", "--jobs", "0"])
+    with pytest.raises(SystemExit):
+        parse_args(["mirror", "*"])
+    assert parse_args(["mirror", "*", "-o", "out"]).output == Path("out")
@@ -0,0 +1,92 @@
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from recipe_index import load_recipe_index
+
+SCIPY_META = """
+package:
+  name: scipy
+  version: 1.18.0
+  tag:
+    - min-scipy-stack
+  top-level:
+    - scipy
+source:
+  url: https://files.pythonhosted.org/packages/source/s/scipy/scipy-1.18.0.tar.gz
+requirements:
+  host:
+    - numpy
+    - libopenblas
+  run:
+    - numpy
+test:
+  imports:
+    - scipy
+    - scipy.linalg
+"""
+
+LIBOPENBLAS_META = """
+package:
+  name: libopenblas
+  version: 0.3.26
+build:
+  type: shared_library
+"""
+
+
+def make_recipes(recipe_dir):
+    for name, meta in [("scipy", SCIPY_META), ("libopenblas", LIBOPENBLAS_META)]:
+        (recipe_dir / name).mkdir(parents=True)
+        (recipe_dir / name / "meta.yaml").write_text(meta)
+
+
+def test_recipe_fields(tmp_path):
+    make_recipes(tmp_path)
+    index = load_recipe_index(tmp_path)
+
+    assert sorted(index) == ["libopenblas", "scipy"]
+
+    scipy = index["scipy"]
+    assert scipy.version == "1.18.0"
+    assert scipy.build_type == "package"
+    assert scipy.tags == ["min-scipy-stack"]
+    assert scipy.host_requirements == ["numpy", "libopenblas"]
+    assert scipy.requirements == ["numpy", "libopenblas"]
+    assert scipy.import_names == ["scipy", "scipy.linalg"]
+
+    libopenblas = index["libopenblas"]
+    assert libopenblas.build_type == "shared_library"
+    assert libopenblas.source_url is None
+    assert libopenblas.import_names == []
+
+    assert index.dependents() == {"numpy": {"scipy"}, "libopenblas": {"scipy"}}
+
+
+def test_refresh_only_changed(tmp_path):
+    recipe_dir = tmp_path / "packages"
+    cache_path = tmp_path / "cache" / "index.json"
+    make_recipes(recipe_dir)
+
+    load_recipe_index(recipe_dir, cache_path)
+    assert cache_path.exists()
+
+    index = load_recipe_index(recipe_dir, cache_path)
+    assert index.refresh() == []
+
+    # Touching a file without modifying it only updates the cached mtime
+    meta_path = recipe_dir / "scipy" / "meta.yaml"
+    stat = meta_path.stat()
+    os.utime(meta_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index = load_recipe_index(recipe_dir, cache_path)
+    assert index["scipy"].mtime_ns == meta_path.stat().st_mtime_ns
+    assert index.refresh() == []
+
+    meta_path.write_text(SCIPY_META.replace("1.18.0", "1.19.0"))
+    (recipe_dir / "libopenblas" / "meta.yaml").unlink()
+    index = load_recipe_index(recipe_dir, cache_path)
+    assert index["scipy"].version == "1.19.0"
+    assert list(index) == ["scipy"]
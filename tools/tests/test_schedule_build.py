@@ -0,0 +1,82 @@
+import sys
+from graphlib import CycleError
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from recipe_index import load_recipe_index
+from schedule_build import bottom_levels, parse_args, resolve_targets, schedule
+
+RECIPES = {
+    "libopenblas": {"tag": ["library"]},
+    "numpy": {"tag": ["core"]},
+    "scipy": {"host": ["numpy", "libopenblas"], "run": ["numpy"]},
+    "pandas": {"run": ["numpy", "six"]},
+    "six": {},
+    "libgdal": {"tag": ["library"]},
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    for name, meta in RECIPES.items():
+        lines = ["package:", f"  name: {name}", "  version: 1.0.0"]
+        if "tag" in meta:
+            lines += ["  tag:"] + [f"    - {t}" for t in meta["tag"]]
+        lines.append("requirements:")
+        for key in ("host", "run"):
+            lines += [f"  {key}:"] + [f"    - {d}" for d in meta.get(key, [])]
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "meta.yaml").write_text("\n".join(lines) + "\n")
+    return load_recipe_index(tmp_path)
+
+
+def test_resolve_targets(index):
+    assert resolve_targets("scipy", index) == {"scipy", "numpy", "libopenblas"}
+    assert resolve_targets("pandas,tag:core", index) == {"pandas", "numpy", "six"}
+    assert resolve_targets("*", index) == set(RECIPES)
+    with pytest.raises(ValueError, match="Unknown recipe"):
+        resolve_targets("does-not-exist", index)
+
+
+def test_schedule_long_poles_first():
+    dependencies = {
+        "libopenblas": [],
+        "numpy": [],
+        "scipy": ["numpy", "libopenblas"],
+        "six": [],
+        "pandas": ["numpy"],
+        "libgdal": [],
+    }
+    durations: dict[str, float] = {
+        "libopenblas": 300,
+        "numpy": 200,
+        "scipy": 1800,
+        "six": 10,
+        "pandas": 600,
+        "libgdal": 1500,
+    }
+
+    levels = bottom_levels(dependencies, durations)
+    assert levels["numpy"] == 2000
+    assert levels["libopenblas"] == 2100
+
+    order, wall_time = schedule(dependencies, durations, threads=2)
+    assert order[:3] == ["libopenblas", "numpy", "libgdal"]
+    assert order.index("scipy") < order.index("pandas")
+    # libopenblas -> scipy on one thread, numpy -> libgdal -> pandas on the other
+    assert wall_time == 2300
+
+    order, wall_time = schedule(dependencies, durations, threads=1)
+    assert wall_time == sum(durations.values())
+    assert set(order) == set(dependencies)
+
+
+def test_schedule_rejects_cycles_and_no_threads():
+    with pytest.raises(CycleError):
+        schedule({"a": ["b"], "b": ["a"]}, {"a": 1, "b": 1}, threads=1)
+    with pytest.raises(SystemExit):
+        parse_args(["*", "--threads", "0"])
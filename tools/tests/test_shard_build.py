@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shard_build import assign_stages, main, parse_args, plan_shards
+
+DEPENDENCIES = {
+    "libopenblas": [],
+    "libgeos": [],
+    "numpy": [],
+    "scipy": ["numpy", "libopenblas"],
+    "scikit-learn": ["numpy", "scipy"],
+    "shapely": ["numpy", "libgeos"],
+    "six": [],
+    "pandas": ["numpy"],
+}
+DURATIONS: dict[str, float] = {
+    "libopenblas": 300,
+    "libgeos": 200,
+    "numpy": 200,
+    "scipy": 1800,
+    "scikit-learn": 500,
+    "shapely": 100,
+    "six": 10,
+    "pandas": 600,
+}
+
+
+def test_assign_stages():
+    stages = assign_stages(DEPENDENCIES)
+    assert stages == {
+        "libopenblas": 0,
+        "numpy": 0,
+        "libgeos": 1,
+        "scipy": 1,
+        "scikit-learn": 2,
+        "shapely": 2,
+        "six": 2,
+        "pandas": 2,
+    }
+
+
+def test_plan_shards():
+    plan = plan_shards(DEPENDENCIES, DURATIONS, shards=2)
+    assert len(plan) == 3
+
+    # Shared dependencies are built once, in an earlier stage
+    assert [shard["packages"] for shard in plan[0]] == [["libopenblas"], ["numpy"]]
+
+    last = {tuple(shard["packages"]): shard for shard in plan[2]}
+    assert set(last) == {("pandas", "six"), ("scikit-learn", "shapely")}
+    assert last[("pandas", "six")]["predicted_time"] == 610
+    assert last[("pandas", "six")]["needs"] == ["numpy"]
+    assert last[("scikit-learn", "shapely")]["needs"] == [
+        "libgeos",
+        "libopenblas",
+        "numpy",
+        "scipy",
+    ]
+
+    # Stages with fewer packages than shards get fewer shards
+    assert len(plan_shards({"numpy": []}, {"numpy": 1}, shards=4)[0]) == 1
+
+
+def test_parse_args_rejects_no_shards():
+    with pytest.raises(SystemExit):
+        parse_args(["*", "--shards", "0"])
+
+
+@pytest.mark.parametrize(
+    "args", [["--stage", "-1", "--shard", "0"], ["--stage", "0", "--shard", "2"]]
+)
+def test_parse_args_rejects_stage_and_shard_out_of_range(args):
+    with pytest.raises(SystemExit):
+        parse_args(["*", "--shards", "2", *args])
+
+
+def test_main_stage_out_of_range(tmp_path, capsys):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "meta.yaml").write_text(
+        "package:\n  name: pkg\n  version: 1.0\n"
+    )
+    args = ["pkg", "--shards", "2", "-d", str(tmp_path)]
+
+    # The only stage has a single shard, the second one has nothing to build
+    assert main([*args, "--stage", "0", "--shard", "1"]) == 0
+    assert capsys.readouterr().out == ""
+    assert main([*args, "--stage", "1", "--shard", "0"]) == 1
+    assert "--stage must be less than the number of stages (1)" in (
+        capsys.readouterr().err
+    )
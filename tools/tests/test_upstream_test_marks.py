@@ -0,0 +1,163 @@
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to sys.path to import the module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from upstream_test_marks import MarkerTable, UpstreamTestMarks, load_marker_table
+
+SCIPY_TEST_MARKS = Path(__file__).parents[2] / "packages" / "scipy" / "test-marks.toml"
+
+SITE = "/lib/python3.14/site-packages/scipy"
+NAMES = [
+    f"{SITE}/_lib/tests/test__util.py::test_pool",
+    f"{SITE}/_lib/tests/test__util.py::test_pool_extra[1]",
+    f"{SITE}/_lib/tests/test__threadsafety.py::test_parallel_threads",
+    f"{SITE}/fft/tests/test_basic.py::TestFFT1D.test_dtypes[float32-numpy]",
+    f"{SITE}/fft/tests/test_basic.py::TestFFT1D.test_dtypes[float64-numpy]",
+    f"{SITE}/fft/tests/test_basic.py::TestFFTThreadSafe.test_fft",
+    f"{SITE}/integrate/tests/test__quad_vec.py::TestQuadVec.test_quad_vec_pool[1]",
+    f"{SITE}/integrate/tests/test_quadpack.py::TestCtypesQuad.test_ctypes_sine",
+    f"{SITE}/interpolate/tests/test_fitpack.py::TestSplder.test_kink",
+    f"{SITE}/io/tests/test_mmio.py::TestMMIOReadLargeIntegers.test_fast_matrix_market",
+    f"{SITE}/io/tests/test_fortran.py::test_fortranfiles_read",
+    f"{SITE}/sparse/tests/test_concurrency.py::test_a",
+    f"{SITE}/stats/tests/test_stats.py::TestEnergyDistance.test_inf_values",
+    f"{SITE}/stats/tests/test_stats.py::TestEnergyDistance.test_other",
+    f"{SITE}/linalg/tests/test_basic.py::test_solve",
+]
+
+
+def naive_match(entries, full_name):
+    return [e.index for e in entries if re.search(e.pattern, full_name)]
+
+
+def test_scipy_table_matches_like_re_search():
+    table = load_marker_table(SCIPY_TEST_MARKS)
+    assert {e.category for e in table.entries} >= {"thread", "process", "other"}
+    for full_name in NAMES:
+        assert [e.index for e in table.match(full_name)] == naive_match(
+            table.entries, full_name
+        ), full_name
+
+
+def test_literal_and_regex_entries():
+    entries = [
+        ("test_a.py::TestX", "xfail", "literal class"),
+        (r"test_a\.py::test_param\[1\]", "skip", "escaped literal"),
+        ("test_b.py::test_(one|two)", "xfail", "regex"),
+        (".*concurrency.*", "xfail", "regex"),
+        ("test_a.py::TestX", "skip", "duplicate"),
+    ]
+    table = MarkerTable(entries)
+    # Only the regex entries are merged into the prefilter
+    assert [e.index for e in table._regex_entries] == [2, 3]
+
+    assert [e.index for e in table.match("/s/test_a.py::TestX.test_y")] == [0, 4]
+    assert [e.index for e in table.match("/s/test_a.py::test_param[1]")] == [1]
+    assert [e.index for e in table.match("/s/test_a.py::test_param[2]")] == []
+    assert [e.index for e in table.match("/s/test_b.py::test_two")] == [2]
+    assert [e.index for e in table.match("/s/test_concurrency.py::test_a")] == [3]
+    assert table.match("/s/other_test_a.py::TestX.test_y") == []
+
+
+def test_prefilter_factors_out_common_prefix():
+    table = MarkerTable(
+        [
+            ("test_fitpack.+test_kink", "xfail", ""),
+            (".*test_concurrency.*", "xfail", ""),
+            ("test_round.py::test_add_round_(up|down)", "xfail", ""),
+            ("test_fitpack", "xfail", ""),
+        ]
+    )
+    assert table._prefilter_regex().pattern.startswith("test_(?:")
+    assert table._prefilter_regex().groupindex == {}
+    # Overlapping entries all match
+    name = "/s/test_fitpack.py::TestSplder.test_kink"
+    assert [e.index for e in table.match(name)] == [0, 3]
+
+    table.add("a|test_b", "xfail", "")
+    assert table._prefilter_regex().pattern.startswith("(?:")
+    assert [e.index for e in table.match("/s/x.py::a")] == [4]
+
+    # Numbered backreferences cannot be merged
+    table.add(r"(\w)\1_fallback", "xfail", "")
+    assert table._prefilter_regex() is None
+    assert [e.index for e in table.match("/s/x.py::aa_fallback")] == [4, 5]
+
+
+def test_load_marker_table(tmp_path):
+    path = tmp_path / "test-marks.toml"
+    path.write_text("""
+marks = [
+    { pattern = 'test_a.py::test_x', mark = "skip", category = "thread" },
+    { pattern = 'test_a\\.py::test_y', reason = "flaky" },
+]
+
+[categories]
+thread = "no thread support"
+""")
+    first, second = load_marker_table(path).entries
+    assert (first.mark.name, first.reason, first.category) == (
+        "skip",
+        "no thread support",
+        "thread",
+    )
+    assert (second.pattern, second.mark.name, second.reason, second.category) == (
+        r"test_a\.py::test_y",
+        "xfail",
+        "flaky",
+        "other",
+    )
+
+    path.write_text("marks = [{ pattern = 'test_a.py', category = 'process' }]")
+    with pytest.raises(ValueError, match=r"marks\[0\]: unknown category 'process'"):
+        load_marker_table(path)
+
+
+class FakeItem:
+    def __init__(self, full_name):
+        self.path, _, self.name = full_name.partition("::")
+        self.marks = []
+
+    def reportinfo(self):
+        return self.path, 0, self.name
+
+    def add_marker(self, mark):
+        self.marks.append(mark)
+
+
+class FakeReporter:
+    def __init__(self):
+        self.lines = []
+
+    def section(self, title):
+        self.lines.append(f"== {title}")
+
+    def write_line(self, line):
+        self.lines.append(line)
+
+
+def test_plugin_reports_unmatched_entries():
+    table = MarkerTable([])
+    table.add("test_a.py::test_x", pytest.mark.xfail, "no thread support", "thread")
+    table.add("test_b.py::test_stale", pytest.mark.skip, "removed upstream", "other")
+    table.add(".*concurrency.*", pytest.mark.xfail, "no thread support", "thread")
+    plugin = UpstreamTestMarks(table, source="test-marks.toml")
+
+    items = [FakeItem("/s/test_a.py::test_x"), FakeItem("/s/test_concurrency.py::t")]
+    plugin.pytest_collection_modifyitems(items)
+    assert [m.kwargs["reason"] for m in items[0].marks] == ["no thread support"]
+    assert [e.pattern for e in plugin.unmatched()] == ["test_b.py::test_stale"]
+
+    reporter = FakeReporter()
+    plugin.pytest_terminal_summary(reporter)
+    assert reporter.lines == [
+        "== upstream test marks (test-marks.toml)",
+        "2 marks applied (thread: 2)",
+        "1 entries did not match any collected test:",
+        "  test_b.py::test_stale (skip, other)",
+    ]
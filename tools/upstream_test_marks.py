@@ -0,0 +1,341 @@
+"""Apply xfail/skip marks to the tests of large upstream test suites.
+
+Recipes such as ``scipy`` run the upstream test suite inside Pyodide and
+mark the tests that cannot pass there (no threads, no subprocesses, no
+floating point exceptions, ...). A table of ``(pattern, mark, reason)``
+entries is matched against ``"<path>::<name>"`` of each collected test, like
+``re.search(pattern, f"{path}::{name}")``, and every matching entry adds its
+mark.
+
+Checking every pattern against every test is slow for tens of thousands of
+tests, especially inside WebAssembly, so :class:`MarkerTable` compiles the
+table once:
+
+- Literal entries of the form ``<file>.py::<name prefix>`` or ``<file>.py``
+  (with ``\\.``, ``\\[`` etc. escapes allowed) are indexed by the file name,
+  so only the few entries for the file of a test are looked at.
+- All other entries are merged into a single alternation that serves as a
+  prefilter. Leading and trailing ``.*`` are dropped and the literal prefix
+  shared by all entries (usually ``test_``) is factored out, so the regex
+  engine can scan for it instead of trying every entry at every position.
+  Most tests do not match it; the ones that do are checked against the
+  individual patterns, since several entries can match the same test. (A
+  single regex reporting all matching entries needs a lookahead per entry,
+  which is slower than these searches.)
+
+Literal entries match whole file names: ``test_basic.py::test_x`` matches
+``.../fft/tests/test_basic.py::test_x`` but, unlike ``re.search``, not
+``.../mytest_basic.py::test_x``.
+
+The table of a recipe lives in a ``test-marks.toml`` file next to its
+``meta.yaml``::
+
+    marks = [
+        { pattern = 'test_basic.py::TestFFTThreadSafe', mark = "xfail", category = "thread" },
+        { pattern = 'test_odeint_jac.py', mark = "skip", reason = "..." },
+    ]
+
+    [categories]
+    thread = "no thread support"
+
+The reason of an entry is the message of its ``category``, or its own
+``reason``. :class:`UpstreamTestMarks` is a pytest plugin that applies such
+a table and, at the end of the run, lists the entries that did not match any
+test so they can be removed, and how many tests were marked per category.
+
+This module only depends on pytest and is copied next to the ``conftest.py``
+of the test run. A conftest can register the plugin itself, see
+``packages/scipy/scipy-conftest.py``, or the module can be loaded as a
+plugin::
+
+    pytest -p upstream_test_marks --test-marks test-marks.toml --pyargs numpy
+"""
+
+import dataclasses
+import re
+import tomllib
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Characters that make a pattern a regular expression. An unescaped "." is
+# treated as a literal dot, which is what it is meant to be in file names.
+_REGEX_CHARS = set("^$*+?{}[]|()")
+# A backslash, not itself escaped, followed by a group number
+_BACKREFERENCE_RE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+
+
+@dataclasses.dataclass
+class MarkEntry:
+    pattern: str
+    mark: Any
+    reason: str
+    category: str = ""
+    # Position in the table, marks are applied in table order.
+    index: int = 0
+
+
+def _as_literal(pattern: str) -> str | None:
+    """The literal string matched by ``pattern``, or None if it is a regex."""
+    chars = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            if char.isalnum():
+                # \d, \w, \b, ...
+                return None
+            chars.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in _REGEX_CHARS:
+            return None
+        else:
+            chars.append(char)
+    if escaped:
+        return None
+    return "".join(chars)
+
+
+def _simplify(pattern: str) -> str:
+    """Drop leading and trailing ``.*``, which do not change what ``re.search`` finds."""
+    while pattern.startswith(".*"):
+        pattern = pattern[2:]
+    while pattern.endswith(".*") and not pattern.endswith("\\.*"):
+        pattern = pattern[:-2]
+    return pattern
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The literal characters every match of ``pattern`` starts with."""
+    if _has_top_level_alternation(pattern):
+        return ""
+    prefix = ""
+    for char in pattern:
+        if char in _REGEX_CHARS or char in ".\\":
+            if char in "*?{":
+                # The last character is optional
+                prefix = prefix[:-1]
+            break
+        prefix += char
+    return prefix
+
+
+def _common_prefix(patterns: Iterable[str]) -> str:
+    """The literal prefix of every match of any of ``patterns``."""
+    prefixes = [_literal_prefix(p) for p in patterns]
+    common = prefixes[0]
+    for prefix in prefixes[1:]:
+        while not prefix.startswith(common):
+            common = common[:-1]
+    return common
+
+
+def _prefilter(patterns: Iterable[str]) -> str:
+    """An alternation of ``patterns``, with their common literal prefix factored out."""
+    common = _common_prefix(patterns)
+    alternatives = "|".join(f"(?:{pattern[len(common):]})" for pattern in patterns)
+    return f"{re.escape(common)}(?:{alternatives})"
+
+
+def _split_full_name(full_name: str) -> tuple[str, str]:
+    path, _, name = full_name.partition("::")
+    return path, name
+
+
+class MarkerTable:
+    """A compiled table of marks to apply to tests."""
+
+    def __init__(self, entries: Iterable[tuple[str, Any, str]]) -> None:
+        self.entries: list[MarkEntry] = []
+        # file name -> [(path suffix, name prefix, entry)]
+        self._literals: dict[str, list[tuple[str, str, MarkEntry]]] = {}
+        self._regex_entries: list[MarkEntry] = []
+        self._compiled: dict[int, re.Pattern[str]] = {}
+        self._prefilter: re.Pattern[str] | None = None
+        # Set if the regex entries cannot be merged into the prefilter
+        self._one_by_one = False
+
+        for pattern, mark, reason in entries:
+            self.add(pattern, mark, reason)
+
+    def add(
+        self, pattern: str, mark: Any, reason: str, category: str = ""
+    ) -> MarkEntry:
+        entry = MarkEntry(pattern, mark, reason, category, index=len(self.entries))
+        self.entries.append(entry)
+
+        literal = _as_literal(pattern)
+        path, _, name = literal.partition("::") if literal else ("", "", "")
+        if literal is not None and path.endswith(".py") and "::" not in name:
+            file_name = path.rsplit("/", 1)[-1]
+            self._literals.setdefault(file_name, []).append((path, name, entry))
+        else:
+            self._compiled[entry.index] = re.compile(_simplify(pattern))
+            self._regex_entries.append(entry)
+            self._prefilter = None
+            self._one_by_one = False
+        return entry
+
+    def _prefilter_regex(self) -> re.Pattern[str] | None:
+        if self._prefilter is None and self._regex_entries and not self._one_by_one:
+            patterns = [_simplify(e.pattern) for e in self._regex_entries]
+            # Numbered backreferences would refer to the groups of other
+            # entries, and group names can clash. Check the entries one by one.
+            if any(_BACKREFERENCE_RE.search(p) for p in patterns):
+                self._one_by_one = True
+                return None
+            try:
+                self._prefilter = re.compile(_prefilter(patterns))
+            except re.error:
+                self._one_by_one = True
+        return self._prefilter
+
+    def match(self, full_name: str) -> list[MarkEntry]:
+        """All entries matching ``"<path>::<name>"``, in table order."""
+        matched: list[MarkEntry] = []
+
+        path, name = _split_full_name(full_name)
+        file_name = path.rsplit("/", 1)[-1]
+        for path_suffix, name_prefix, entry in self._literals.get(file_name, ()):
+            if path.endswith(path_suffix) and name.startswith(name_prefix):
+                matched.append(entry)
+
+        prefilter = self._prefilter_regex()
+        if prefilter is None or prefilter.search(full_name):
+            matched.extend(
+                e
+                for e in self._regex_entries
+                if self._compiled[e.index].search(full_name)
+            )
+
+        if len(matched) > 1:
+            matched.sort(key=lambda e: e.index)
+        return matched
+
+    def apply(self, items: Iterable[Any]) -> Counter[int]:
+        """Add the marks to pytest ``items``.
+
+        Returns the number of items matched by each entry, by entry index.
+        """
+        matches: Counter[int] = Counter()
+        for item in items:
+            path, _, name = item.reportinfo()
+            for entry in self.match(f"{path}::{name}"):
+                item.add_marker(entry.mark(reason=entry.reason))
+                matches[entry.index] += 1
+        return matches
+
+
+MARKS = {"xfail": pytest.mark.xfail, "skip": pytest.mark.skip}
+
+
+def load_marker_table(path: Path) -> MarkerTable:
+    """Load a ``test-marks.toml`` file."""
+    with path.open("rb") as f:
+        data = tomllib.load(f)
+
+    categories = data.get("categories", {})
+    table = MarkerTable([])
+    for i, entry in enumerate(data.get("marks", [])):
+        where = f"{path}: marks[{i}]"
+        if "pattern" not in entry:
+            raise ValueError(f"{where}: missing pattern")
+        mark = entry.get("mark", "xfail")
+        if mark not in MARKS:
+            raise ValueError(f"{where}: unknown mark {mark!r}")
+        category = entry.get("category", "other")
+        reason = entry.get("reason")
+        if reason is None:
+            if category not in categories:
+                raise ValueError(f"{where}: unknown category {category!r}")
+            reason = categories[category]
+        table.add(entry["pattern"], MARKS[mark], reason, category)
+    return table
+
+
+class UpstreamTestMarks:
+    """Apply a :class:`MarkerTable` and report the entries that never matched."""
+
+    def __init__(self, table: MarkerTable, source: str = "") -> None:
+        self.table = table
+        self.source = source
+        self.matches: Counter[int] = Counter()
+
+    def pytest_collection_modifyitems(self, items: list[Any]) -> None:
+        self.matches.update(self.table.apply(items))
+
+    def unmatched(self) -> list[MarkEntry]:
+        return [e for e in self.table.entries if not self.matches[e.index]]
+
+    def marked_per_category(self) -> Counter[str]:
+        marked: Counter[str] = Counter()
+        for entry in self.table.entries:
+            marked[entry.category] += self.matches[entry.index]
+        return +marked
+
+    def pytest_terminal_summary(self, terminalreporter: Any) -> None:
+        title = "upstream test marks"
+        if self.source:
+            title += f" ({self.source})"
+        terminalreporter.section(title)
+        marked = self.marked_per_category()
+        counts = ", ".join(f"{c}: {n}" for c, n in sorted(marked.items()))
+        terminalreporter.write_line(
+            f"{marked.total()} marks applied" + (f" ({counts})" if counts else "")
+        )
+
+        unmatched = self.unmatched()
+        if unmatched:
+            # With -k, --deselect or a subset of the test suite, entries for
+            # the tests that were not collected show up here as well.
+            terminalreporter.write_line(
+                f"{len(unmatched)} entries did not match any collected test:"
+            )
+            for entry in unmatched:
+                terminalreporter.write_line(
+                    f"  {entry.pattern} ({entry.mark.name}, {entry.category})"
+                )
+
+
+def pytest_addoption(parser: Any) -> None:
+    parser.addoption(
+        "--test-marks",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="test-marks.toml file with xfail/skip marks to apply",
+    )
+
+
+def pytest_configure(config: Any) -> None:
+    for path in config.getoption("test_marks"):
+        config.pluginmanager.register(
+            UpstreamTestMarks(load_marker_table(Path(path)), source=path),
+            f"upstream-test-marks-{path}",
+        )